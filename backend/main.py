@@ -11,6 +11,16 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from nova import CONF
+from nova.provider import (
+    get_browser_pool_provider,
+    get_crawl_scheduler_provider,
+    get_page_fetcher_provider,
+    get_sogou_url_fetcher,
+)
+from nova.sandbox.sandbox_provider import (
+    get_sandbox_provider,
+    shutdown_sandbox_provider,
+)
 from nova.service.agent_service import agent_router
 
 logger = logging.getLogger(__name__)
@@ -23,8 +33,20 @@ async def lifespan(app: FastAPI):
 
     # 启动时加载分词器和模型
     logger.info("init eveything")
+    # 启动共享浏览器池，浏览器启动开销只在服务启动时支付一次
+    try:
+        await get_browser_pool_provider().start()
+    except Exception as e:
+        logger.warning(f"browser pool start failed, will retry lazily: {e}")
+    # 预热线程沙箱（含常驻 shell），首个 execute 无需等待 shell 启动
+    await get_sandbox_provider().prewarm()
     yield
-    # 关闭时清理资源
+    # 关闭时清理资源（先取消后台爬取任务，再关闭浏览器）
+    await get_crawl_scheduler_provider().close()
+    await get_browser_pool_provider().close()
+    await get_page_fetcher_provider().close()
+    await get_sogou_url_fetcher().close()
+    await shutdown_sandbox_provider()
     logger.info("clear everything")
 
 
@@ -62,7 +62,7 @@ class CrawlWechatTool(BaseTool):
 
         # 随机选择用户代理
         user_agent = random.choice(USER_AGENTS)
-        url = SogouUrlFetcher().get_real_url(url)
+        url = await SogouUrlFetcher().get_real_url(url)
         logger.info(f"请求链接: {url}")
 
         if not url:
@@ -45,7 +45,12 @@ async def get_nova_agent_api(url_name: str, trace_id: str, state: dict, context:
     """
     trace_id = trace_id or str(uuid.uuid4())
 
-    request_data = {"trace_id": trace_id, "context": context, "state": state}
+    request_data = {
+        "trace_id": trace_id,
+        "context": context,
+        "state": state,
+        "stream_format": "ndjson",
+    }
 
     try:
         url = AGENT_BACKEND_URL[url_name]
@@ -60,11 +65,12 @@ async def get_nova_agent_api(url_name: str, trace_id: str, state: dict, context:
                     logger.error(f"Error: {response.status_code}")
                     return
 
-                async for chunk in response.aiter_bytes():
-                    if not chunk:
+                # NDJSON：每行一个事件，aiter_lines 负责处理被拆分 / 合并的网络包
+                async for chunk in response.aiter_lines():
+                    if not chunk.strip():
                         continue  # 跳过空行
                     try:
-                        line_data = json.loads(chunk.decode("utf-8"))
+                        line_data = json.loads(chunk)
                         if line_data.get("code") != 0:
                             yield {
                                 "type": "error",
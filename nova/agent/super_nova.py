@@ -18,12 +18,12 @@ from langchain_core.messages import (
 from langchain_core.messages.tool import ToolCall
 from langgraph.checkpoint.memory import InMemorySaver
 from langgraph.graph import START, StateGraph
-from langgraph.prebuilt.tool_node import ToolNode
 from langgraph.runtime import Runtime
 from langgraph.types import Command, interrupt
 
 from nova import CONF
 from nova.model.super_agent import SuperContext, SuperState
+from nova.node.tool_executor import create_parallel_tool_node
 from nova.provider import (
     get_llms_provider,
     get_prompts_provider,
@@ -337,7 +337,7 @@ def compile_super_nova_agent():
 
     super_nova_node = create_super_nova_node(tools=tools)
     human_feedback_node = create_human_feedback_node()
-    tool_node = ToolNode(tools=tools)
+    tool_node = create_parallel_tool_node(tools, CONF.ToolExecutor)
     route_edges = create_route_tools_edges()
 
     # 构建图
@@ -6,12 +6,15 @@ from __future__ import annotations
 
 from nova import CONF
 
+from .crawl_cache import CrawlCacheStore
 from .sqlite_cache import SQLiteCacheFixed
 from .sqlite_memory import SQLiteStoreFixed
 
 SQLITECACHE = None
 SQLITESTORE = None
+CRAWLCACHE = None
 
 if CONF:
     SQLITECACHE = SQLiteCacheFixed(CONF.SYSTEM.cache_dir)
     SQLITESTORE = SQLiteStoreFixed(CONF.SYSTEM.cache_dir)
+    CRAWLCACHE = CrawlCacheStore(CONF.SYSTEM.cache_dir, CONF.CrawlCache)
@@ -0,0 +1,331 @@
+# -*- coding: utf-8 -*-
+# @Time   : 2026/03/20
+# @Author : zip
+# @Moto   : Knowledge comes from decomposition
+from __future__ import annotations
+
+import asyncio
+import fnmatch
+import logging
+import os
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path, PosixPath
+from typing import Optional, Union
+from urllib.parse import urlparse
+
+from sqlalchemy import Column, Float, LargeBinary, String, delete, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from nova.model.config import CrawlCacheConfig
+
+try:
+    from sqlalchemy.orm import declarative_base
+except ImportError:
+    from sqlalchemy.ext.declarative import declarative_base
+
+try:
+    import zstandard  # type: ignore
+except ImportError:
+    zstandard = None
+
+"""
+网页爬取结果缓存（按 URL）
+
+* 采用异步 - aiosqlite
+* 内容使用 zstd 压缩（未安装 zstandard 时退化为 zlib）
+* 按域名配置 TTL；过期后若有 ETag/Last-Modified 可条件重验证
+* 失败的 URL 进入负缓存，短时间内不再重复爬取
+* 首次使用时及每写入一定次数后清理过期条目，条目数超过上限时删除最早抓取的条目
+"""
+
+logger = logging.getLogger(__name__)
+
+Base = declarative_base()
+
+_STATUS_OK = "ok"
+_STATUS_FAILED = "failed"
+# 每写入多少次清理一次
+_PURGE_EVERY_WRITES = 500
+
+
+class CrawlCacheTable(Base):  # type: ignore[misc,valid-type]
+    """SQLite table for crawled page content."""
+
+    __tablename__ = "crawl_cache"
+    url = Column(String, primary_key=True)
+    domain = Column(String, index=True)
+    title = Column(String)
+    content = Column(LargeBinary)
+    codec = Column(String)
+    etag = Column(String)
+    last_modified = Column(String)
+    status = Column(String)
+    error = Column(String)
+    fetched_at = Column(Float)
+    expires_at = Column(Float)
+
+
+@dataclass
+class CrawlCacheEntry:
+    url: str
+    title: str
+    content: str
+    status: str
+    error: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+    expires_at: float
+
+    @property
+    def is_fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    @property
+    def is_failed(self) -> bool:
+        return self.status == _STATUS_FAILED
+
+    @property
+    def can_revalidate(self) -> bool:
+        return self.status == _STATUS_OK and bool(self.etag or self.last_modified)
+
+
+def _compress(text: str) -> tuple[bytes, str]:
+    data = text.encode("utf-8")
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=3).compress(data), "zstd"
+    return zlib.compress(data), "zlib"
+
+
+def _decompress(data: bytes, codec: str) -> str:
+    if not data:
+        return ""
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd cache entries")
+        return zstandard.ZstdDecompressor().decompress(data).decode("utf-8")
+    return zlib.decompress(data).decode("utf-8")
+
+
+class CrawlCacheStore:
+    """
+    URL -> 清洗后的 markdown / 标题 / 抓取时间
+
+    get(url) -> CrawlCacheEntry | None  命中（包括过期、失败条目），由调用方判断 is_fresh / is_failed
+    put(url, title, content, etag, last_modified)  写入成功结果
+    put_failure(url, error)  写入负缓存（调用方只对永久性失败调用，如 4xx）
+    touch(url)  条件重验证通过（304）后续期
+    revalidate(entry) -> bool  发送条件请求，304 时续期并返回 True
+    purge() -> int  删除过期 / 超出条目数上限的条目，返回删除数
+    """
+
+    def __init__(
+        self,
+        database_path: Union[str, PosixPath],
+        config: CrawlCacheConfig,
+    ) -> None:
+        os.makedirs(database_path, exist_ok=True)
+        self.database_path = Path(os.path.join(database_path, "crawl_cache.db"))
+        self.config = config
+        self.engine = create_async_engine(f"sqlite+aiosqlite:///{self.database_path}")
+        self.async_session = async_sessionmaker(
+            bind=self.engine, expire_on_commit=False, class_=AsyncSession
+        )
+        self._init_lock = asyncio.Lock()
+        self._initialized = False
+        self._writes = 0
+
+    async def _ensure_initialized(self):
+        if self._initialized:
+            return
+        async with self._init_lock:
+            if self._initialized:
+                return
+            async with self.engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            self._initialized = True
+        # 上次运行遗留的过期条目
+        await self._purge_quietly()
+
+    def ttl_for(self, url: str) -> float:
+        """按域名匹配 TTL（秒），支持通配符，如 *.sogou.com"""
+        domain = urlparse(url).netloc.lower()
+        for pattern, hours in self.config.domain_ttl_hours.items():
+            if fnmatch.fnmatch(domain, pattern.lower()):
+                return hours * 3600
+        return self.config.default_ttl_hours * 3600
+
+    async def get(self, url: str) -> Optional[CrawlCacheEntry]:
+        if not self.config.enable:
+            return None
+        await self._ensure_initialized()
+        async with self.async_session() as session:
+            row = (
+                await session.execute(
+                    select(CrawlCacheTable).where(CrawlCacheTable.url == url)
+                )
+            ).scalar_one_or_none()
+        if row is None:
+            return None
+        try:
+            content = _decompress(row.content, row.codec)  # type: ignore
+        except Exception as e:
+            logger.warning(f"[CrawlCache] broken entry for {url}: {e}")
+            return None
+        return CrawlCacheEntry(
+            url=row.url,  # type: ignore
+            title=row.title or "",  # type: ignore
+            content=content,
+            status=row.status,  # type: ignore
+            error=row.error or "",  # type: ignore
+            etag=row.etag,  # type: ignore
+            last_modified=row.last_modified,  # type: ignore
+            fetched_at=row.fetched_at,  # type: ignore
+            expires_at=row.expires_at,  # type: ignore
+        )
+
+    async def _merge(self, item: CrawlCacheTable):
+        await self._ensure_initialized()
+        async with self.async_session() as session:
+            async with session.begin():
+                await session.merge(item)
+        self._writes += 1
+        if self._writes % _PURGE_EVERY_WRITES == 0:
+            await self._purge_quietly()
+
+    async def put(
+        self,
+        url: str,
+        title: str,
+        content: str,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ):
+        if not self.config.enable:
+            return
+        now = time.time()
+        data, codec = _compress(content)
+        await self._merge(
+            CrawlCacheTable(
+                url=url,
+                domain=urlparse(url).netloc.lower(),
+                title=title,
+                content=data,
+                codec=codec,
+                etag=etag,
+                last_modified=last_modified,
+                status=_STATUS_OK,
+                error="",
+                fetched_at=now,
+                expires_at=now + self.ttl_for(url),
+            )
+        )
+
+    async def put_failure(self, url: str, error: str):
+        if not self.config.enable:
+            return
+        now = time.time()
+        await self._merge(
+            CrawlCacheTable(
+                url=url,
+                domain=urlparse(url).netloc.lower(),
+                title="",
+                content=b"",
+                codec="",
+                status=_STATUS_FAILED,
+                error=error[:1000],
+                fetched_at=now,
+                expires_at=now + self.config.negative_ttl_minutes * 60,
+            )
+        )
+
+    async def touch(self, url: str):
+        if not self.config.enable:
+            return
+        await self._ensure_initialized()
+        async with self.async_session() as session:
+            async with session.begin():
+                row = await session.get(CrawlCacheTable, url)
+                if row is not None:
+                    row.expires_at = time.time() + self.ttl_for(url)  # type: ignore
+
+    async def revalidate(self, entry: CrawlCacheEntry) -> bool:
+        """条件请求重验证，内容未变化（304）时续期并返回 True"""
+        if not self.config.revalidate or not entry.can_revalidate:
+            return False
+
+        import httpx
+
+        headers = {}
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        try:
+            async with httpx.AsyncClient(
+                timeout=self.config.revalidate_timeout, follow_redirects=True
+            ) as client:
+                response = await client.head(entry.url, headers=headers)
+        except Exception as e:
+            logger.debug(f"[CrawlCache] revalidate {entry.url} failed: {e}")
+            return False
+
+        if response.status_code == 304:
+            await self.touch(entry.url)
+            return True
+        return False
+
+    async def purge(self) -> int:
+        """
+        1. 失败条目过期即删除
+        2. 成功条目过期后保留 stale_keep_hours 用于条件重验证（未开启重验证时过期即删除）
+        3. 条目数超过 max_entries 时删除最早抓取的条目
+        """
+        if not self.config.enable:
+            return 0
+        await self._ensure_initialized()
+        now = time.time()
+        _grace = self.config.stale_keep_hours * 3600 if self.config.revalidate else 0
+        async with self.async_session() as session:
+            async with session.begin():
+                result = await session.execute(
+                    delete(CrawlCacheTable).where(
+                        or_(
+                            CrawlCacheTable.expires_at < now - _grace,
+                            (CrawlCacheTable.status == _STATUS_FAILED)
+                            & (CrawlCacheTable.expires_at < now),
+                        )
+                    )
+                )
+                removed = result.rowcount or 0
+
+                if self.config.max_entries:
+                    total = (
+                        await session.execute(
+                            select(func.count()).select_from(CrawlCacheTable)
+                        )
+                    ).scalar_one()
+                    excess = total - self.config.max_entries
+                    if excess > 0:
+                        oldest = (
+                            select(CrawlCacheTable.url)
+                            .order_by(CrawlCacheTable.fetched_at)
+                            .limit(excess)
+                        )
+                        result = await session.execute(
+                            delete(CrawlCacheTable).where(
+                                CrawlCacheTable.url.in_(oldest)
+                            )
+                        )
+                        removed += result.rowcount or 0
+        if removed:
+            logger.info(f"[CrawlCache] purged {removed} entries")
+        return removed
+
+    async def _purge_quietly(self):
+        try:
+            await self.purge()
+        except Exception as e:
+            logger.warning(f"[CrawlCache] purge failed: {e}")
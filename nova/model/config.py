@@ -100,6 +100,12 @@ class LiteLLMModelConfig(BaseModel):
 
     model_name: str = Field(..., description="自定义模型名称（如 basic/reasoning）")
     litellm_params: LiteLLMParams = Field(..., description="litellm相关参数")
+    context_window: Optional[int] = Field(
+        None, ge=1024, description="模型上下文窗口（token），为空时从litellm模型信息推断"
+    )
+    reserved_output_tokens: int = Field(
+        default=4096, ge=0, description="为模型输出预留的token数"
+    )
 
 
 class LLMConfig(BaseModel):
@@ -178,6 +184,220 @@ class SandboxConfig(BaseModel):
     container_path: str = Field(
         default="", description="容器路径（如 /home/user/container）"
     )
+    io_workers: int = Field(
+        default=8, ge=1, le=64, description="沙箱文件操作线程池大小（避免阻塞事件循环）"
+    )
+    execute_timeout: int = Field(default=600, ge=1, description="execute 命令超时（秒）")
+    execute_output_max_bytes: int = Field(
+        default=1024 * 1024,
+        ge=1024,
+        description="execute 每个输出流最多保留的字节数（环形缓冲，保留末尾）",
+    )
+    execute_result_max_tokens: int = Field(
+        default=8000, ge=100, description="execute 返回给模型的最大 token 数（保留末尾）"
+    )
+    persistent_shell: bool = Field(
+        default=True, description="是否为每个线程保持常驻 shell 会话（保留 cwd / 环境变量）"
+    )
+    max_shell_sessions: int = Field(
+        default=16, ge=1, description="常驻 shell 会话数上限（所有沙箱共享）"
+    )
+    shell_idle_timeout: int = Field(
+        default=900, ge=10, description="常驻 shell 会话空闲多久后关闭（秒）"
+    )
+    max_sandboxes: int = Field(
+        default=32, ge=1, description="按线程隔离的沙箱数上限（超出时按 LRU 淘汰）"
+    )
+    prewarm_sandboxes: int = Field(default=2, ge=0, description="预热的空闲沙箱数")
+    sandbox_idle_timeout: int = Field(
+        default=1800, ge=60, description="线程沙箱空闲多久后回收（秒）"
+    )
+    cpu_time_limit: int = Field(
+        default=0, ge=0, description="沙箱内单进程 CPU 时间上限（秒，0 表示不限制）"
+    )
+    memory_limit_mb: int = Field(
+        default=0, ge=0, description="沙箱内单进程虚拟内存上限（MB，0 表示不限制）"
+    )
+    cgroup_root: str = Field(
+        default="", description="cgroup v2 目录（可写时为每个沙箱创建子 cgroup）"
+    )
+    cgroup_cpu_quota: float = Field(
+        default=0, ge=0, description="每个沙箱可用的 CPU 核数（cgroup，0 表示不限制）"
+    )
+    cgroup_memory_mb: int = Field(
+        default=0, ge=0, description="每个沙箱的内存上限（cgroup，MB，0 表示不限制）"
+    )
+    file_index: bool = Field(
+        default=True, description="是否启用工作目录文件索引（glob / grep / ls 从内存回答）"
+    )
+    file_index_max_files: int = Field(
+        default=100000, ge=100, description="单个索引的最大文件数（超过则不建索引）"
+    )
+    file_index_max_workspaces: int = Field(
+        default=8, ge=1, description="同时保留索引的工作目录数"
+    )
+    file_index_staleness: float = Field(
+        default=2.0, ge=0, description="外部文件变更的最大发现延迟（秒）"
+    )
+    file_content_cache_mb: int = Field(
+        default=64, ge=0, description="grep 文件内容缓存大小（MB）"
+    )
+    large_file_mb: int = Field(
+        default=8, ge=1, description="超过该大小（MB）的文件按行索引分页读取、流式替换编辑"
+    )
+
+
+class BrowserPoolConfig(BaseModel):
+    """无头浏览器池配置"""
+
+    headless: bool = Field(default=True, description="是否无头模式")
+    max_browsers: int = Field(default=2, ge=1, le=16, description="最大浏览器实例数")
+    max_contexts_per_browser: int = Field(
+        default=4, ge=1, le=32, description="每个浏览器同时打开的最大context数"
+    )
+    max_crawler_pages: int = Field(
+        default=8, ge=1, le=64, description="crawl4ai 同时爬取的最大页面数"
+    )
+    recycle_after_pages: int = Field(
+        default=200, ge=1, description="浏览器服务多少个页面后回收重建（防止内存泄漏）"
+    )
+
+
+class CrawlCacheConfig(BaseModel):
+    """网页爬取结果缓存配置"""
+
+    enable: bool = Field(default=True, description="是否启用爬取缓存")
+    default_ttl_hours: float = Field(default=24, ge=0, description="默认缓存时长（小时）")
+    domain_ttl_hours: Dict[str, float] = Field(
+        default_factory=lambda: {"mp.weixin.qq.com": 24 * 7},
+        description="按域名配置缓存时长（小时），支持通配符，如 *.sogou.com",
+    )
+    negative_ttl_minutes: float = Field(
+        default=30, ge=0, description="爬取失败的URL在多长时间内不再重试（分钟）"
+    )
+    revalidate: bool = Field(
+        default=True, description="过期后是否使用 ETag/Last-Modified 条件请求重验证"
+    )
+    revalidate_timeout: float = Field(default=5, gt=0, description="重验证超时（秒）")
+    stale_keep_hours: float = Field(
+        default=24, ge=0, description="过期的成功条目保留多久用于条件重验证（小时）"
+    )
+    max_entries: int = Field(
+        default=50000, ge=0, description="最多缓存的URL数，超出时删除最早抓取的条目，0 表示不限制"
+    )
+
+
+class CrawlSchedulerConfig(BaseModel):
+    """web_search / wechat_search 爬取调度配置"""
+
+    max_concurrency: int = Field(default=6, ge=1, le=64, description="全局最大并发爬取数")
+    per_domain_concurrency: int = Field(
+        default=2, ge=1, le=16, description="单个域名最大并发爬取数"
+    )
+    per_domain_interval: float = Field(
+        default=1.0, ge=0, description="同一域名两次请求的最小间隔（秒）"
+    )
+    domain_interval: Dict[str, float] = Field(
+        default_factory=lambda: {"weixin.sogou.com": 3.0},
+        description="按域名配置最小请求间隔（秒），支持通配符",
+    )
+    task_timeout: float = Field(default=60, gt=0, description="单个爬取任务超时（秒）")
+
+
+class PageFetcherConfig(BaseModel):
+    """网页分级抓取配置：先用 HTTP 直接抓取，必要时再用浏览器渲染"""
+
+    enable_static: bool = Field(default=True, description="是否先尝试 HTTP 直接抓取")
+    timeout: float = Field(default=10, gt=0, description="HTTP 抓取超时（秒）")
+    max_connections: int = Field(default=32, ge=1, description="HTTP 连接池最大连接数")
+    max_bytes: int = Field(
+        default=5 * 1024 * 1024, ge=1024, description="HTTP 抓取的最大响应大小（字节）"
+    )
+    min_text_chars: int = Field(
+        default=300, ge=0, description="正文少于该字符数时认为需要浏览器渲染"
+    )
+    render_domains: List[str] = Field(
+        default_factory=list, description="始终使用浏览器渲染的域名，支持通配符"
+    )
+    learn_threshold: int = Field(
+        default=2, ge=1, description="同一域名连续多少次需要渲染后，直接走浏览器"
+    )
+    learn_ttl_hours: float = Field(
+        default=24, gt=0, description="域名学习结果的有效期（小时），过期后重新探测"
+    )
+
+
+class ToolExecutorConfig(BaseModel):
+    """工具执行节点配置模型"""
+
+    max_concurrency: int = Field(
+        default=8, ge=1, le=64, description="同一轮工具调用的最大并发数"
+    )
+    tool_concurrency: Dict[str, int] = Field(
+        default_factory=lambda: {"execute": 2, "web_search": 2, "web_crawl": 4},
+        description="按工具名限制的并发数（每轮工具调用单独计数）",
+    )
+    emit_timing: bool = Field(default=True, description="是否发送工具耗时事件")
+
+    @field_validator("tool_concurrency")
+    @classmethod
+    def validate_tool_concurrency(cls, v: Dict[str, int]) -> Dict[str, int]:
+        """并发数至少为 1，为 0 时该工具的调用会永远等待"""
+        for name, limit in v.items():
+            if limit < 1:
+                raise ValueError(f"tool_concurrency.{name} 必须 >= 1，当前为 {limit}")
+        return v
+
+
+class SummarizeConfig(BaseModel):
+    """网页内容分块总结（webpage_summarize）配置"""
+
+    max_chunk_tokens: int = Field(
+        default=6000, ge=256, description="单个分块的最大 token 数（越小并发度越高）"
+    )
+    max_concurrency: int = Field(
+        default=4, ge=1, le=64, description="全进程同时进行的分块总结数"
+    )
+    max_reduce_rounds: int = Field(default=3, ge=1, description="归并轮数上限")
+    max_failure_ratio: float = Field(
+        default=0.5, ge=0, le=1, description="单轮失败分块占比超过该值时节点失败"
+    )
+
+
+class StreamConfig(BaseModel):
+    """流式响应配置模型"""
+
+    engine: Literal["events", "astream"] = Field(
+        default="events",
+        description="流式引擎：events 为 astream_events v2，astream 为多 stream_mode 的 astream",
+    )
+    default_format: Literal["ndjson", "sse"] = Field(
+        default="ndjson", description="未指定格式时 /agent/service 的分帧协议"
+    )
+    sse_retry_ms: int = Field(
+        default=3000, ge=0, description="SSE 客户端断线重连间隔（毫秒）"
+    )
+    coalesce_window_ms: float = Field(
+        default=30, ge=0, description="token 增量合并的时间窗口（毫秒），0 表示不合并"
+    )
+    coalesce_max_bytes: int = Field(
+        default=4096, ge=1, description="单个合并事件的最大字符数，达到后立即输出"
+    )
+    ws_max_runs: int = Field(
+        default=4, ge=1, description="每个 WebSocket 连接的最大并发运行数"
+    )
+    ws_queue_size: int = Field(
+        default=256, ge=1, description="每个 WebSocket 连接的发送队列长度（帧数）"
+    )
+    ws_token_policy: Literal["coalesce", "drop"] = Field(
+        default="coalesce",
+        description="发送队列已满时 token 增量的处理方式：coalesce 合并，drop 丢弃",
+    )
+    disconnect_poll_ms: float = Field(
+        default=1000,
+        ge=0,
+        description="检查流式客户端是否断开的间隔（毫秒），断开时取消运行；0 表示不轮询",
+    )
 
 
 # ------------------------------ 总配置模型 ------------------------------
@@ -189,6 +409,27 @@ class AppConfig(BaseModel):
     EMBEDDING: EmbeddingConfig = Field(..., description="嵌入模型配置")
     HOOK: HookConfig = Field(..., description="Hook配置")
     Sandbox: SandboxConfig = Field(..., description="沙箱配置")
+    Browser: BrowserPoolConfig = Field(
+        default_factory=BrowserPoolConfig, description="无头浏览器池配置"
+    )
+    CrawlCache: CrawlCacheConfig = Field(
+        default_factory=CrawlCacheConfig, description="网页爬取结果缓存配置"
+    )
+    CrawlScheduler: CrawlSchedulerConfig = Field(
+        default_factory=CrawlSchedulerConfig, description="爬取调度配置"
+    )
+    PageFetcher: PageFetcherConfig = Field(
+        default_factory=PageFetcherConfig, description="网页分级抓取配置"
+    )
+    ToolExecutor: ToolExecutorConfig = Field(
+        default_factory=ToolExecutorConfig, description="工具执行节点配置"
+    )
+    Stream: StreamConfig = Field(
+        default_factory=StreamConfig, description="流式响应配置"
+    )
+    Summarize: SummarizeConfig = Field(
+        default_factory=SummarizeConfig, description="网页内容分块总结配置"
+    )
 
     @classmethod
     def replace_env_vars(cls, value: str) -> str:
@@ -358,4 +599,8 @@ class AppConfig(BaseModel):
                 use="local",
                 container_path="",
             ),
+            Browser=BrowserPoolConfig(),
+            CrawlCache=CrawlCacheConfig(),
+            CrawlScheduler=CrawlSchedulerConfig(),
+            PageFetcher=PageFetcherConfig(),
         )
@@ -4,7 +4,7 @@
 # @Moto   : Knowledge comes from decomposition
 from __future__ import annotations
 
-from typing import Dict
+from typing import Dict, Literal, Optional
 
 from pydantic import BaseModel, Field
 
@@ -16,6 +16,14 @@ class SuperAgentRequest(BaseModel):
     context: SuperContext = Field(..., description="the context runtime dict")
     state: SuperState = Field(..., description="the input messages of the task")
     stream: bool = Field(True, description="whether to stream the response")
+    stream_format: Optional[Literal["ndjson", "sse"]] = Field(
+        None,
+        description="framing of the streamed events, falls back to the Accept header",
+    )
+    run_id: Optional[str] = Field(
+        None,
+        description="id of the run on a multiplexed websocket, generated when omitted",
+    )
 
 
 class SuperAgentResponse(BaseModel):
@@ -68,3 +68,5 @@ class SuperContext(TypedDict):
     model: NotRequired[str | None]
     models: NotRequired[Dict | None]
     config: NotRequired[Dict | None]
+    search_deadline: NotRequired[float | None]  # web_search 时间预算（秒），到期返回已获取的结果
+    search_background_fill: NotRequired[bool | None]  # 到期后未完成的爬取是否在后台继续填充缓存
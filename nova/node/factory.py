@@ -32,7 +32,6 @@ logger = logging.getLogger(__name__)
 
 # ######################################################################################
 # 全局变量
-_DEFAULT_TRIM_TOKEN_LIMIT = 4000
 _DEFAULT_FALLBACK_MESSAGE_COUNT = 15
 
 
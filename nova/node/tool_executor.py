@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+# @Time   : 2026/03/20
+# @Author : zip
+# @Moto   : Knowledge comes from decomposition
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Literal, Sequence
+
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.messages.tool import ToolCall
+from langgraph.prebuilt.tool_node import ToolCallRequest, ToolNode
+from langgraph.types import Command
+
+from nova.model.config import ToolExecutorConfig
+from nova.utils.common import emit_custom_event
+
+logger = logging.getLogger(__name__)
+
+"""
+并行工具执行节点
+
+* 基于 ToolNode（保留 ToolRuntime 注入、错误处理），通过 awrap_tool_call 接管每个调用的调度
+* 同一轮的工具调用并发执行：全局并发 max_concurrency，按工具限流（如 execute 最多 2 个）；
+  信号量随批次创建，限制只作用于同一轮，不同线程 / 不同轮之间互不影响
+* 依赖提示：同一路径上的写操作（write_file / edit_file）与该路径上的其它读写按模型给出的顺序串行；
+  execute 可能读写任意文件，与写操作按顺序串行
+* 每个调用完成后发送 tool_timing 自定义事件（排队耗时 / 执行耗时）
+"""
+
+# 工具耗时的自定义事件名
+TOOL_TIMING_EVENT = "tool_timing"
+
+# 工具名 -> (访问方式, 路径参数名)
+_TOOL_ACCESS: dict[str, tuple[Literal["read", "write", "exec"], str | None]] = {
+    "read_file": ("read", "file_path"),
+    "write_file": ("write", "file_path"),
+    "edit_file": ("write", "file_path"),
+    "ls": ("read", "path"),
+    "glob": ("read", "path"),
+    "grep": ("read", "path"),
+    "execute": ("exec", None),
+}
+
+ToolCallResult = ToolMessage | Command
+ToolCallHandler = Callable[[ToolCallRequest], Awaitable[ToolCallResult]]
+
+
+@dataclass
+class _Access:
+    mode: Literal["read", "write", "exec", "none"]
+    path: str | None  # None 表示不限定路径（如未指定 path 的 grep）
+
+
+def _access_of(tool_call: ToolCall) -> _Access:
+    _spec = _TOOL_ACCESS.get(tool_call["name"])
+    if _spec is None:
+        return _Access("none", None)
+    mode, path_arg = _spec
+    path = tool_call.get("args", {}).get(path_arg) if path_arg else None
+    if isinstance(path, str) and path:
+        path = os.path.normpath(path)
+        return _Access(mode, None if path == "/" else path)
+    return _Access(mode, None)
+
+
+def _overlap(a: str | None, b: str | None) -> bool:
+    if a is None or b is None:
+        return True
+    return a == b or a.startswith(b + "/") or b.startswith(a + "/")
+
+
+def _conflict(a: _Access, b: _Access) -> bool:
+    if a.mode == "none" or b.mode == "none":
+        return False
+    if a.mode == "exec" or b.mode == "exec":
+        # execute 的读写范围未知，只与写操作串行（execute 之间由 shell 会话自行串行）
+        return "write" in (a.mode, b.mode)
+    if "write" not in (a.mode, b.mode):
+        return False
+    return _overlap(a.path, b.path)
+
+
+class _Batch:
+    """同一条 AIMessage 中的一批工具调用"""
+
+    def __init__(self, tool_calls: Sequence[ToolCall], config: ToolExecutorConfig):
+        self.done: dict[str, asyncio.Event] = {}
+        self.deps: dict[str, list[str]] = {}
+        _accesses: list[tuple[str, _Access]] = []
+        for call in tool_calls:
+            _id = call.get("id") or ""
+            _access = _access_of(call)
+            self.done[_id] = asyncio.Event()
+            self.deps[_id] = [
+                prev_id for prev_id, prev in _accesses if _conflict(_access, prev)
+            ]
+            _accesses.append((_id, _access))
+        self.pending = len(self.done)
+        self.global_semaphore = asyncio.Semaphore(config.max_concurrency)
+        self.tool_semaphores = {
+            name: asyncio.Semaphore(limit)
+            for name, limit in config.tool_concurrency.items()
+        }
+
+
+class ParallelToolExecutor:
+    """
+    ToolNode 的 awrap_tool_call：按批次调度工具调用
+
+    ToolNode 对同一轮的所有调用并发调用本包装器，这里负责等待依赖、限流并记录耗时
+    """
+
+    def __init__(self, config: ToolExecutorConfig):
+        self.config = config
+        self._batches: dict[str, _Batch] = {}
+
+    def _batch_of(self, request: ToolCallRequest) -> tuple[str, _Batch] | None:
+        _call_id = request.tool_call.get("id")
+        _messages = (
+            request.state.get("messages", [])
+            if isinstance(request.state, dict)
+            else getattr(request.state, "messages", [])
+        )
+        # 找到发起本次调用的 AIMessage（一般是最后一条）
+        for message in reversed(_messages or []):
+            if isinstance(message, AIMessage) and message.tool_calls:
+                if any(c.get("id") == _call_id for c in message.tool_calls):
+                    _key = message.id or "|".join(
+                        c.get("id") or "" for c in message.tool_calls
+                    )
+                    if _key not in self._batches:
+                        self._batches[_key] = _Batch(message.tool_calls, self.config)
+                    return _key, self._batches[_key]
+                break
+        return None
+
+    async def __call__(
+        self, request: ToolCallRequest, execute: ToolCallHandler
+    ) -> ToolCallResult:
+        _name = request.tool_call["name"]
+        _call_id = request.tool_call.get("id") or ""
+        _found = self._batch_of(request)
+        if _found is None:
+            return await execute(request)
+        _key, batch = _found
+
+        _queued_at = time.perf_counter()
+        _status = "success"
+        _started_at = _queued_at
+        try:
+            # 等待同一路径上更早的冲突调用完成
+            for dep_id in batch.deps.get(_call_id, []):
+                await batch.done[dep_id].wait()
+            _tool_semaphore = batch.tool_semaphores.get(_name)
+            async with batch.global_semaphore:
+                if _tool_semaphore is not None:
+                    await _tool_semaphore.acquire()
+                try:
+                    _started_at = time.perf_counter()
+                    result = await execute(request)
+                finally:
+                    if _tool_semaphore is not None:
+                        _tool_semaphore.release()
+            if isinstance(result, ToolMessage) and result.status == "error":
+                _status = "error"
+            return result
+        except BaseException:
+            _status = "error"
+            raise
+        finally:
+            _finished_at = time.perf_counter()
+            if _call_id in batch.done:
+                batch.done[_call_id].set()
+            batch.pending -= 1
+            if batch.pending <= 0:
+                self._batches.pop(_key, None)
+            await self._report(
+                request,
+                queued_ms=(_started_at - _queued_at) * 1000,
+                run_ms=(_finished_at - _started_at) * 1000,
+                status=_status,
+            )
+
+    async def _report(self, request: ToolCallRequest, **timing: Any):
+        name = request.tool_call["name"]
+        tool_call_id = request.tool_call.get("id") or ""
+        logger.info(
+            f"[ToolExecutor] {name} {tool_call_id} {timing['status']} "
+            f"queued={timing['queued_ms']:.0f}ms run={timing['run_ms']:.0f}ms"
+        )
+        if not self.config.emit_timing:
+            return
+        try:
+            await emit_custom_event(
+                TOOL_TIMING_EVENT,
+                {
+                    "tool_call_id": tool_call_id,
+                    "name": name,
+                    "queued_ms": round(timing["queued_ms"], 1),
+                    "run_ms": round(timing["run_ms"], 1),
+                    "status": timing["status"],
+                },
+                getattr(request.runtime, "stream_writer", None),
+            )
+        except Exception as e:
+            # 不在 runnable 上下文中（如单独测试）时无法派发事件
+            logger.debug(f"dispatch tool timing failed: {e}")
+
+
+def create_parallel_tool_node(
+    tools: Sequence[Any], config: ToolExecutorConfig, name: str = "tools"
+) -> ToolNode:
+    """创建并行调度的工具节点，替代默认的 ToolNode"""
+    return ToolNode(
+        tools=tools, name=name, awrap_tool_call=ParallelToolExecutor(config)
+    )
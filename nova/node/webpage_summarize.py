@@ -4,7 +4,12 @@
 # @Moto   : Knowledge comes from decomposition
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import json
 import logging
+import re
+from collections import OrderedDict
 
 from langchain_core.messages import (
     AIMessage,
@@ -13,15 +18,134 @@ from langchain_core.messages import (
 from langgraph.graph import START, StateGraph
 from langgraph.runtime import Runtime
 from langgraph.types import Command
+from pydantic import BaseModel
 
+from nova import CONF
 from nova.model.super_agent import SuperContext, SuperState
-from nova.provider import get_llms_provider, get_prompts_provider, get_super_agent_hooks
+from nova.provider import (
+    get_context_budget_provider,
+    get_llms_provider,
+    get_prompts_provider,
+    get_super_agent_hooks,
+)
 from nova.utils.common import truncate_if_too_long
 from nova.utils.log_utils import log_info_set_color
+from nova.utils.token_utils import count_tokens, truncate_text_by_tokens
 
 logger = logging.getLogger(__name__)
 # ######################################################################################
-# 配置
+# 配置（分块大小、并发数、归并轮数见 CONF.Summarize）
+_CHUNK_CACHE_SIZE = 2048
+# 分块总结失败时，用原文开头该比例的内容代替，保证归并时内容持续缩小
+_FAILED_EXCERPT_RATIO = 8
+
+_HEADING_PATTERN = re.compile(r"(?m)^(?=#{1,6}\s)")
+
+_chunk_semaphore: asyncio.Semaphore | None = None
+_chunk_summary_cache: OrderedDict[str, str] = OrderedDict()
+
+
+def _get_chunk_semaphore() -> asyncio.Semaphore:
+    global _chunk_semaphore
+    if _chunk_semaphore is None:
+        _chunk_semaphore = asyncio.Semaphore(CONF.Summarize.max_concurrency)
+    return _chunk_semaphore
+
+
+# ######################################################################################
+# 分块 + 缓存
+def split_markdown_chunks(
+    text: str, max_tokens: int, model: str | None = None
+) -> list[str]:
+    """按标题 -> 段落 -> token 的顺序把网页内容切成不超过 max_tokens 的分块"""
+    if count_tokens(text, model) <= max_tokens:
+        return [text]
+
+    # 1. 先按 markdown 标题切成章节，过长的章节再按段落切
+    pieces: list[str] = []
+    for section in _HEADING_PATTERN.split(text):
+        if not section.strip():
+            continue
+        if count_tokens(section, model) <= max_tokens:
+            pieces.append(section)
+            continue
+        for paragraph in re.split(r"\n\s*\n", section):
+            if not paragraph.strip():
+                continue
+            # 2. 仍然超长的段落直接按 token 硬切
+            while count_tokens(paragraph, model) > max_tokens:
+                head, _ = truncate_text_by_tokens(paragraph, max_tokens, model)
+                pieces.append(head)
+                paragraph = paragraph[len(head) :]
+            if paragraph.strip():
+                pieces.append(paragraph)
+
+    # 3. 把相邻的小块合并，尽量填满每个分块
+    chunks: list[str] = []
+    current, current_tokens = "", 0
+    for piece in pieces:
+        piece_tokens = count_tokens(piece, model) + 1  # 1: 分隔符 "\n\n"
+        if current and current_tokens + piece_tokens > max_tokens:
+            chunks.append(current)
+            current, current_tokens = "", 0
+        current = f"{current}\n\n{piece}" if current else piece
+        current_tokens += piece_tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _summary_text(response) -> str:
+    """模型响应转为文本：普通调用为 AIMessage，structured_output 时为 pydantic 对象或 dict"""
+    if isinstance(response, AIMessage):
+        if isinstance(response.content, list):
+            return "".join(
+                p.get("text", "") if isinstance(p, dict) else str(p)
+                for p in response.content
+            )
+        return str(response.content)
+    if isinstance(response, BaseModel):
+        return response.model_dump_json()
+    return json.dumps(response, ensure_ascii=False, default=str)
+
+
+def _schema_id(structured_output) -> str:
+    """structured_output 的稳定标识：pydantic 类取完整类名，dict schema 取排序后的 JSON"""
+    if structured_output is None:
+        return ""
+    if isinstance(structured_output, type):
+        return f"{structured_output.__module__}.{structured_output.__qualname__}"
+    return json.dumps(
+        structured_output, ensure_ascii=False, sort_keys=True, default=str
+    )
+
+
+def _chunk_cache_key(
+    model_name: str, node_name: str, schema_id: str, chunk: str
+) -> str:
+    return hashlib.sha256(
+        f"{model_name}\n{node_name}\n{schema_id}\n{chunk}".encode("utf-8")
+    ).hexdigest()
+
+
+def _get_cached_summary(key: str) -> str | None:
+    if key in _chunk_summary_cache:
+        _chunk_summary_cache.move_to_end(key)
+        return _chunk_summary_cache[key]
+    return None
+
+
+def _set_cached_summary(key: str, summary: str):
+    _chunk_summary_cache[key] = summary
+    _chunk_summary_cache.move_to_end(key)
+    while len(_chunk_summary_cache) > _CHUNK_CACHE_SIZE:
+        _chunk_summary_cache.popitem(last=False)
+
+
+def _join_within_budget(summaries: list[str], max_tokens: int, model) -> str:
+    """归并轮数用完时，各分块总结按相同份额截断后拼接，每个分块的内容都有保留"""
+    _share = max(max_tokens // len(summaries), 1)
+    return "\n\n".join(str(truncate_if_too_long(s, _share, model)) for s in summaries)
 
 
 # ######################################################################################
@@ -29,8 +153,9 @@ logger = logging.getLogger(__name__)
 def create_webpage_summarize_node(
     node_name="webpage_summarize", *, tools=None, structured_output=None
 ):
-    """对上下文进行总结， 目的是缩小上下文的长度，防止token溢出"""
+    """对网页内容进行 map-reduce 分块总结， 目的是缩小上下文的长度，防止token溢出"""
     _hook = get_super_agent_hooks()
+    _schema = _schema_id(structured_output)
 
     async def _before_model_hooks(context):
         # 核心：组装提示词
@@ -63,6 +188,38 @@ def create_webpage_summarize_node(
             update={"data": {"result": response.content}},
         )
 
+    async def _summarize_chunk(
+        chunk: str, thread_id, model_name, config, chunk_tokens: int, model
+    ) -> tuple[str, bool]:
+        """返回 (总结, 是否成功)"""
+        _key = _chunk_cache_key(model_name, node_name, _schema, chunk)
+        _cached = _get_cached_summary(_key)
+        if _cached is not None:
+            return _cached, True
+
+        async with _get_chunk_semaphore():
+            try:
+                response = await get_llms_provider().llm_wrap_hooks(
+                    thread_id,
+                    node_name,
+                    await _before_model_hooks(chunk),
+                    model_name,
+                    tools=tools,
+                    structured_output=structured_output,
+                    **config,  # type: ignore
+                )
+                _summary = _summary_text(response)
+            except Exception as e:
+                # 单个分块失败不影响整体，退化为原文开头的片段（比分块短，归并时不会重复失败同样的内容）
+                logger.warning(f"summarize chunk failed, fallback to excerpt: {e}")
+                _excerpt = truncate_if_too_long(
+                    chunk, max(chunk_tokens // _FAILED_EXCERPT_RATIO, 1), model
+                )
+                return str(_excerpt), False
+
+        _set_cached_summary(_key, _summary)
+        return _summary, True
+
     @_hook.node_with_hooks(node_name="webpage_summarize")
     async def _node(state: SuperState, runtime: Runtime[SuperContext]):
         # 获取运行时变量
@@ -86,44 +243,60 @@ def create_webpage_summarize_node(
                 update={"code": -1, "messages": [AIMessage(content="No messages")]},
             )
 
-        # if isinstance(_messages[-1], ToolMessage):
-        #     return Command(
-        #         goto="__end__",
-        #     )
+        _context = str(_messages[-1].content)
 
-        _context = _messages[-1].content
+        # 分块大小：不超过模型输入预算的一半（留出提示词和输出的空间）
+        _budget_provider = get_context_budget_provider()
+        _model = _budget_provider.get_model(_model_name)
+        _conf = CONF.Summarize
+        _chunk_tokens = min(
+            _conf.max_chunk_tokens,
+            _budget_provider.get_input_budget(_model_name) // 2,
+        )
 
-        max_retries = 4
-        current_retry = 0
-        while current_retry <= max_retries:  # 尝试3次, 防止因为上下文过长，导致失败
-            try:
-                # 模型执行前
-                response = await _before_model_hooks(_context)
-                # 4 大模型
-                response = await get_llms_provider().llm_wrap_hooks(
-                    _thread_id,
-                    node_name,
-                    response,
-                    _model_name,
-                    tools=tools,
-                    structured_output=structured_output,
-                    **_config,  # type: ignore
-                )
-                log_info_set_color(
-                    _thread_id, node_name, truncate_if_too_long(response.content)
+        # map: 分块并发总结；reduce: 总结合并后仍超长则继续归并
+        _round = 0
+        _chunks = split_markdown_chunks(_context, _chunk_tokens, _model)
+        while True:
+            _results = await asyncio.gather(
+                *[
+                    _summarize_chunk(
+                        c, _thread_id, _model_name, _config, _chunk_tokens, _model
+                    )
+                    for c in _chunks
+                ]
+            )
+            _round += 1
+            _failed = sum(1 for _, ok in _results if not ok)
+            if _failed > len(_results) * _conf.max_failure_ratio:
+                return Command(
+                    update={
+                        "code": 1,
+                        "err_message": f"summarize failed: {_failed}/{len(_results)} chunks failed",
+                    },
                 )
-                return await _after_model_hooks(response, state, runtime)
 
-            except Exception as e:
-                token_limit = int(len(_context) * 0.8)
-                logger.warning(
-                    f"current_retry: {current_retry}, summarize reducing the chars to: {token_limit}, exec: {e}"
+            _summaries = [s for s, _ in _results]
+            if len(_summaries) == 1:
+                _result = _summaries[0]
+                break
+
+            _merged = "\n\n".join(_summaries)
+            _chunks = split_markdown_chunks(_merged, _chunk_tokens, _model)
+            if _round >= _conf.max_reduce_rounds:
+                _result = (
+                    _merged
+                    if len(_chunks) == 1
+                    else _join_within_budget(_summaries, _chunk_tokens, _model)
                 )
-                _context = _context[:token_limit]
-                current_retry += 1
+                break
 
-        # 模型执行后
-        return Command(goto="__end__")
+        log_info_set_color(
+            _thread_id,
+            node_name,
+            f"chunks reduce rounds={_round}, {truncate_if_too_long(_result)}",
+        )
+        return await _after_model_hooks(AIMessage(content=_result), state, runtime)
 
     return _node
 
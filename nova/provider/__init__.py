@@ -5,8 +5,13 @@
 from __future__ import annotations
 
 from nova import CONF
+from nova.utils.url_fetcher import SogouUrlFetcher
 
+from .browser_pool import BrowserPoolProvider
+from .context_budget import ContextBudgetProvider
+from .crawl_scheduler import CrawlSchedulerProvider
 from .llm import LLMSProvider
+from .page_fetcher import PageFetcherProvider
 from .qwen3_embeddings import Qwen3EmbeddingsProvider
 from .skill_hook import SkillsProvider
 from .super_agent_hooks import SuperAgentHooks
@@ -20,6 +25,11 @@ _singleton_skill_provider_instance: SkillsProvider | None = None
 
 _singleton_qwen3_embeddings_instance: Qwen3EmbeddingsProvider | None = None
 
+_singleton_browser_pool_instance: BrowserPoolProvider | None = None
+_singleton_crawl_scheduler_instance: CrawlSchedulerProvider | None = None
+_singleton_page_fetcher_instance: PageFetcherProvider | None = None
+_singleton_sogou_url_fetcher_instance: SogouUrlFetcher | None = None
+
 
 def get_llms_provider() -> LLMSProvider:
     global _singleton_llms_instance
@@ -28,6 +38,11 @@ def get_llms_provider() -> LLMSProvider:
     return _singleton_llms_instance
 
 
+def get_context_budget_provider() -> ContextBudgetProvider:
+    # 上下文预算与 LLM 配置绑定，直接复用 LLMSProvider 中的实例
+    return get_llms_provider().context_budget
+
+
 def get_prompts_provider() -> PromptsProvider:
     global _singleton_template_instance
     if _singleton_template_instance is None:
@@ -60,3 +75,32 @@ def get_qwen3_embeddings_provider() -> Qwen3EmbeddingsProvider:
             default_model_name=CONF.EMBEDDING.default_model_name,
         )
     return _singleton_qwen3_embeddings_instance
+
+
+def get_browser_pool_provider() -> BrowserPoolProvider:
+    global _singleton_browser_pool_instance
+    if _singleton_browser_pool_instance is None:
+        _singleton_browser_pool_instance = BrowserPoolProvider(CONF.Browser)
+    return _singleton_browser_pool_instance
+
+
+def get_crawl_scheduler_provider() -> CrawlSchedulerProvider:
+    global _singleton_crawl_scheduler_instance
+    if _singleton_crawl_scheduler_instance is None:
+        _singleton_crawl_scheduler_instance = CrawlSchedulerProvider(CONF.CrawlScheduler)
+    return _singleton_crawl_scheduler_instance
+
+
+def get_page_fetcher_provider() -> PageFetcherProvider:
+    global _singleton_page_fetcher_instance
+    if _singleton_page_fetcher_instance is None:
+        _singleton_page_fetcher_instance = PageFetcherProvider(CONF.PageFetcher)
+    return _singleton_page_fetcher_instance
+
+
+def get_sogou_url_fetcher() -> SogouUrlFetcher:
+    # 进程内共享 Cookie 池、连接池与限速
+    global _singleton_sogou_url_fetcher_instance
+    if _singleton_sogou_url_fetcher_instance is None:
+        _singleton_sogou_url_fetcher_instance = SogouUrlFetcher()
+    return _singleton_sogou_url_fetcher_instance
@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+# @Time   : 2026/03/20
+# @Author : zip
+# @Moto   : Knowledge comes from decomposition
+from __future__ import annotations
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Optional
+
+from crawl4ai import AsyncWebCrawler, BrowserConfig
+from playwright.async_api import Browser, BrowserContext, Playwright, async_playwright
+
+from nova.model.config import BrowserPoolConfig
+
+logger = logging.getLogger(__name__)
+
+# ######################################################################################
+# 全局变量
+_LAUNCH_ARGS = [
+    "--blink-settings=imagesEnabled=false",  # 禁用图片加载（提速）
+    "--disable-blink-features=AutomationControlled",  # 隐藏自动化标记
+    "--disable-features=IsolateOrigins,site-per-process",  # 关闭站点隔离（减少指纹差异）
+    "--no-sandbox",  # 容器环境必备（避免权限问题）
+    "--disable-gpu",  # 禁用GPU加速（减少资源占用）
+    "--disable-dev-shm-usage",
+    "--disable-extensions",
+    "--disable-infobars",
+    "--disable-notifications",
+    "--disable-sync",
+    "--ignore-certificate-errors",
+]
+
+
+class _PooledBrowser:
+    """池中的单个浏览器实例，记录服务过的页面数，到期后不再分配新 context，使用计数归零后关闭"""
+
+    def __init__(self, browser: Browser):
+        self.browser = browser
+        self.pages_served = 0
+        self.in_use = 0
+        self.retired = False
+
+    @property
+    def is_healthy(self) -> bool:
+        return self.browser.is_connected()
+
+
+class _PooledCrawler:
+    """常驻的 crawl4ai crawler，到期或浏览器断开后由新实例接替，旧实例在使用计数归零后关闭"""
+
+    def __init__(self, crawler: AsyncWebCrawler):
+        self.crawler = crawler
+        self.pages_served = 0
+        self.in_use = 0
+        self.retired = False
+
+    @property
+    def is_healthy(self) -> bool:
+        # crawl4ai 未公开浏览器状态，经 crawler_strategy.browser_manager.browser 检查连接
+        if not getattr(self.crawler, "ready", True):
+            return False
+        _manager = getattr(
+            getattr(self.crawler, "crawler_strategy", None), "browser_manager", None
+        )
+        _browser = getattr(_manager, "browser", None)
+        return _browser is None or _browser.is_connected()
+
+
+class BrowserPoolProvider:
+    """
+    进程级无头浏览器池，web_crawl / web_serp / wechat_serp / wechat_crawl 共享
+
+    1. start() / close(): 在 FastAPI lifespan 中启动与关闭（未启动时首次使用会懒启动）
+
+    2. acquire_context(**context_kwargs) -> BrowserContext
+        - 每次调用得到一个独立的 BrowserContext（cookie/存储互不干扰），用完自动关闭
+        - 同时打开的 context 数不超过 max_browsers * max_contexts_per_browser
+        - 浏览器崩溃或服务页面数达到 recycle_after_pages 后自动回收重建，
+          到期的浏览器不再分配新 context，由新实例接替，已打开的 context 关闭后再关闭
+
+    3. acquire_crawler() -> AsyncWebCrawler
+        - crawl4ai 自带浏览器管理，这里常驻一个 crawler 实例
+        - 服务页面数达到 recycle_after_pages 或浏览器断开后，新请求改用新实例，
+          旧实例待正在进行的请求结束后关闭
+    """
+
+    def __init__(self, config: BrowserPoolConfig):
+        self.config = config
+        self._lock = asyncio.Lock()
+        self._playwright: Optional[Playwright] = None
+        self._browsers: list[_PooledBrowser] = []
+        # 已到期、仍有 context 在使用的旧浏览器（不计入 max_browsers）
+        self._retired_browsers: set[_PooledBrowser] = set()
+        self._context_semaphore = asyncio.Semaphore(
+            config.max_browsers * config.max_contexts_per_browser
+        )
+
+        self._crawler: Optional[_PooledCrawler] = None
+        # 已被接替、仍有请求在使用的旧实例
+        self._retired_crawlers: set[_PooledCrawler] = set()
+        self._crawler_semaphore = asyncio.Semaphore(config.max_crawler_pages)
+
+    # ─── 生命周期 ───
+    async def start(self):
+        async with self._lock:
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+                logger.info("[BrowserPool] playwright started")
+            # 预热一个浏览器，避免首个请求承担启动开销
+            if not self._browsers:
+                self._browsers.append(await self._launch_browser())
+
+    async def close(self):
+        async with self._lock:
+            for _pooled in self._browsers:
+                await self._close_browser(_pooled)
+            self._browsers.clear()
+            for _pooled in self._retired_browsers:
+                await self._close_browser(_pooled)
+            self._retired_browsers.clear()
+            if self._crawler is not None:
+                await self._close_crawler(self._crawler.crawler)
+                self._crawler = None
+            for _pooled in self._retired_crawlers:
+                await self._close_crawler(_pooled.crawler)
+            self._retired_crawlers.clear()
+            if self._playwright is not None:
+                await self._playwright.stop()
+                self._playwright = None
+            logger.info("[BrowserPool] closed")
+
+    # ─── playwright 浏览器 ───
+    async def _launch_browser(self) -> _PooledBrowser:
+        assert self._playwright is not None
+        browser = await self._playwright.chromium.launch(
+            headless=self.config.headless, args=_LAUNCH_ARGS
+        )
+        logger.info(f"[BrowserPool] launched browser, total={len(self._browsers) + 1}")
+        return _PooledBrowser(browser)
+
+    @staticmethod
+    async def _close_browser(pooled: _PooledBrowser):
+        try:
+            if pooled.browser.is_connected():
+                await pooled.browser.close()
+        except Exception as e:
+            logger.warning(f"[BrowserPool] close browser failed: {e}")
+
+    async def _retire_browser(self, pooled: _PooledBrowser):
+        """新 context 不再使用该浏览器；无人使用时立即关闭，否则由最后一个使用者关闭"""
+        pooled.retired = True
+        logger.info(
+            f"[BrowserPool] recycled browser, pages_served={pooled.pages_served}, "
+            f"healthy={pooled.is_healthy}, in_use={pooled.in_use}"
+        )
+        if pooled.in_use == 0 or not pooled.is_healthy:
+            await self._close_browser(pooled)
+        else:
+            self._retired_browsers.add(pooled)
+
+    async def _pick_browser(self) -> _PooledBrowser:
+        if self._playwright is None:
+            await self.start()
+
+        async with self._lock:
+            # 崩溃的浏览器直接关闭；到期的移出池子，由新实例接替
+            for _pooled in list(self._browsers):
+                if (
+                    not _pooled.is_healthy
+                    or _pooled.pages_served >= self.config.recycle_after_pages
+                ):
+                    self._browsers.remove(_pooled)
+                    await self._retire_browser(_pooled)
+
+            # 优先选择负载最低的浏览器
+            _candidates = [
+                b
+                for b in self._browsers
+                if b.in_use < self.config.max_contexts_per_browser
+            ]
+            if _candidates:
+                _pooled = min(_candidates, key=lambda b: b.in_use)
+            elif len(self._browsers) < self.config.max_browsers:
+                _pooled = await self._launch_browser()
+                self._browsers.append(_pooled)
+            else:
+                # context 总数受信号量限制，正常不会走到这里
+                _pooled = min(self._browsers, key=lambda b: b.in_use)
+
+            _pooled.in_use += 1
+            return _pooled
+
+    @asynccontextmanager
+    async def acquire_context(self, **context_kwargs: Any) -> AsyncIterator[BrowserContext]:
+        async with self._context_semaphore:
+            _pooled = await self._pick_browser()
+            context: Optional[BrowserContext] = None
+            try:
+                context = await _pooled.browser.new_context(**context_kwargs)
+                yield context
+            finally:
+                _pooled.in_use -= 1
+                _pooled.pages_served += 1
+                if context is not None:
+                    try:
+                        await context.close()
+                    except Exception as e:
+                        logger.warning(f"[BrowserPool] close context failed: {e}")
+                if _pooled.retired and _pooled.in_use == 0:
+                    if _pooled in self._retired_browsers:
+                        self._retired_browsers.discard(_pooled)
+                        await self._close_browser(_pooled)
+
+    # ─── crawl4ai crawler ───
+    async def _new_crawler(self) -> AsyncWebCrawler:
+        crawler = AsyncWebCrawler(
+            config=BrowserConfig(
+                browser_type="chromium",
+                headless=self.config.headless,
+                extra_args=_LAUNCH_ARGS,
+            )
+        )
+        await crawler.start()
+        logger.info("[BrowserPool] crawl4ai crawler started")
+        return crawler
+
+    @staticmethod
+    async def _close_crawler(crawler: AsyncWebCrawler):
+        try:
+            await crawler.close()
+        except Exception as e:
+            logger.warning(f"[BrowserPool] close crawler failed: {e}")
+
+    async def _retire_crawler(self, pooled: _PooledCrawler):
+        """新请求不再使用该实例；无人使用时立即关闭，否则由最后一个使用者关闭"""
+        pooled.retired = True
+        logger.info(
+            f"[BrowserPool] recycled crawler, pages_served={pooled.pages_served}, "
+            f"healthy={pooled.is_healthy}, in_use={pooled.in_use}"
+        )
+        if pooled.in_use == 0:
+            await self._close_crawler(pooled.crawler)
+        else:
+            self._retired_crawlers.add(pooled)
+
+    @asynccontextmanager
+    async def acquire_crawler(self) -> AsyncIterator[AsyncWebCrawler]:
+        async with self._crawler_semaphore:
+            async with self._lock:
+                _current = self._crawler
+                if _current is not None and (
+                    _current.pages_served >= self.config.recycle_after_pages
+                    or not _current.is_healthy
+                ):
+                    self._crawler = None
+                    await self._retire_crawler(_current)
+                if self._crawler is None:
+                    self._crawler = _PooledCrawler(await self._new_crawler())
+                _pooled = self._crawler
+                _pooled.in_use += 1
+            try:
+                yield _pooled.crawler
+            finally:
+                _pooled.in_use -= 1
+                _pooled.pages_served += 1
+                if _pooled.retired and _pooled.in_use == 0:
+                    self._retired_crawlers.discard(_pooled)
+                    await self._close_crawler(_pooled.crawler)
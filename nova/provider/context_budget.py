@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+# @Time   : 2026/03/20
+# @Author : zip
+# @Moto   : Knowledge comes from decomposition
+from __future__ import annotations
+
+import logging
+from collections import OrderedDict
+from typing import Any
+
+from langchain_core.messages import BaseMessage, SystemMessage, ToolMessage
+
+from nova.model.config import LLMConfig
+from nova.utils.token_utils import count_message_tokens, truncate_text_by_tokens
+
+logger = logging.getLogger(__name__)
+
+# ######################################################################################
+# 全局变量
+_DEFAULT_CONTEXT_WINDOW = 32768
+# 单条消息最多占用预算的比例（主要针对网页/文件等超长工具结果）
+_MAX_SINGLE_MESSAGE_RATIO = 0.25
+_TRUNCATION_GUIDANCE = "\n... [内容超出上下文预算被截断]"
+# 消息 token 数缓存的条目上限
+_TOKEN_CACHE_SIZE = 4096
+
+
+def _message_key(message: BaseMessage) -> tuple:
+    """按消息类型 + 内容哈希标识消息，截断后的副本内容不同，不会命中原消息的缓存"""
+    _content = message.content
+    if not isinstance(_content, str):
+        _content = str(_content)
+    _tool_calls = getattr(message, "tool_calls", None)
+    return (
+        type(message).__name__,
+        hash(_content),
+        hash(str(_tool_calls)) if _tool_calls else 0,
+    )
+
+
+class ContextBudgetProvider:
+    """
+    上下文预算管理，在调用 LLM 之前保证 messages 不超出模型上下文窗口
+
+    1. get_input_budget(model_name: str) -> int  模型可用的输入 token 数
+
+    2. count_tokens(messages: list, model_name: str) -> int
+
+    3. fit_messages(messages: list, model_name: str) -> list
+        - 先截断超长的单条消息（工具返回的网页、文件内容等）
+        - 仍然超出时，保留 system 消息 + 第一条任务消息，从尾部向前保留最近的消息
+        - 最后一条消息总是保留（工具结果连同发起调用的 AI 消息），放不下时截断
+    """
+
+    def __init__(self, llm_config: LLMConfig):
+        self.llm_config = llm_config
+        # model_name -> (litellm 模型名, 输入预算)
+        self._budget_cache: dict[str, tuple[str, int]] = {}
+        self._init_budget_cache()
+        # (litellm 模型名, 消息标识) -> token 数；每次调用 LLM 都要统计整段历史，已统计过的消息直接复用
+        self._token_cache: OrderedDict[tuple, int] = OrderedDict()
+
+    def _init_budget_cache(self):
+        for _instance in self.llm_config.model_list:
+            _model = _instance.litellm_params.model
+            _window = _instance.context_window or self._lookup_context_window(_model)
+            _budget = max(_window - _instance.reserved_output_tokens, _window // 2)
+            self._budget_cache[_instance.model_name] = (_model, _budget)
+
+    @staticmethod
+    def _lookup_context_window(model: str) -> int:
+        # 未配置 context_window 时，从 litellm 的模型信息中推断
+        try:
+            from litellm import get_model_info  # type: ignore
+
+            _info = get_model_info(model)
+            return int(
+                _info.get("max_input_tokens")
+                or _info.get("max_tokens")
+                or _DEFAULT_CONTEXT_WINDOW
+            )
+        except Exception:
+            return _DEFAULT_CONTEXT_WINDOW
+
+    def get_model(self, model_name: str) -> str | None:
+        if model_name in self._budget_cache:
+            return self._budget_cache[model_name][0]
+        return None
+
+    def get_input_budget(self, model_name: str) -> int:
+        if model_name in self._budget_cache:
+            return self._budget_cache[model_name][1]
+        return _DEFAULT_CONTEXT_WINDOW
+
+    def _count_message(self, message: Any, model: str | None) -> int:
+        if not isinstance(message, BaseMessage):
+            return count_message_tokens(message, model)
+        _key = (model, _message_key(message))
+        _tokens = self._token_cache.get(_key)
+        if _tokens is not None:
+            self._token_cache.move_to_end(_key)
+            return _tokens
+        _tokens = count_message_tokens(message, model)
+        self._token_cache[_key] = _tokens
+        if len(self._token_cache) > _TOKEN_CACHE_SIZE:
+            self._token_cache.popitem(last=False)
+        return _tokens
+
+    @staticmethod
+    def _clip_message(message: BaseMessage, max_tokens: int, model: str | None):
+        _content, _ = truncate_text_by_tokens(message.content, max_tokens, model)
+        return message.model_copy(update={"content": _content + _TRUNCATION_GUIDANCE})
+
+    def count_tokens(self, messages: list[Any], model_name: str) -> int:
+        _model = self.get_model(model_name)
+        return sum(self._count_message(m, _model) for m in messages)
+
+    def fit_messages(self, messages: list[Any], model_name: str) -> list[Any]:
+        """按模型的上下文预算裁剪 messages（不修改原列表）"""
+        if not messages or not all(isinstance(m, BaseMessage) for m in messages):
+            return messages
+
+        _model = self.get_model(model_name)
+        _budget = self.get_input_budget(model_name)
+
+        _counts = [self._count_message(m, _model) for m in messages]
+        _total = sum(_counts)
+        if _total <= _budget:
+            return messages
+
+        # 第一步：截断超长的单条消息
+        _single_limit = int(_budget * _MAX_SINGLE_MESSAGE_RATIO)
+        _messages = list(messages)
+        for i, _msg in enumerate(_messages):
+            if _counts[i] <= _single_limit or not isinstance(_msg.content, str):
+                continue
+            if isinstance(_msg, SystemMessage):
+                continue
+            _messages[i] = self._clip_message(_msg, _single_limit, _model)
+            _counts[i] = self._count_message(_messages[i], _model)
+
+        _fitted_total = sum(_counts)
+        if _fitted_total <= _budget:
+            logger.warning(
+                f"[ContextBudget] {model_name}: {_total} -> {_fitted_total} tokens (budget {_budget}), truncated long messages"
+            )
+            return _messages
+
+        # 第二步：保留 system 消息 + 第一条任务消息，剩余预算从尾部向前填充
+        _head_idx = [i for i, m in enumerate(_messages) if isinstance(m, SystemMessage)]
+        _first_task = next(
+            (i for i, m in enumerate(_messages) if not isinstance(m, SystemMessage)),
+            None,
+        )
+        if _first_task is not None:
+            _head_idx.append(_first_task)
+        _remaining = _budget - sum(_counts[i] for i in _head_idx)
+
+        # 最后一条消息（本轮输入 / 最新的工具结果）必须保留，工具结果连同发起调用的 AI 消息
+        _last = len(_messages) - 1
+        _group = [] if _last in _head_idx else [_last]
+        while (
+            _group
+            and isinstance(_messages[_group[0]], ToolMessage)
+            and _group[0] > 0
+            and _group[0] - 1 not in _head_idx
+        ):
+            _group.insert(0, _group[0] - 1)
+        _group_total = sum(_counts[i] for i in _group)
+        if _group_total > _remaining:
+            # 放不下时，在剩余预算内平均截断其中的工具结果 / 最后一条消息
+            _clippable = [
+                i
+                for i in _group
+                if (i == _last or isinstance(_messages[i], ToolMessage))
+                and isinstance(_messages[i].content, str)
+            ]
+            _fixed = _group_total - sum(_counts[i] for i in _clippable)
+            _share = max((_remaining - _fixed) // max(len(_clippable), 1), 1)
+            for i in _clippable:
+                if _counts[i] > _share:
+                    _messages[i] = self._clip_message(_messages[i], _share, _model)
+                    _counts[i] = self._count_message(_messages[i], _model)
+        _remaining -= sum(_counts[i] for i in _group)
+
+        _tail_idx: list[int] = []
+        for i in range((_group[0] if _group else len(_messages)) - 1, -1, -1):
+            if i in _head_idx:
+                continue
+            if _counts[i] > _remaining:
+                break
+            _tail_idx.append(i)
+            _remaining -= _counts[i]
+        _tail_idx.reverse()
+
+        # 工具结果不能脱离发起调用的 AI 消息单独出现
+        while _tail_idx and isinstance(_messages[_tail_idx[0]], ToolMessage):
+            _tail_idx.pop(0)
+        _tail_idx += _group
+
+        _kept = sorted(set(_head_idx)) + [i for i in _tail_idx if i not in _head_idx]
+        _result = [_messages[i] for i in _kept]
+        logger.warning(
+            f"[ContextBudget] {model_name}: {_total} -> {sum(_counts[i] for i in _kept)} tokens (budget {_budget}), "
+            f"messages {len(messages)} -> {len(_result)}"
+        )
+        return _result
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+# @Time   : 2026/03/20
+# @Author : zip
+# @Moto   : Knowledge comes from decomposition
+from __future__ import annotations
+
+import asyncio
+import fnmatch
+import logging
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, TypeVar
+from urllib.parse import urlparse
+
+from nova.model.config import CrawlSchedulerConfig
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# 非 URL 的 key（如检索词）共用的虚拟域名
+_NON_URL_DOMAIN = "__non_url__"
+
+
+class _DomainSlot:
+    """单个域名的并发与访问间隔控制"""
+
+    def __init__(self, concurrency: int, interval: float):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.interval = interval
+        self.lock = asyncio.Lock()
+        self.next_allowed = 0.0
+        self.users = 0  # 正在执行或排队等待的任务数
+
+    @property
+    def is_idle(self) -> bool:
+        """无人使用且访问间隔已过，此时丢弃与新建的 slot 等价"""
+        return self.users == 0 and time.monotonic() >= self.next_allowed
+
+    async def wait_turn(self):
+        # 按最小间隔错开同一域名的请求开始时间
+        async with self.lock:
+            _now = time.monotonic()
+            _wait = self.next_allowed - _now
+            self.next_allowed = max(_now, self.next_allowed) + self.interval
+        if _wait > 0:
+            await asyncio.sleep(_wait)
+
+
+class CrawlSchedulerProvider:
+    """
+    进程级爬取调度器，web_search / wechat_search 的 SERP 与网页爬取都经由这里
+
+    1. run(key, fn) -> T
+        - 全局并发不超过 max_concurrency
+        - 同一域名并发不超过 per_domain_concurrency，且请求开始时间间隔不小于 domain 间隔
+        - 单个任务超时 task_timeout，超时抛出 asyncio.TimeoutError
+
+    2. as_completed(keys, fn, detach_pending=False) -> AsyncIterator[(key, result | Exception)]
+        - 按完成顺序产出结果，慢任务不阻塞快任务的后续处理
+        - 单个任务的异常 / 超时作为结果返回，不影响其它任务
+        - 调用方提前退出（如截止时间到）时默认取消未完成的任务；
+          detach_pending=True 时任务转入后台继续执行（用于继续填充爬取缓存）
+    """
+
+    def __init__(self, config: CrawlSchedulerConfig):
+        self.config = config
+        self._global_semaphore = asyncio.Semaphore(config.max_concurrency)
+        # 空闲的 slot 随时清理，数量与正在访问的域名数相当，不随访问过的域名增长
+        self._domains: dict[str, _DomainSlot] = {}
+        # 转入后台的任务，持有引用防止被 GC 回收
+        self._background_tasks: set[asyncio.Future] = set()
+
+    @staticmethod
+    def domain_of(key: str) -> str:
+        # key 一般是 URL；非 URL（如检索词）统一归到同一个虚拟域名
+        return urlparse(key).netloc.lower() or _NON_URL_DOMAIN
+
+    def interval_for(self, domain: str) -> float:
+        for pattern, interval in self.config.domain_interval.items():
+            if fnmatch.fnmatch(domain, pattern.lower()):
+                return interval
+        return self.config.per_domain_interval
+
+    def _slot(self, domain: str) -> _DomainSlot:
+        # 清理空闲的 slot
+        _idle = [d for d, s in self._domains.items() if d != domain and s.is_idle]
+        for _domain in _idle:
+            del self._domains[_domain]
+
+        if domain not in self._domains:
+            self._domains[domain] = _DomainSlot(
+                self.config.per_domain_concurrency, self.interval_for(domain)
+            )
+        return self._domains[domain]
+
+    async def run(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[T]],
+        domain: str | None = None,
+    ) -> T:
+        _slot = self._slot(domain or self.domain_of(key))
+        _slot.users += 1
+        try:
+            async with _slot.semaphore:
+                await _slot.wait_turn()
+                async with self._global_semaphore:
+                    return await asyncio.wait_for(
+                        fn(), timeout=self.config.task_timeout
+                    )
+        finally:
+            _slot.users -= 1
+
+    async def as_completed(
+        self,
+        keys: Iterable[str],
+        fn: Callable[[str], Awaitable[T]],
+        domain: str | None = None,
+        detach_pending: bool = False,
+    ) -> AsyncIterator[tuple[str, T | BaseException]]:
+        async def _run_one(_key: str) -> tuple[str, Any]:
+            try:
+                return _key, await self.run(_key, lambda: fn(_key), domain)
+            except asyncio.TimeoutError:
+                logger.warning(
+                    f"[CrawlScheduler] {_key} timeout after {self.config.task_timeout}s"
+                )
+                return _key, asyncio.TimeoutError(f"timeout: {_key}")
+            except Exception as e:
+                logger.warning(f"[CrawlScheduler] {_key} failed: {e}")
+                return _key, e
+
+        _tasks = [asyncio.ensure_future(_run_one(k)) for k in keys]
+        try:
+            for _next in asyncio.as_completed(_tasks):
+                yield await _next
+        finally:
+            # 调用方提前退出时，取消（或转入后台）尚未完成的任务
+            _pending = [t for t in _tasks if not t.done()]
+            for _task in _pending:
+                if detach_pending:
+                    self._background_tasks.add(_task)
+                    _task.add_done_callback(self._background_tasks.discard)
+                else:
+                    _task.cancel()
+            if _pending:
+                logger.info(
+                    f"[CrawlScheduler] {len(_pending)} pending tasks "
+                    f"{'detached to background' if detach_pending else 'cancelled'}"
+                )
+
+    async def close(self):
+        """取消所有后台任务（进程退出时调用）"""
+        for _task in list(self._background_tasks):
+            _task.cancel()
+        if self._background_tasks:
+            await asyncio.gather(*self._background_tasks, return_exceptions=True)
+        self._background_tasks.clear()
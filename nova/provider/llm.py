@@ -19,6 +19,7 @@ from nova.controller.llm_exceptions import (
 )
 from nova.memory import SQLITECACHE
 from nova.model.config import LLMConfig
+from nova.provider.context_budget import ContextBudgetProvider
 from nova.utils.log_utils import log_error_set_color, log_info_set_color
 
 # ######################################################################################
@@ -47,10 +48,15 @@ class LLMSProvider:
         # 配置来源：格式参考 litellm.Router 要求
         self.llm_instance_cache: dict[str, ChatLiteLLM] = {}
         self._init_llm_instance_cache()
+        # 上下文预算：调用前按模型窗口裁剪 messages，避免 LLMContextExceededError
+        self.context_budget = ContextBudgetProvider(llm_config)
 
     def _init_llm_instance_cache(self):
         # 初始化 LiteLLM 路由实例：支持多模型路由、故障转移、负载均衡
-        _model_list = [_.model_dump() for _ in self.llm_config.model_list]
+        _model_list = [
+            _.model_dump(include={"model_name", "litellm_params"})
+            for _ in self.llm_config.model_list
+        ]
         _litellm_router = Router(model_list=_model_list)
         for _instance in self.llm_config.model_list:
             _name = _instance.model_name
@@ -86,6 +92,7 @@ class LLMSProvider:
         structured_output: 结构化输出定义
         invoke_kwargs: 调用参数
         """
+        messages = self.context_budget.fit_messages(messages, model_name)
         await self.before_llm(thread_id, node_name, messages)
 
         try:
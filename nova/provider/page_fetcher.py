@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+# @Time   : 2026/03/20
+# @Author : zip
+# @Moto   : Knowledge comes from decomposition
+from __future__ import annotations
+
+import asyncio
+import fnmatch
+import logging
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional
+from urllib.parse import urlparse
+
+import httpx
+
+from nova.model.config import PageFetcherConfig
+
+logger = logging.getLogger(__name__)
+
+# ######################################################################################
+# 全局变量
+_DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
+}
+
+# 典型的前端渲染页面特征：空的挂载节点 / 要求开启 JavaScript 的提示
+_JS_SHELL_PATTERNS = [
+    re.compile(r'<div[^>]+id=["\'](root|app|__next|__nuxt)["\'][^>]*>\s*</div>', re.I),
+    re.compile(r"<noscript>[^<]*(enable|启用|开启)\s*javascript", re.I),
+    re.compile(r"(please|请)\s*(enable|启用|开启)\s*javascript", re.I),
+]
+
+_META_CHARSET_PATTERN = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.I)
+
+# 按域名学习结果最多保留的域名数，超出时淘汰最久未更新的
+_MAX_LEARNED_DOMAINS = 4096
+
+
+def _sniff_encoding(raw: bytes) -> str:
+    # 响应头未声明编码时，从 <meta charset> 中识别（国内站点常见 gbk / gb2312）
+    _match = _META_CHARSET_PATTERN.search(raw[:4096])
+    if _match:
+        return _match.group(1).decode("ascii", errors="ignore") or "utf-8"
+    return "utf-8"
+
+
+@dataclass
+class StaticPage:
+    url: str
+    status: int
+    html: str
+    headers: dict[str, str]
+
+
+@dataclass
+class _DomainStat:
+    render_streak: int = 0  # 连续需要渲染的次数
+    updated_at: float = field(default_factory=time.time)
+
+
+class PageFetcherProvider:
+    """
+    网页分级抓取：先用连接池复用的 HTTP GET 抓取，静态页面无需启动浏览器
+
+    1. fetch(url) -> StaticPage | None
+        - 非 HTML、状态码异常、超过 max_bytes、网络错误时返回 None
+
+    2. looks_js_rendered(html, text) -> bool
+        - 正文过短，或命中前端渲染页面的特征时认为需要浏览器渲染
+
+    3. should_render(url) / record(url, rendered)
+        - 按域名记录是否需要渲染，连续 learn_threshold 次需要渲染的域名直接走浏览器
+        - 只记录 HTTP 抓取成功的结果，404、网络错误等不代表页面依赖 JS
+        - 学习结果 learn_ttl_hours 后过期，重新探测；最多保留 _MAX_LEARNED_DOMAINS 个域名
+    """
+
+    def __init__(self, config: PageFetcherConfig):
+        self.config = config
+        self._client: Optional[httpx.AsyncClient] = None
+        # 按 updated_at 排序，最早更新的在前
+        self._domains: OrderedDict[str, _DomainStat] = OrderedDict()
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                headers=_DEFAULT_HEADERS,
+                timeout=self.config.timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(
+                    max_connections=self.config.max_connections,
+                    max_keepalive_connections=self.config.max_connections,
+                ),
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    # ─── 按域名学习 ───
+    @staticmethod
+    def _domain(url: str) -> str:
+        return urlparse(url).netloc.lower()
+
+    def should_render(self, url: str) -> bool:
+        if not self.config.enable_static:
+            return True
+        _domain = self._domain(url)
+        for pattern in self.config.render_domains:
+            if fnmatch.fnmatch(_domain, pattern.lower()):
+                return True
+
+        _stat = self._domains.get(_domain)
+        if _stat is None:
+            return False
+        if time.time() - _stat.updated_at > self.config.learn_ttl_hours * 3600:
+            # 学习结果过期，重新探测
+            self._domains.pop(_domain, None)
+            return False
+        return _stat.render_streak >= self.config.learn_threshold
+
+    def record(self, url: str, rendered: bool):
+        """记录一次 HTTP 抓取成功的结果：rendered=True 表示页面依赖 JS 渲染，升级到了浏览器"""
+        _domain = self._domain(url)
+        _stat = self._domains.setdefault(_domain, _DomainStat())
+        _stat.render_streak = _stat.render_streak + 1 if rendered else 0
+        _stat.updated_at = time.time()
+        self._domains.move_to_end(_domain)
+        while len(self._domains) > _MAX_LEARNED_DOMAINS:
+            self._domains.popitem(last=False)
+        if rendered and _stat.render_streak == self.config.learn_threshold:
+            logger.info(f"[PageFetcher] {_domain} marked as render-required")
+
+    # ─── HTTP 抓取 ───
+    async def fetch(self, url: str) -> Optional[StaticPage]:
+        try:
+            async with self._get_client().stream("GET", url) as response:
+                _content_type = response.headers.get("content-type", "")
+                if response.status_code != 200 or "html" not in _content_type:
+                    logger.debug(
+                        f"[PageFetcher] {url} status={response.status_code} type={_content_type}"
+                    )
+                    return None
+
+                _chunks = []
+                _size = 0
+                async for _chunk in response.aiter_bytes():
+                    _size += len(_chunk)
+                    if _size > self.config.max_bytes:
+                        logger.debug(f"[PageFetcher] {url} exceeds max_bytes")
+                        return None
+                    _chunks.append(_chunk)
+
+                _raw = b"".join(_chunks)
+                _encoding = response.charset_encoding or _sniff_encoding(_raw)
+                _html = _raw.decode(_encoding, errors="replace")
+                return StaticPage(
+                    url=str(response.url),
+                    status=response.status_code,
+                    html=_html,
+                    headers=dict(response.headers),
+                )
+        except (
+            httpx.HTTPError,
+            httpx.InvalidURL,
+            asyncio.TimeoutError,
+            LookupError,
+        ) as e:
+            logger.debug(f"[PageFetcher] fetch {url} failed: {e}")
+            return None
+
+    def looks_js_rendered(self, html: str, text: str) -> bool:
+        if len(text) < self.config.min_text_chars:
+            return True
+        return any(p.search(html) for p in _JS_SHELL_PATTERNS) and len(text) < (
+            self.config.min_text_chars * 3
+        )
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+# @Time   : 2026/03/20
+# @Author : zip
+# @Moto   : Knowledge comes from decomposition
+from __future__ import annotations
+
+import mmap
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager, suppress
+from pathlib import Path
+from typing import BinaryIO, Iterator
+
+"""
+文件编辑的原子写入与大文件流式替换
+
+* 新内容先写入同目录下的临时文件，再 os.replace 覆盖原文件：
+  并发读取要么看到旧文件，要么看到完整的新文件，不会读到写了一半的内容
+* 大文件通过 mmap 查找匹配，分块拷贝到临时文件，内存占用与文件大小无关
+* UTF-8 是自同步编码，按字节匹配与按字符串匹配的结果（非重叠、从左到右）一致
+"""
+
+# 拷贝未修改区间时每次写入的块大小
+_COPY_CHUNK = 4 * 1024 * 1024
+
+
+@contextmanager
+def atomic_writer(path: Path) -> Iterator[BinaryIO]:
+    """写入同目录临时文件，成功后保留原文件权限并原子替换"""
+    fd, tmp_path = tempfile.mkstemp(
+        dir=path.parent, prefix=f".{path.name}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            yield f
+        if path.exists():
+            shutil.copymode(path, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        with suppress(FileNotFoundError):
+            os.unlink(tmp_path)
+        raise
+
+
+def _copy_range(mm: mmap.mmap, out: BinaryIO, start: int, end: int):
+    while start < end:
+        _next = min(start + _COPY_CHUNK, end)
+        out.write(mm[start:_next])
+        start = _next
+
+
+def stream_replace(
+    path: Path,
+    old_string: str,
+    new_string: str,
+    replace_all: bool,
+) -> int | str:
+    """大文件字符串替换，语义与 perform_string_replacement 一致
+
+    Returns:
+        替换次数；校验失败时返回错误信息
+    """
+    if not old_string:
+        return "Error: old_string must not be empty"
+    old = old_string.encode("utf-8")
+    new = new_string.encode("utf-8")
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        # 第一遍：只统计出现次数（写入前校验），不记录位置，内存占用恒定
+        occurrences = 0
+        pos = mm.find(old)
+        while pos != -1:
+            occurrences += 1
+            pos = mm.find(old, pos + len(old))
+
+        if occurrences == 0:
+            return f"Error: String not found in file: '{old_string}'"
+        if occurrences > 1 and not replace_all:
+            return (
+                f"Error: String '{old_string}' appears {occurrences} times in file. "
+                f"Use replace_all=True to replace all instances, or provide a more "
+                f"specific string with surrounding context."
+            )
+
+        # 第二遍：分块拷贝未修改区间，写入替换内容
+        with atomic_writer(path) as out:
+            _prev = 0
+            pos = mm.find(old)
+            while pos != -1:
+                _copy_range(mm, out, _prev, pos)
+                out.write(new)
+                _prev = pos + len(old)
+                pos = mm.find(old, _prev)
+            _copy_range(mm, out, _prev, len(mm))
+    return occurrences
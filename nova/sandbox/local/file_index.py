@@ -0,0 +1,375 @@
+# -*- coding: utf-8 -*-
+# @Time   : 2026/03/20
+# @Author : zip
+# @Moto   : Knowledge comes from decomposition
+from __future__ import annotations
+
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Iterator, TypeVar
+
+import wcmatch.glob as wcglob
+
+from nova.sandbox.local.utils import MAX_FILE_SIZE_MB, should_ignore
+
+logger = logging.getLogger(__name__)
+
+"""
+工作目录文件索引（glob / grep / ls 直接从内存回答）
+
+* 目录树（按目录分层的前缀树），记录每个文件的 mtime / size
+* 增量刷新：只重新列出 mtime 变化的目录（目录的增删改名都会改变其 mtime）
+* 沙箱自身的 write / edit 调用精确通知变更；execute 之后整体标记为待校验；
+  外部修改在 staleness 秒内被发现
+* grep 的文件内容按 (mtime, size) 缓存，总大小有上限；先整文件匹配，命中后才按行切分
+* 文件数超过 max_files 的目录（如 /）不建索引，调用方退回原有的遍历方式
+* 索引包含所有文件，查询时按原有实现过滤：ls 同 utils.list_dir 跳过 IGNORE_PATTERNS，
+  glob 同 Path.rglob 不过滤，grep 同 ripgrep 的默认行为跳过隐藏文件 / 目录（不解析 .gitignore）
+"""
+
+T = TypeVar("T")
+
+# 判定二进制文件时检查的字节数
+_BINARY_SNIFF_BYTES = 8192
+
+
+class _DirNode:
+    __slots__ = ("mtime", "files", "dirs")
+
+    def __init__(self, mtime: int):
+        self.mtime = mtime
+        # 文件名 -> (mtime_ns, size)
+        self.files: dict[str, tuple[int, int]] = {}
+        # 子目录名 -> 节点；符号链接目录只记录不展开，值为 None
+        self.dirs: dict[str, _DirNode | None] = {}
+
+
+class IndexOverflow(Exception):
+    """目录下文件过多，不适合建立索引"""
+
+
+class FileContentCache:
+    """grep 读取的文件内容缓存，按 (mtime, size) 校验，LRU 淘汰"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: OrderedDict[str, tuple[int, int, str | None]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def read(self, path: str) -> str | None:
+        """返回文件文本；二进制 / 非 UTF-8 / 读取失败返回 None"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        with self._lock:
+            cached = self._entries.get(path)
+            if cached is not None and cached[:2] == (st.st_mtime_ns, st.st_size):
+                self._entries.move_to_end(path)
+                return cached[2]
+
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        text: str | None
+        if b"\0" in data[:_BINARY_SNIFF_BYTES]:
+            text = None
+        else:
+            try:
+                text = data.decode("utf-8")
+            except UnicodeDecodeError:
+                text = None
+
+        with self._lock:
+            self._pop(path)
+            self._entries[path] = (st.st_mtime_ns, st.st_size, text)
+            self.size += st.st_size if text is not None else 0
+            while self.size > self.max_bytes and self._entries:
+                self._pop(next(iter(self._entries)))
+        return text
+
+    def _pop(self, path: str):
+        old = self._entries.pop(path, None)
+        if old is not None and old[2] is not None:
+            self.size -= old[1]
+
+    def invalidate(self, path: str):
+        with self._lock:
+            self._pop(path)
+
+
+class FileIndex:
+    """单个工作目录的文件索引"""
+
+    def __init__(self, root: Path, max_files: int, staleness: float):
+        self.root = root
+        self.max_files = max_files
+        self.staleness = staleness
+        self._node: _DirNode | None = None
+        self._file_count = 0
+        self._dirty = True
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def mark_dirty(self):
+        self._dirty = True
+
+    # ─── 构建与增量刷新 ───
+    def _scan(self, path: str, node: _DirNode, old: _DirNode | None):
+        """列出目录，子目录 mtime 未变化时复用旧节点"""
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir():
+                        if entry.is_symlink():
+                            node.dirs[entry.name] = None
+                            continue
+                        _old_child = old.dirs.get(entry.name) if old else None
+                        node.dirs[entry.name] = self._refresh_dir(
+                            entry.path, _old_child, entry.stat().st_mtime_ns
+                        )
+                    else:
+                        st = entry.stat()
+                        node.files[entry.name] = (st.st_mtime_ns, st.st_size)
+                        self._file_count += 1
+                        if self._file_count > self.max_files:
+                            raise IndexOverflow(str(self.root))
+                except (PermissionError, FileNotFoundError):
+                    continue
+
+    def _refresh_dir(self, path: str, node: _DirNode | None, mtime: int) -> _DirNode:
+        if node is not None and node.mtime == mtime:
+            # 目录项未变化，文件的 mtime / size 在读取内容时再校验
+            self._file_count += len(node.files)
+            if self._file_count > self.max_files:
+                raise IndexOverflow(str(self.root))
+            for name, child in list(node.dirs.items()):
+                if child is None:
+                    continue
+                try:
+                    _mtime = os.stat(os.path.join(path, name)).st_mtime_ns
+                except OSError:
+                    node.dirs.pop(name)
+                    continue
+                node.dirs[name] = self._refresh_dir(
+                    os.path.join(path, name), child, _mtime
+                )
+            return node
+
+        _new = _DirNode(mtime)
+        try:
+            self._scan(path, _new, node)
+        except (PermissionError, FileNotFoundError):
+            pass
+        return _new
+
+    def refresh(self, force: bool = False):
+        """按需增量刷新；超过 max_files 时抛出 IndexOverflow"""
+        with self._lock:
+            _now = time.monotonic()
+            if (
+                not force
+                and not self._dirty
+                and _now - self._checked_at < self.staleness
+            ):
+                return
+            self._dirty = False
+            self._file_count = 0
+            _mtime = os.stat(self.root).st_mtime_ns
+            self._node = self._refresh_dir(str(self.root), self._node, _mtime)
+            self._checked_at = time.monotonic()
+
+    # ─── 查询 ───
+    def _find(self, path: Path) -> _DirNode | None:
+        node = self._node
+        if path == self.root:
+            return node
+        for part in path.relative_to(self.root).parts:
+            if node is None:
+                return None
+            node = node.dirs.get(part)
+        return node
+
+    def _walk(
+        self, path: str, node: _DirNode, skip_hidden: bool
+    ) -> Iterator[tuple[str, tuple[int, int]]]:
+        for name, meta in node.files.items():
+            if not (skip_hidden and name.startswith(".")):
+                yield os.path.join(path, name), meta
+        for name, child in node.dirs.items():
+            if child is not None and not (skip_hidden and name.startswith(".")):
+                yield from self._walk(os.path.join(path, name), child, skip_hidden)
+
+    def files(
+        self, under: Path, skip_hidden: bool = False
+    ) -> list[tuple[str, tuple[int, int]]]:
+        """under 下的所有文件；skip_hidden 时跳过以 . 开头的文件与目录（under 本身除外）"""
+        self.refresh()
+        with self._lock:
+            node = self._find(under)
+            if node is None:
+                return []
+            return list(self._walk(str(under), node, skip_hidden))
+
+    def glob(self, pattern: str, under: Path) -> list[str]:
+        """与 Path.rglob(pattern) 一致：pattern 可匹配任意深度，只返回文件"""
+        matcher = wcglob.compile(
+            f"**/{pattern}", flags=wcglob.GLOBSTAR | wcglob.DOTGLOB
+        )
+        _base = str(under)
+        return [
+            path
+            for path, _ in self.files(under)
+            if matcher.match(os.path.relpath(path, _base))
+        ]
+
+    def list_dir(self, under: Path, max_depth: int = 2) -> list[str]:
+        """与 utils.list_dir 一致：目录以 / 结尾，按路径排序"""
+        self.refresh()
+        result: list[str] = []
+
+        def _traverse(path: str, node: _DirNode, depth: int):
+            for name in node.files:
+                if not should_ignore(name):
+                    result.append(os.path.join(path, name))
+            for name, child in node.dirs.items():
+                if should_ignore(name):
+                    continue
+                _child_path = os.path.join(path, name)
+                result.append(_child_path + "/")
+                if child is not None and depth < max_depth:
+                    _traverse(_child_path, child, depth + 1)
+
+        with self._lock:
+            node = self._find(under)
+            if node is not None:
+                _traverse(str(under), node, 1)
+        return sorted(result)
+
+
+class FileIndexRegistry:
+    """
+    按工作目录管理文件索引（进程级共享）
+
+    1. index_for(path) -> FileIndex | None
+        - 复用覆盖该路径的已有索引，否则以该目录为根新建
+        - 目录过大（超过 max_files）的目录被记住，不再重复尝试
+
+    2. glob / list_dir / grep
+        - 文件列表来自索引，grep 的内容来自缓存
+        - 无法建立索引（目录过大、不存在）时返回 None，调用方退回原有的遍历方式
+
+    3. notify_change(path) / mark_dirty()
+        - 沙箱写入 / 编辑文件后精确失效；执行命令后所有索引待校验
+    """
+
+    def __init__(
+        self,
+        max_indexes: int,
+        max_files: int,
+        staleness: float,
+        content_cache_bytes: int,
+    ):
+        self.max_indexes = max_indexes
+        self.max_files = max_files
+        self.staleness = staleness
+        self.content_cache = FileContentCache(content_cache_bytes)
+        self._indexes: OrderedDict[Path, FileIndex] = OrderedDict()
+        self._too_large: set[Path] = set()
+        self._lock = threading.Lock()
+
+    def index_for(self, path: Path) -> FileIndex | None:
+        if not path.is_dir():
+            return None
+        with self._lock:
+            for root, index in self._indexes.items():
+                if path == root or root in path.parents:
+                    self._indexes.move_to_end(root)
+                    return index
+            # 过大的目录及其上级目录都不建索引
+            if any(path == big or path in big.parents for big in self._too_large):
+                return None
+            index = FileIndex(path, self.max_files, self.staleness)
+            self._indexes[path] = index
+            # 新索引覆盖了的子目录索引不再需要
+            for root in [r for r in self._indexes if path in r.parents]:
+                self._indexes.pop(root)
+            while len(self._indexes) > self.max_indexes:
+                self._indexes.popitem(last=False)
+            return index
+
+    def _query(self, under: Path, fn: Callable[[FileIndex], T]) -> T | None:
+        """在覆盖 under 的索引上执行查询；无法建立索引时返回 None，由调用方退回原有方式"""
+        index = self.index_for(under if under.is_dir() else under.parent)
+        if index is None:
+            return None
+        try:
+            return fn(index)
+        except IndexOverflow:
+            logger.info(f"[FileIndex] {index.root} has too many files, not indexed")
+            with self._lock:
+                self._indexes.pop(index.root, None)
+                self._too_large.add(index.root)
+        except OSError as e:
+            logger.debug(f"[FileIndex] query {under} failed: {e}")
+            with self._lock:
+                self._indexes.pop(index.root, None)
+        return None
+
+    def glob(self, pattern: str, under: Path) -> list[str] | None:
+        return self._query(under, lambda index: index.glob(pattern, under))
+
+    def list_dir(self, under: Path, max_depth: int = 2) -> list[str] | None:
+        return self._query(under, lambda index: index.list_dir(under, max_depth))
+
+    def grep(
+        self, pattern: str, under: Path, include_glob: str | None
+    ) -> dict[str, list[tuple[int, str]]] | None:
+        regex = re.compile(pattern)
+        # 整文件预匹配用 MULTILINE，保证 ^ / $ 按行语义不漏匹配
+        prefilter = re.compile(pattern, regex.flags | re.MULTILINE)
+
+        def _search(index: FileIndex) -> dict[str, list[tuple[int, str]]]:
+            if under.is_file():
+                candidates = [(str(under), (0, under.stat().st_size))]
+            else:
+                candidates = index.files(under, skip_hidden=True)
+
+            results: dict[str, list[tuple[int, str]]] = {}
+            for path, (_, size) in candidates:
+                if size > MAX_FILE_SIZE_MB * 1024 * 1024:
+                    continue
+                if include_glob and not wcglob.globmatch(
+                    os.path.basename(path), include_glob, flags=wcglob.BRACE
+                ):
+                    continue
+                text = self.content_cache.read(path)
+                # 先整文件匹配，绝大多数文件不命中，无需按行切分
+                if not text or not prefilter.search(text):
+                    continue
+                for line_num, line in enumerate(text.splitlines(), 1):
+                    if regex.search(line):
+                        results.setdefault(path, []).append((line_num, line))
+            return results
+
+        return self._query(under, _search)
+
+    def notify_change(self, path: Path):
+        self.content_cache.invalidate(str(path))
+        with self._lock:
+            for root, index in self._indexes.items():
+                if root in path.parents:
+                    index.mark_dirty()
+
+    def mark_dirty(self):
+        with self._lock:
+            for index in self._indexes.values():
+                index.mark_dirty()
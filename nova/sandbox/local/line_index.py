@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+# @Time   : 2026/03/20
+# @Author : zip
+# @Moto   : Knowledge comes from decomposition
+from __future__ import annotations
+
+import mmap
+import os
+import threading
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
+from itertools import accumulate
+
+"""
+大文件按行分页读取
+
+* 为文件建立稀疏行偏移索引：每 _STRIDE 行记录一次行首字节偏移
+* 索引按 (path, mtime, size) 缓存，文件变化后自动重建
+* 读取一页时从最近的检查点开始，通过 mmap 向后定位，代价约为 O(页大小 + _STRIDE)
+* 行以 \\n 分隔，行尾的 \\r 被去掉（与 str.splitlines 对 \\r\\n 的处理一致）
+"""
+
+# 检查点间隔（行）
+_STRIDE = 256
+# 构建索引时每次读取的块大小
+_BUILD_CHUNK = 4 * 1024 * 1024
+# 缓存的索引数
+_MAX_CACHED = 32
+
+
+@dataclass
+class LineIndex:
+    mtime_ns: int
+    size: int
+    line_count: int
+    # checkpoints[i] 为第 i * _STRIDE 行（从 0 开始）的行首偏移
+    checkpoints: array
+
+
+def _build_line_index(path: str, mtime_ns: int, size: int) -> LineIndex:
+    checkpoints = array("q", [0])
+    newlines = 0  # 已经过的换行符数量
+    base = 0
+    _last = b""
+    with open(path, "rb") as f:
+        while chunk := f.read(_BUILD_CHUNK):
+            # 每个换行符之后（下一行行首）在块内的偏移，全部在 C 层完成
+            parts = chunk.split(b"\n")
+            line_starts = list(accumulate(map((1).__add__, map(len, parts[:-1]))))
+            # 第 newlines + k + 1 行从 line_starts[k] 开始，只保留 _STRIDE 整数倍的行
+            first = -(newlines + 1) % _STRIDE
+            checkpoints.extend(base + p for p in line_starts[first::_STRIDE])
+            newlines += len(line_starts)
+            base += len(chunk)
+            _last = chunk[-1:]
+
+    # 最后一行没有换行符时也算一行
+    line_count = newlines + (1 if size and _last != b"\n" else 0)
+    return LineIndex(mtime_ns, size, line_count, checkpoints)
+
+
+_cache: OrderedDict[str, LineIndex] = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def get_line_index(path: str) -> LineIndex:
+    st = os.stat(path)
+    with _cache_lock:
+        index = _cache.get(path)
+        if index is not None and (index.mtime_ns, index.size) == (
+            st.st_mtime_ns,
+            st.st_size,
+        ):
+            _cache.move_to_end(path)
+            return index
+
+    index = _build_line_index(path, st.st_mtime_ns, st.st_size)
+    with _cache_lock:
+        _cache[path] = index
+        _cache.move_to_end(path)
+        while len(_cache) > _MAX_CACHED:
+            _cache.popitem(last=False)
+    return index
+
+
+def read_line_range(path: str, offset: int, limit: int) -> tuple[list[str], int]:
+    """读取 [offset, offset + limit) 行
+
+    Returns:
+        (行内容列表, 文件总行数)；offset 超出文件行数时行列表为空
+
+    Raises:
+        UnicodeDecodeError: 所读的行不是合法的 UTF-8
+    """
+    index = get_line_index(path)
+    if offset >= index.line_count or limit <= 0:
+        return [], index.line_count
+
+    lines: list[str] = []
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        _size = len(mm)
+        pos = index.checkpoints[offset // _STRIDE]
+        # 从检查点跳到目标行
+        for _ in range(offset % _STRIDE):
+            pos = mm.find(b"\n", pos) + 1
+            if pos == 0:
+                return [], index.line_count
+
+        end_line = min(offset + limit, index.line_count)
+        for _ in range(end_line - offset):
+            if pos >= _size:
+                break
+            end = mm.find(b"\n", pos)
+            if end == -1:
+                end = _size
+            line = mm[pos:end]
+            if line.endswith(b"\r"):
+                line = line[:-1]
+            lines.append(line.decode("utf-8"))
+            pos = end + 1
+    return lines, index.line_count
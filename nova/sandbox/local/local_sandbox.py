@@ -4,10 +4,14 @@
 # @Moto   : Knowledge comes from decomposition
 from __future__ import annotations
 
+import asyncio
+import codecs
 import logging
 import os
 import re
 import subprocess
+import time
+from concurrent.futures import Executor
 from pathlib import Path
 from typing import Literal
 
@@ -24,13 +28,42 @@ from nova.sandbox.local.utils import (
     truncate_if_too_long,
     validate_path,
 )
-from nova.sandbox.sandbox import Sandbox
+from nova.sandbox.local.file_edit import atomic_writer, stream_replace
+from nova.sandbox.local.file_index import FileIndexRegistry
+from nova.sandbox.local.line_index import read_line_range
+from nova.sandbox.local.path_rewriter import PathRewriter, StreamingPathRewriter
+from nova.sandbox.local.resource_limits import SandboxLauncher
+from nova.sandbox.local.shell_session import (
+    OutputRingBuffer,
+    ShellSession,
+    ShellSessionClosed,
+    ShellSessionManager,
+    kill_process_group,
+)
+from nova.sandbox.sandbox import ExecuteOutputCallback, Sandbox
+from nova.utils.token_utils import truncate_text_tail_by_tokens
 
 logger = logging.getLogger(__name__)
 
 
+# execute 读取子进程输出的块大小
+_EXECUTE_READ_CHUNK = 4096
+
+
 class LocalSandbox(Sandbox):
-    def __init__(self, id: str, path_mappings: dict[str, str] | None = None):
+    def __init__(
+        self,
+        id: str,
+        path_mappings: dict[str, str] | None = None,
+        executor: Executor | None = None,
+        execute_timeout: int = 600,
+        execute_output_max_bytes: int = 1024 * 1024,
+        execute_result_max_tokens: int = 8000,
+        shell_sessions: ShellSessionManager | None = None,
+        launcher: SandboxLauncher | None = None,
+        file_index: FileIndexRegistry | None = None,
+        large_file_bytes: int = 8 * 1024 * 1024,
+    ):
         """
         Initialize local sandbox with optional path mappings.
 
@@ -38,9 +71,51 @@ class LocalSandbox(Sandbox):
             id: Sandbox identifier
             path_mappings: Dictionary mapping container paths to local paths
                           Example: {"/mnt/skills": "/absolute/path/to/skills"}
+            executor: Bounded thread pool for blocking file operations (async variants)
+            execute_timeout: Timeout in seconds for execute / aexecute
+            execute_output_max_bytes: Ring buffer size per output stream for aexecute
+            execute_result_max_tokens: Token limit of the aexecute result (tail is kept)
+            shell_sessions: Persistent per-thread shell sessions; None disables them
+            launcher: Applies resource limits (rlimit / cgroup) to spawned processes
+            file_index: Workspace file index answering glob / grep / ls from memory
+            large_file_bytes: Files at least this large are read by line ranges
+                and edited by streaming replacement
         """
         super().__init__(id)
         self.path_mappings = path_mappings or {}
+        # 路径映射只编译一次：命令中 容器路径 -> 本地路径，输出中 本地路径 -> 容器路径
+        self._to_local = PathRewriter(self.path_mappings)
+        self._to_container = PathRewriter(
+            {
+                str(Path(local_path).resolve()): container_path
+                for container_path, local_path in self.path_mappings.items()
+            }
+        )
+        self._executor = executor
+        self.execute_timeout = execute_timeout
+        self.execute_output_max_bytes = execute_output_max_bytes
+        self.execute_result_max_tokens = execute_result_max_tokens
+        self.shell_sessions = shell_sessions
+        self.launcher = launcher
+        self.file_index = file_index
+        self.large_file_bytes = large_file_bytes
+        self.last_used = time.monotonic()
+
+    def touch(self):
+        self.last_used = time.monotonic()
+
+    def _notify_change(self, path: Path):
+        if self.file_index is not None:
+            self.file_index.notify_change(path)
+
+    def _mark_index_dirty(self):
+        if self.file_index is not None:
+            self.file_index.mark_dirty()
+
+    @property
+    def busy(self) -> bool:
+        """是否有命令正在常驻 shell 中执行"""
+        return self.shell_sessions is not None and self.shell_sessions.busy
 
     def _reverse_resolve_path(self, path: str) -> str:
         """
@@ -52,23 +127,7 @@ class LocalSandbox(Sandbox):
         Returns:
             Container path if mapping exists, otherwise original path
         """
-        path_str = str(Path(path).resolve())
-
-        # Try each mapping (longest local path first for more specific matches)
-        for container_path, local_path in sorted(
-            self.path_mappings.items(), key=lambda x: len(x[1]), reverse=True
-        ):
-            local_path_resolved = str(Path(local_path).resolve())
-            if path_str.startswith(local_path_resolved):
-                # Replace the local path prefix with container path
-                relative = path_str[len(local_path_resolved) :].lstrip("/")
-                resolved = (
-                    f"{container_path}/{relative}" if relative else container_path
-                )
-                return resolved
-
-        # No mapping found, return original path
-        return path_str
+        return self._to_container.rewrite(str(Path(path).resolve()))
 
     def _reverse_resolve_paths_in_output(self, output: str) -> str:
         """
@@ -80,33 +139,7 @@ class LocalSandbox(Sandbox):
         Returns:
             Output with local paths resolved to container paths
         """
-        import re
-
-        # Sort mappings by local path length (longest first) for correct prefix matching
-        sorted_mappings = sorted(
-            self.path_mappings.items(), key=lambda x: len(x[1]), reverse=True
-        )
-
-        if not sorted_mappings:
-            return output
-
-        # Create pattern that matches absolute paths
-        # Match paths like /Users/... or other absolute paths
-        result = output
-        for container_path, local_path in sorted_mappings:
-            local_path_resolved = str(Path(local_path).resolve())
-            # Escape the local path for use in regex
-            escaped_local = re.escape(local_path_resolved)
-            # Match the local path followed by optional path components
-            pattern = re.compile(escaped_local + r"(?:/[^\s\"';&|<>()]*)?")
-
-            def replace_match(match: re.Match) -> str:
-                matched_path = match.group(0)
-                return self._reverse_resolve_path(matched_path)
-
-            result = pattern.sub(replace_match, result)
-
-        return result
+        return self._to_container.rewrite(output)
 
     def _resolve_paths_in_command(self, command: str) -> str:
         """
@@ -118,30 +151,7 @@ class LocalSandbox(Sandbox):
         Returns:
             Command with container paths resolved to local paths
         """
-        import re
-
-        # Sort mappings by length (longest first) for correct prefix matching
-        sorted_mappings = sorted(
-            self.path_mappings.items(), key=lambda x: len(x[0]), reverse=True
-        )
-
-        # Build regex pattern to match all container paths
-        # Match container path followed by optional path components
-        if not sorted_mappings:
-            return command
-
-        # Create pattern that matches any of the container paths
-        patterns = [
-            re.escape(container_path) + r"(?:/[^\s\"';&|<>()]*)??"
-            for container_path, _ in sorted_mappings
-        ]
-        pattern = re.compile("|".join(f"({p})" for p in patterns))
-
-        def replace_match(match: re.Match) -> str:
-            matched_path = match.group(0)
-            return str(resolve_path(matched_path))
-
-        return pattern.sub(replace_match, command)
+        return self._to_local.rewrite(command)
 
     def read_file(self, file_path: str, offset: int, limit: int) -> str:
         # 判断路径
@@ -154,6 +164,10 @@ class LocalSandbox(Sandbox):
             return f"Error: File '{file_path}' not found"
 
         try:
+            # 大文件按行索引分页读取，每页代价与页大小相关而不是文件大小
+            if validated_path.stat().st_size >= self.large_file_bytes:
+                return self._read_file_range(validated_path, file_path, offset, limit)
+
             # 尽可能使用O_NOFOLLOW标志打开文件以避免符号链接遍历
             fd = os.open(validated_path, os.O_RDONLY | getattr(os, "O_NOFOLLOW", 0))
             with os.fdopen(fd, "r", encoding="utf-8") as f:
@@ -176,6 +190,22 @@ class LocalSandbox(Sandbox):
         except (OSError, PermissionError) as e:
             return f"Error reading file '{file_path}': {e}"
 
+    def _read_file_range(
+        self, validated_path: Path, file_path: str, offset: int, limit: int
+    ) -> str:
+        if validated_path.is_symlink():
+            # 与 O_NOFOLLOW 的行为保持一致
+            return f"Error reading file '{file_path}': symbolic link not allowed"
+        try:
+            selected_lines, line_count = read_line_range(
+                str(validated_path), offset, limit
+            )
+        except UnicodeDecodeError as e:
+            return f"Error reading file '{file_path}': {e}"
+        if not selected_lines:
+            return f"Error: Line offset {offset} exceeds file length ({line_count} lines)"
+        return format_content_with_line_numbers(selected_lines, start_line=offset + 1)
+
     def write_file(self, file_path: str, content: str, append: bool = False) -> str:
 
         # 判断路径
@@ -196,6 +226,7 @@ class LocalSandbox(Sandbox):
             mode = "a" if append else "w"
             with os.fdopen(fd, mode, encoding="utf-8") as f:
                 f.write(content)
+            self._notify_change(validated_path)
 
             return f"Wrote file {file_path}"
 
@@ -226,6 +257,18 @@ class LocalSandbox(Sandbox):
             return f"Error: File '{file_path}' not found"
 
         try:
+            # 大文件通过 mmap 查找、分块写入，内存占用与文件大小无关
+            if validated_path.stat().st_size >= self.large_file_bytes:
+                if validated_path.is_symlink():
+                    return f"Error editing file '{file_path}': symbolic link not allowed"
+                result = stream_replace(
+                    validated_path, old_string, new_string, replace_all
+                )
+                if isinstance(result, str):
+                    return result
+                self._notify_change(validated_path)
+                return f"Successfully replaced {result} instance(s) of the string in '{file_path}'"
+
             fd = os.open(validated_path, os.O_RDONLY | getattr(os, "O_NOFOLLOW", 0))
             with os.fdopen(fd, "r", encoding="utf-8") as f:
                 content = f.read()
@@ -238,15 +281,14 @@ class LocalSandbox(Sandbox):
             result = perform_string_replacement(
                 content, old_string, new_string, replace_all
             )
+            if isinstance(result, str):
+                return result
             new_content, occurrences = result
 
-            # Write securely
-            flags = os.O_WRONLY | os.O_TRUNC
-            if hasattr(os, "O_NOFOLLOW"):
-                flags |= os.O_NOFOLLOW
-            fd = os.open(validated_path, flags)
-            with os.fdopen(fd, "w", encoding="utf-8") as f:
-                f.write(new_content)
+            # 写入临时文件后原子替换，并发读取不会看到写了一半的文件
+            with atomic_writer(validated_path) as f:
+                f.write(new_content.encode("utf-8"))
+            self._notify_change(validated_path)
 
             return f"Successfully replaced {int(occurrences)} instance(s) of the string in '{file_path}'"
 
@@ -264,7 +306,11 @@ class LocalSandbox(Sandbox):
             return f"Error: dir '{path}' not found"
 
         try:
-            result = list_dir(str(validated_path))
+            result = None
+            if self.file_index is not None:
+                result = self.file_index.list_dir(validated_path)
+            if result is None:
+                result = list_dir(str(validated_path))
 
             result = truncate_if_too_long(result)
 
@@ -288,17 +334,21 @@ class LocalSandbox(Sandbox):
         if not validated_path.exists() or not validated_path.is_dir():
             return f"Error: File '{path}' not found"
         try:
-            result = []
-            for matched_path in validated_path.rglob(pattern):
-                try:
-                    is_file = matched_path.is_file()
-                except OSError:
-                    continue
-                if not is_file:
-                    continue
-
-                abs_path = str(matched_path)
-                result.append(abs_path)
+            result = None
+            if self.file_index is not None:
+                result = self.file_index.glob(pattern, validated_path)
+            if result is None:
+                result = []
+                for matched_path in validated_path.rglob(pattern):
+                    try:
+                        is_file = matched_path.is_file()
+                    except OSError:
+                        continue
+                    if not is_file:
+                        continue
+
+                    abs_path = str(matched_path)
+                    result.append(abs_path)
             result = truncate_if_too_long(result)
 
             if not result:
@@ -330,7 +380,12 @@ class LocalSandbox(Sandbox):
 
         if not validated_path.exists():
             return f"Error: File '{path}' not found"
-        results = ripgrep_search(pattern, validated_path, glob)
+        results = None
+        if self.file_index is not None:
+            results = self.file_index.grep(pattern, validated_path, glob)
+
+        if results is None:
+            results = ripgrep_search(pattern, validated_path, glob)
 
         if results is None:
             results = python_search(pattern, validated_path, glob)
@@ -352,27 +407,261 @@ class LocalSandbox(Sandbox):
 
         return str(formatted)
 
+    def _format_execute_output(
+        self, stdout: str, stderr: str, returncode: int | None
+    ) -> str:
+        output = stdout
+        if stderr:
+            output += f"\nStd Error:\n{stderr}" if output else stderr
+        if returncode:
+            output += f"\nExit Code: {returncode}"
+
+        final_output = output if output else "(no output)"
+        # Reverse resolve local paths back to container paths in output
+        return self._reverse_resolve_paths_in_output(final_output)
+
     def execute(self, command: str) -> str:
         # Resolve container paths in command before execution
         resolved_command = self._resolve_paths_in_command(command)
 
-        result = subprocess.run(
-            resolved_command,
-            executable=get_shell(),
-            shell=True,
-            capture_output=True,
-            text=True,
-            timeout=600,
+        if self.launcher is not None:
+            result = self.launcher.run(
+                get_shell(), "-c", resolved_command, timeout=self.execute_timeout
+            )
+        else:
+            result = subprocess.run(
+                resolved_command,
+                executable=get_shell(),
+                shell=True,
+                capture_output=True,
+                text=True,
+                timeout=self.execute_timeout,
+            )
+        self._mark_index_dirty()
+        return self._format_execute_output(
+            result.stdout, result.stderr, result.returncode
         )
-        output = result.stdout
-        if result.stderr:
-            output += f"\nStd Error:\n{result.stderr}" if output else result.stderr
-        if result.returncode != 0:
-            output += f"\nExit Code: {result.returncode}"
 
-        final_output = output if output else "(no output)"
-        # Reverse resolve local paths back to container paths in output
-        return self._reverse_resolve_paths_in_output(final_output)
+    async def aexecute(
+        self,
+        command: str,
+        on_output: ExecuteOutputCallback | None = None,
+        session_id: str | None = None,
+    ) -> str:
+        """异步执行命令：不占用事件循环，超时后终止整个进程组
+
+        Args:
+            command: 要执行的命令
+            on_output: 增量输出回调，每读到一块输出调用一次 (stream, text)
+            session_id: 会话标识（一般为 thread_id），同一会话的命令在同一个常驻 shell 中执行，
+                cwd / 环境变量 / 激活的虚拟环境在多次调用之间保留
+
+        Returns:
+            格式化后的输出（环形缓冲保留末尾，且按 token 截断）
+        """
+        # Resolve container paths in command before execution
+        resolved_command = self._resolve_paths_in_command(command)
+
+        stdout_buffer = OutputRingBuffer(self.execute_output_max_bytes)
+        stderr_buffer = OutputRingBuffer(self.execute_output_max_bytes)
+
+        # 流式输出同样把本地路径改写回容器路径
+        rewriters: dict[str, StreamingPathRewriter] = {}
+        raw_on_output = on_output
+        if on_output is not None and self._to_container:
+            on_output = self._rewrite_output_callback(on_output, rewriters)
+
+        try:
+            if session_id and self.shell_sessions is not None:
+                returncode, timed_out = await self._execute_in_session(
+                    session_id,
+                    resolved_command,
+                    stdout_buffer,
+                    stderr_buffer,
+                    on_output,
+                )
+            else:
+                returncode, timed_out = await self._execute_once(
+                    resolved_command, stdout_buffer, stderr_buffer, on_output
+                )
+        finally:
+            for name, rewriter in rewriters.items():
+                tail = rewriter.flush()
+                if tail and raw_on_output is not None:
+                    await self._emit_output(raw_on_output, name, tail)
+
+        # 命令可能修改了任意文件，文件索引下次查询前重新校验
+        self._mark_index_dirty()
+
+        stdout = stdout_buffer.getvalue()
+        stderr = stderr_buffer.getvalue()
+        if timed_out:
+            stderr = (stderr.rstrip("\n") + "\n" if stderr else "") + (
+                f"Command timed out after {self.execute_timeout} seconds"
+            )
+        output = self._format_execute_output(stdout, stderr, returncode)
+
+        # 命令输出的结尾（报错、退出码）最有价值，截断时保留末尾
+        output, truncated = truncate_text_tail_by_tokens(
+            output, self.execute_result_max_tokens
+        )
+        if truncated:
+            output = "... [output truncated, showing the tail]\n" + output
+        return output
+
+    async def _execute_in_session(
+        self,
+        session_id: str,
+        command: str,
+        stdout_buffer: OutputRingBuffer,
+        stderr_buffer: OutputRingBuffer,
+        on_output: ExecuteOutputCallback | None,
+    ) -> tuple[int | None, bool]:
+        assert self.shell_sessions is not None
+        session = await self.shell_sessions.acquire(session_id)
+        while session is not None:
+            try:
+                # 同一会话的命令串行执行
+                async with session.lock:
+                    if session.is_alive and self.shell_sessions.owns(session):
+                        return await self._run_in_session(
+                            session, command, stdout_buffer, stderr_buffer, on_output
+                        )
+            finally:
+                self.shell_sessions.release(session)
+            # 等待锁期间会话已被丢弃（前一条命令超时 / shell 退出），重新获取
+            session = await self.shell_sessions.acquire(session_id)
+
+        # 所有会话都在使用，退回一次性进程
+        return await self._execute_once(
+            command, stdout_buffer, stderr_buffer, on_output
+        )
+
+    async def _run_in_session(
+        self,
+        session: ShellSession,
+        command: str,
+        stdout_buffer: OutputRingBuffer,
+        stderr_buffer: OutputRingBuffer,
+        on_output: ExecuteOutputCallback | None,
+    ) -> tuple[int | None, bool]:
+        """在会话中执行命令；调用方需持有 session.lock"""
+        assert self.shell_sessions is not None
+        try:
+            returncode = await asyncio.wait_for(
+                session.run(command, stdout_buffer, stderr_buffer, on_output),
+                timeout=self.execute_timeout,
+            )
+            return returncode, False
+        except asyncio.TimeoutError:
+            # 会话中残留正在运行的命令，状态不可信，关闭后下次重建
+            await self.shell_sessions.discard(session)
+            return -9, True
+        except ShellSessionClosed:
+            # 命令中执行了 exit 等导致 shell 退出
+            returncode = session.process.returncode if session.process else None
+            await self.shell_sessions.discard(session)
+            return returncode, False
+        except BaseException:
+            await self.shell_sessions.discard(session)
+            raise
+
+    async def _execute_once(
+        self,
+        command: str,
+        stdout_buffer: OutputRingBuffer,
+        stderr_buffer: OutputRingBuffer,
+        on_output: ExecuteOutputCallback | None,
+    ) -> tuple[int | None, bool]:
+        _spawn = (
+            self.launcher.spawn
+            if self.launcher is not None
+            else asyncio.create_subprocess_exec
+        )
+        process = await _spawn(
+            get_shell(),
+            "-c",
+            command,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            start_new_session=True,  # 独立进程组，超时 / 取消时可以连同子进程一起终止
+        )
+
+        async def _drain(
+            stream: asyncio.StreamReader | None,
+            name: str,
+            buffer: OutputRingBuffer,
+        ):
+            if stream is None:
+                return
+            # 增量解码，避免多字节字符被切断
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+            while True:
+                chunk = await stream.read(_EXECUTE_READ_CHUNK)
+                if not chunk:
+                    break
+                buffer.append(chunk)
+                if on_output is not None:
+                    text = decoder.decode(chunk)
+                    if text:
+                        await self._emit_output(on_output, name, text)
+
+        timed_out = False
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(
+                    _drain(process.stdout, "stdout", stdout_buffer),
+                    _drain(process.stderr, "stderr", stderr_buffer),
+                    process.wait(),
+                ),
+                timeout=self.execute_timeout,
+            )
+        except asyncio.TimeoutError:
+            timed_out = True
+        finally:
+            # 超时或任务被取消时，不留下孤儿进程
+            if process.returncode is None:
+                kill_process_group(process)
+                await process.wait()
+        return process.returncode, timed_out
+
+    def _rewrite_output_callback(
+        self,
+        on_output: ExecuteOutputCallback,
+        rewriters: dict[str, StreamingPathRewriter],
+    ) -> ExecuteOutputCallback:
+        async def _on_output(name: str, text: str):
+            rewriter = rewriters.get(name)
+            if rewriter is None:
+                rewriter = rewriters[name] = self._to_container.stream()
+            text = rewriter.feed(text)
+            if text:
+                await on_output(name, text)
+
+        return _on_output
+
+    @staticmethod
+    async def _emit_output(on_output: ExecuteOutputCallback, name: str, text: str):
+        # 回调异常（如事件通道关闭）不应中断命令执行
+        try:
+            await on_output(name, text)
+        except Exception as e:
+            logger.debug(f"execute output callback failed: {e}")
+
+    async def close_sessions(self, session_id: str | None = None):
+        """关闭常驻 shell 会话；session_id 为空时关闭全部"""
+        if self.shell_sessions is None:
+            return
+        if session_id is None:
+            await self.shell_sessions.close_all()
+        else:
+            await self.shell_sessions.close(session_id)
+
+    def kill_sessions(self):
+        """同步终止全部常驻 shell 会话（无事件循环时使用）"""
+        if self.shell_sessions is not None:
+            self.shell_sessions.kill_all()
 
     def create_subtask(
         self,
@@ -4,19 +4,100 @@
 # @Moto   : Knowledge comes from decomposition
 from __future__ import annotations
 
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from nova import CONF
+from nova.sandbox.local.file_index import FileIndexRegistry
 from nova.sandbox.local.local_sandbox import LocalSandbox
+from nova.sandbox.local.resource_limits import (
+    ResourceLimits,
+    SandboxCgroup,
+    SandboxLauncher,
+)
+from nova.sandbox.local.shell_session import ShellSessionLimiter, ShellSessionManager
+from nova.sandbox.local.utils import get_shell
 from nova.sandbox.sandbox import Sandbox, SandboxProvider
 
+logger = logging.getLogger(__name__)
+
+# 未指定线程时使用的共享沙箱
 _singleton: LocalSandbox | None = None
+_SHARED_SANDBOX_ID = "local"
+# 沙箱文件操作共享的有界线程池
+_io_executor: ThreadPoolExecutor | None = None
+# 各线程沙箱共享的工作目录文件索引
+_file_index: FileIndexRegistry | None = None
+
+
+def _get_io_executor() -> ThreadPoolExecutor:
+    global _io_executor
+    if _io_executor is None:
+        _io_executor = ThreadPoolExecutor(
+            max_workers=CONF.Sandbox.io_workers, thread_name_prefix="sandbox-io"
+        )
+    return _io_executor
+
+
+def _get_file_index() -> FileIndexRegistry | None:
+    global _file_index
+    if _file_index is None and CONF.Sandbox.file_index:
+        _file_index = FileIndexRegistry(
+            max_indexes=CONF.Sandbox.file_index_max_workspaces,
+            max_files=CONF.Sandbox.file_index_max_files,
+            staleness=CONF.Sandbox.file_index_staleness,
+            content_cache_bytes=CONF.Sandbox.file_content_cache_mb * 1024 * 1024,
+        )
+    return _file_index
 
 
 class LocalSandboxProvider(SandboxProvider):
+    """
+    按线程隔离的本地沙箱池
+
+    1. acquire(thread_id) -> sandbox_id
+        - 同一线程复用同一个沙箱（独立的常驻 shell、cgroup），不同线程互不影响
+        - 优先取预热好的空闲沙箱；未指定 thread_id 时返回共享沙箱 "local"
+        - 沙箱数超过 max_sandboxes 时按 LRU 淘汰空闲沙箱，空闲超过 sandbox_idle_timeout 的沙箱被回收
+
+    2. 资源限制：单进程 CPU 时间 / 内存（rlimit），可选的 cgroup v2 沙箱级 CPU / 内存配额，
+       墙钟时间由 execute_timeout 控制
+
+    3. 常驻 shell 会话数上限 max_shell_sessions 由所有沙箱共享
+
+    4. prewarm() 启动时预热 prewarm_sandboxes 个沙箱（含备用 shell）
+    """
+
     def __init__(self):
         """Initialize the local sandbox provider with path mappings."""
         self._path_mappings = self._setup_path_mappings()
+        self._limits = ResourceLimits(
+            cpu_time=CONF.Sandbox.cpu_time_limit,
+            memory_mb=CONF.Sandbox.memory_limit_mb,
+            cgroup_root=CONF.Sandbox.cgroup_root,
+            cgroup_cpu_quota=CONF.Sandbox.cgroup_cpu_quota,
+            cgroup_memory_mb=CONF.Sandbox.cgroup_memory_mb,
+        )
+        self._use_cgroup = SandboxCgroup.available(self._limits.cgroup_root)
+        if self._limits.cgroup_root and not self._use_cgroup:
+            logger.warning(
+                f"[Sandbox] cgroup root {self._limits.cgroup_root} not writable, "
+                f"only rlimit is applied"
+            )
+        # sandbox_id -> 沙箱，按最近使用排序（LRU）
+        self._sandboxes: OrderedDict[str, LocalSandbox] = OrderedDict()
+        self._thread_sandboxes: dict[str, str] = {}
+        self._cgroups: dict[str, SandboxCgroup] = {}
+        # 预热好、尚未分配给线程的沙箱
+        self._warm: list[LocalSandbox] = []
+        self._lock = threading.Lock()
+        self._session_limiter = ShellSessionLimiter(CONF.Sandbox.max_shell_sessions)
 
     def _setup_path_mappings(self) -> dict[str, str]:
         """
@@ -43,23 +124,185 @@ class LocalSandboxProvider(SandboxProvider):
 
         return mappings
 
+    def _create_sandbox(self, sandbox_id: str) -> LocalSandbox:
+        cgroup = None
+        if self._use_cgroup:
+            cgroup = SandboxCgroup(self._limits.cgroup_root, f"nova-{sandbox_id}")
+            if cgroup.create(
+                self._limits.cgroup_cpu_quota, self._limits.cgroup_memory_mb
+            ):
+                self._cgroups[sandbox_id] = cgroup
+            else:
+                cgroup = None
+        launcher = SandboxLauncher(self._limits, cgroup)
+        return LocalSandbox(
+            sandbox_id,
+            path_mappings=self._path_mappings,
+            executor=_get_io_executor(),
+            execute_timeout=CONF.Sandbox.execute_timeout,
+            execute_output_max_bytes=CONF.Sandbox.execute_output_max_bytes,
+            execute_result_max_tokens=CONF.Sandbox.execute_result_max_tokens,
+            shell_sessions=self._create_shell_sessions(launcher),
+            launcher=launcher,
+            file_index=_get_file_index(),
+            large_file_bytes=CONF.Sandbox.large_file_mb * 1024 * 1024,
+        )
+
+    def _create_shell_sessions(
+        self, launcher: SandboxLauncher
+    ) -> ShellSessionManager | None:
+        if not CONF.Sandbox.persistent_shell:
+            return None
+        return ShellSessionManager(
+            shell=get_shell(),
+            max_sessions=CONF.Sandbox.max_shell_sessions,
+            idle_timeout=CONF.Sandbox.shell_idle_timeout,
+            launcher=launcher,
+            limiter=self._session_limiter,
+        )
+
     def acquire(self, thread_id: str | None = None) -> str:
         global _singleton
-        if _singleton is None:
-            _singleton = LocalSandbox("local", path_mappings=self._path_mappings)
-        return _singleton.id
+        if thread_id is None:
+            if _singleton is None:
+                _singleton = self._create_sandbox(_SHARED_SANDBOX_ID)
+            return _singleton.id
+
+        with self._lock:
+            sandbox_id = self._thread_sandboxes.get(thread_id)
+            if sandbox_id is not None and sandbox_id in self._sandboxes:
+                self._sandboxes.move_to_end(sandbox_id)
+                self._sandboxes[sandbox_id].touch()
+                return sandbox_id
+
+            sandbox = (
+                self._warm.pop()
+                if self._warm
+                else self._create_sandbox(f"local-{uuid.uuid4().hex[:12]}")
+            )
+            sandbox.touch()
+            self._sandboxes[sandbox.id] = sandbox
+            self._thread_sandboxes[thread_id] = sandbox.id
+            evicted = self._collect_evictions(keep=sandbox.id)
+        logger.info(f"[Sandbox] thread {thread_id} -> sandbox {sandbox.id}")
+
+        for _sandbox in evicted:
+            self._teardown(_sandbox)
+        self._refill_warm()
+        return sandbox.id
 
     def get(self, sandbox_id: str) -> Sandbox | None:
-        if sandbox_id == "local":
+        if sandbox_id == _SHARED_SANDBOX_ID:
             if _singleton is None:
                 self.acquire()
             return _singleton
-        return None
+        with self._lock:
+            sandbox = self._sandboxes.get(sandbox_id)
+            if sandbox is not None:
+                self._sandboxes.move_to_end(sandbox_id)
+                sandbox.touch()
+        return sandbox
+
+    def _collect_evictions(self, keep: str) -> list[LocalSandbox]:
+        """选出需要回收的沙箱（调用方持有 self._lock）：空闲超时的 + 超出上限的最久未使用者"""
+        _now = time.monotonic()
+        _evicted = []
+        for sandbox_id, sandbox in list(self._sandboxes.items()):
+            _idle = _now - sandbox.last_used > CONF.Sandbox.sandbox_idle_timeout
+            _over = len(self._sandboxes) > CONF.Sandbox.max_sandboxes
+            if not (_idle or _over):
+                break  # 按 LRU 排序，后面的都更新
+            if sandbox.busy or sandbox_id == keep:
+                continue  # 正在执行命令的沙箱 / 刚分配的沙箱不淘汰
+            _evicted.append(self._pop(sandbox_id))
+        return [s for s in _evicted if s is not None]
+
+    def _pop(self, sandbox_id: str) -> LocalSandbox | None:
+        sandbox = self._sandboxes.pop(sandbox_id, None)
+        if sandbox is not None:
+            for thread_id in [
+                t for t, s in self._thread_sandboxes.items() if s == sandbox_id
+            ]:
+                self._thread_sandboxes.pop(thread_id)
+        return sandbox
+
+    def _refill_warm(self):
+        _created = []
+        with self._lock:
+            while len(self._warm) < CONF.Sandbox.prewarm_sandboxes:
+                sandbox = self._create_sandbox(f"local-{uuid.uuid4().hex[:12]}")
+                self._warm.append(sandbox)
+                _created.append(sandbox)
+        # 有事件循环时在后台预先启动 shell
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        for sandbox in _created:
+            if sandbox.shell_sessions is not None:
+                loop.create_task(sandbox.shell_sessions.prewarm())
+
+    async def prewarm(self):
+        """服务启动时预热沙箱"""
+        self._refill_warm()
+        await asyncio.gather(
+            *[s.shell_sessions.prewarm() for s in self._warm if s.shell_sessions],
+            return_exceptions=True,
+        )
+
+    def _teardown(self, sandbox: LocalSandbox):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # 没有运行中的事件循环：会话进程属于已结束的循环，直接同步终止
+            sandbox.kill_sessions()
+            self._remove_cgroup(sandbox.id)
+            return
+        loop.create_task(self._ateardown(sandbox))
+
+    async def _ateardown(self, sandbox: LocalSandbox):
+        await sandbox.close_sessions()
+        self._remove_cgroup(sandbox.id)
+        logger.info(f"[Sandbox] released sandbox {sandbox.id}")
+
+    def _remove_cgroup(self, sandbox_id: str):
+        cgroup = self._cgroups.pop(sandbox_id, None)
+        if cgroup is not None:
+            cgroup.remove()
 
     def release(self, sandbox_id: str) -> None:
-        # LocalSandbox uses singleton pattern - no cleanup needed.
         # Note: This method is intentionally not called by SandboxMiddleware
         # to allow sandbox reuse across multiple turns in a thread.
-        # For Docker-based providers (e.g., AioSandboxProvider), cleanup
-        # happens at application shutdown via the shutdown() method.
-        pass
+        # 线程沙箱从池中移除并终止其 shell；共享沙箱保留，只关闭 shell 会话
+        if sandbox_id == _SHARED_SANDBOX_ID:
+            if _singleton is not None:
+                self._teardown(_singleton)
+            return
+        with self._lock:
+            sandbox = self._pop(sandbox_id)
+        if sandbox is not None:
+            self._teardown(sandbox)
+
+    async def arelease(self, sandbox_id: str) -> None:
+        if sandbox_id == _SHARED_SANDBOX_ID:
+            if _singleton is not None:
+                await _singleton.close_sessions()
+            return
+        with self._lock:
+            sandbox = self._pop(sandbox_id)
+        if sandbox is not None:
+            await self._ateardown(sandbox)
+
+    async def ashutdown(self):
+        """进程退出时关闭全部沙箱"""
+        global _singleton
+        with self._lock:
+            sandboxes = [*self._sandboxes.values(), *self._warm]
+            self._sandboxes.clear()
+            self._thread_sandboxes.clear()
+            self._warm.clear()
+        if _singleton is not None:
+            sandboxes.append(_singleton)
+            _singleton = None
+        for sandbox in sandboxes:
+            await self._ateardown(sandbox)
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+# @Time   : 2026/03/20
+# @Author : zip
+# @Moto   : Knowledge comes from decomposition
+from __future__ import annotations
+
+import re
+
+"""
+容器路径 <-> 本地路径 前缀改写
+
+* 所有映射在构造时编译成一个交替正则（长前缀在前，优先匹配最长前缀），之后每次只做一次扫描
+* 前缀前后都必须是路径边界，/mnt/skills 不会误改写 /mnt/skills2、/home/mnt/skills
+* 大段文本先用 str 查找做预过滤，不包含任何前缀时直接返回
+* StreamingPathRewriter 按块改写流式输出，可能被切断的前缀留到下一块
+"""
+
+# 前缀之后只能是路径分隔符、非路径字符或文本结尾
+_RIGHT_BOUNDARY = r"(?=/|[^\w.-]|$)"
+# 前缀之前不能是路径字符（在替换回调中判断：正则以字面量开头时才能走快速查找）
+_PATH_CHARS = frozenset("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_./-")
+
+
+class PathRewriter:
+    """将文本中的 src 路径前缀替换为 dst 前缀"""
+
+    def __init__(self, mappings: dict[str, str]):
+        _items = sorted(
+            ((k.rstrip("/") or "/", v.rstrip("/") or "/") for k, v in mappings.items()),
+            key=lambda x: len(x[0]),
+            reverse=True,
+        )
+        self._targets = dict(_items)
+        self.max_prefix = max((len(k) for k in self._targets), default=0)
+        self._pattern = (
+            re.compile(
+                "(?:"
+                + "|".join(re.escape(k) for k in self._targets)
+                + ")"
+                + _RIGHT_BOUNDARY
+            )
+            if self._targets
+            else None
+        )
+
+    def __bool__(self) -> bool:
+        return self._pattern is not None
+
+    def _replace(self, match: re.Match) -> str:
+        _start = match.start()
+        if _start and match.string[_start - 1] in _PATH_CHARS:
+            return match.group(0)
+        return self._targets[match.group(0)]
+
+    def rewrite(self, text: str) -> str:
+        if self._pattern is None or not any(k in text for k in self._targets):
+            return text
+        return self._pattern.sub(self._replace, text)
+
+    def stream(self) -> StreamingPathRewriter:
+        return StreamingPathRewriter(self)
+
+
+class StreamingPathRewriter:
+    """
+    流式改写：feed(chunk) 返回可以安全输出的部分，flush() 返回剩余部分
+
+    末尾 max_prefix 个字符内开始的匹配可能还不完整（前缀或其后的边界字符尚未到达），留到下一块；
+    在此之前开始的匹配长度不超过 max_prefix，已完全确定
+    """
+
+    def __init__(self, rewriter: PathRewriter):
+        self._rewriter = rewriter
+        self._pending = ""
+        # 已输出文本的最后一个字符，供前缀左边界判断
+        self._context = ""
+
+    def _rewrite(self, data: str, start: int, stop: int) -> tuple[list[str], int]:
+        """改写 data[start:] 中开始位置小于 stop 的匹配，返回 (输出片段, 最后一个匹配的结束位置)"""
+        out: list[str] = []
+        last = start
+        for match in self._rewriter._pattern.finditer(data, start):  # type: ignore[union-attr]
+            if match.start() >= stop:
+                break
+            out.append(data[last : match.start()])
+            out.append(self._rewriter._replace(match))
+            last = match.end()
+        return out, last
+
+    def feed(self, text: str) -> str:
+        if not self._rewriter:
+            return text
+        _start = len(self._context)
+        data = self._context + self._pending + text
+        safe = len(data) - self._rewriter.max_prefix
+        if safe <= _start:
+            self._pending = data[_start:]
+            return ""
+
+        out, last = self._rewrite(data, _start, safe)
+        cut = max(last, safe)
+        out.append(data[last:cut])
+        self._pending = data[cut:]
+        self._context = data[cut - 1]
+        return "".join(out)
+
+    def flush(self) -> str:
+        data, self._pending = self._pending, ""
+        if not self._rewriter or not data:
+            return data
+        _start = len(self._context)
+        data = self._context + data
+        out, last = self._rewrite(data, _start, len(data))
+        out.append(data[last:])
+        return "".join(out)
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+# @Time   : 2026/03/20
+# @Author : zip
+# @Moto   : Knowledge comes from decomposition
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import shutil
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+
+try:
+    import resource  # 仅 POSIX
+except ImportError:
+    resource = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+"""
+沙箱子进程的资源限制
+
+* rlimit：每个进程的 CPU 时间 / 虚拟内存上限，由包装脚本中的 ulimit 设置后 exec 目标命令，子进程继承
+* cgroup v2（可选）：整个沙箱（shell 及其所有子进程）共享的 CPU 配额与内存上限，
+  仅在配置了 cgroup_root 且该目录可写时启用；子进程启动后由父进程写入 cgroup.procs
+* 不使用 preexec_fn：多线程进程中 fork 后、exec 前执行 Python 代码可能死锁
+* 墙钟时间由 execute_timeout 控制，不在这里处理
+"""
+
+# cgroup v2 的 cpu.max 周期（微秒）
+_CPU_PERIOD_US = 100000
+
+
+@dataclass
+class ResourceLimits:
+    cpu_time: int = 0  # 单进程 CPU 时间上限（秒），0 表示不限制
+    memory_mb: int = 0  # 单进程虚拟内存上限（MB），0 表示不限制
+    cgroup_root: str = ""  # cgroup v2 目录，为空时不使用 cgroup
+    cgroup_cpu_quota: float = 0  # 沙箱可用的 CPU 核数，0 表示不限制
+    cgroup_memory_mb: int = 0  # 沙箱内存上限（MB），0 表示不限制
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.cpu_time or self.memory_mb or self.cgroup_root)
+
+
+class SandboxCgroup:
+    """单个沙箱的 cgroup v2 子目录，创建失败时静默退化为仅 rlimit"""
+
+    def __init__(self, root: str, name: str):
+        self.path = Path(root) / name
+
+    @staticmethod
+    def available(root: str) -> bool:
+        return (
+            bool(root)
+            and os.access(root, os.W_OK)
+            and os.path.exists(os.path.join(root, "cgroup.controllers"))
+        )
+
+    def create(self, cpu_quota: float, memory_mb: int) -> bool:
+        try:
+            self.path.mkdir(exist_ok=True)
+            if cpu_quota > 0:
+                (self.path / "cpu.max").write_text(
+                    f"{int(cpu_quota * _CPU_PERIOD_US)} {_CPU_PERIOD_US}"
+                )
+            if memory_mb > 0:
+                (self.path / "memory.max").write_text(str(memory_mb * 1024 * 1024))
+            return True
+        except OSError as e:
+            logger.warning(f"[Sandbox] create cgroup {self.path} failed: {e}")
+            return False
+
+    def attach(self, pid: int):
+        try:
+            (self.path / "cgroup.procs").write_text(str(pid))
+        except OSError as e:
+            logger.warning(
+                f"[Sandbox] attach pid {pid} to cgroup {self.path} failed: {e}"
+            )
+
+    def remove(self):
+        # cgroup 目录只能在没有进程时删除，删除前进程已被终止
+        try:
+            self.path.rmdir()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.debug(f"[Sandbox] remove cgroup {self.path} failed: {e}")
+            shutil.rmtree(self.path, ignore_errors=True)
+
+
+def _soft_limit(kind: str, value: int) -> int:
+    """不超过当前进程的硬限制（子进程继承），否则 ulimit 会失败"""
+    if resource is None:
+        return value
+    _, _hard = resource.getrlimit(getattr(resource, kind))
+    if _hard != resource.RLIM_INFINITY:
+        return min(value, _hard)
+    return value
+
+
+def _build_prefix(limits: ResourceLimits, gated: bool) -> list[str]:
+    """
+    包装脚本：gated 时先从 stdin 读一行（父进程把 pid 写入 cgroup 后放行），
+    再用 ulimit 设置 rlimit，最后 exec 目标命令（pid 不变，进程组仍可整体终止）
+    """
+    _steps = []
+    if gated:
+        _steps.append("read -r _ || exit 125")
+    if limits.cpu_time > 0:
+        _steps.append(f"ulimit -S -t {_soft_limit('RLIMIT_CPU', limits.cpu_time)}")
+    if limits.memory_mb > 0:
+        _bytes = _soft_limit("RLIMIT_AS", limits.memory_mb * 1024 * 1024)
+        _steps.append(f"ulimit -S -v {_bytes // 1024}")
+    if not _steps:
+        return []
+    return ["/bin/sh", "-c", "; ".join(_steps) + '; exec "$@"', "sh"]
+
+
+class SandboxLauncher:
+    """
+    按资源限制启动沙箱子进程
+
+    1. spawn(*argv, stdin=..., **kwargs) -> asyncio Process
+        - 有 cgroup 时 stdin 先用于放行；调用方要求 PIPE 时保留给调用方，否则放行后关闭（读到 EOF）
+
+    2. run(*argv, timeout) -> CompletedProcess  同步执行并捕获输出
+    """
+
+    def __init__(self, limits: ResourceLimits, cgroup: SandboxCgroup | None = None):
+        self.cgroup = cgroup
+        self.prefix = (
+            _build_prefix(limits, gated=cgroup is not None)
+            if os.name == "posix"
+            else []
+        )
+
+    def argv(self, *argv: str) -> list[str]:
+        return [*self.prefix, *argv]
+
+    async def spawn(
+        self, *argv: str, stdin=None, **kwargs
+    ) -> asyncio.subprocess.Process:
+        if self.cgroup is None:
+            return await asyncio.create_subprocess_exec(
+                *self.argv(*argv), stdin=stdin, **kwargs
+            )
+
+        process = await asyncio.create_subprocess_exec(
+            *self.argv(*argv), stdin=asyncio.subprocess.PIPE, **kwargs
+        )
+        self.cgroup.attach(process.pid)
+        assert process.stdin is not None
+        try:
+            process.stdin.write(b"\n")
+            await process.stdin.drain()
+            if stdin != asyncio.subprocess.PIPE:
+                process.stdin.close()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        return process
+
+    def run(self, *argv: str, timeout: float) -> subprocess.CompletedProcess:
+        if self.cgroup is None:
+            return subprocess.run(
+                self.argv(*argv), capture_output=True, text=True, timeout=timeout
+            )
+
+        with subprocess.Popen(
+            self.argv(*argv),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+        ) as process:
+            self.cgroup.attach(process.pid)
+            try:
+                stdout, stderr = process.communicate("\n", timeout=timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.communicate()
+                raise
+        return subprocess.CompletedProcess(
+            process.args, process.returncode, stdout, stderr
+        )
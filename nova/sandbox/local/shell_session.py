@@ -0,0 +1,428 @@
+# -*- coding: utf-8 -*-
+# @Time   : 2026/03/20
+# @Author : zip
+# @Moto   : Knowledge comes from decomposition
+from __future__ import annotations
+
+import asyncio
+import codecs
+import logging
+import os
+import signal
+import time
+import uuid
+import weakref
+from collections import deque, OrderedDict
+from typing import Awaitable, Callable
+
+from nova.sandbox.local.resource_limits import SandboxLauncher
+
+logger = logging.getLogger(__name__)
+
+"""
+按线程常驻的 shell 会话
+
+* 每个线程一个长驻 shell 进程，cd / export / source venv 等状态在多次 execute 之间保留
+* 命令通过 stdin 写入，执行完后在 stdout / stderr 各打印一行哨兵（带退出码），读到哨兵即结束
+* 命令以单引号参数交给 eval，语法错误（未闭合的引号 / heredoc）只影响该命令本身，哨兵总能输出
+* 命令的 stdin 重定向到 /dev/null，避免读取协议数据
+* 超时 / 取消 / shell 退出时整个进程组被终止，下次 execute 自动重建会话
+"""
+
+# 读取 shell 输出的块大小
+_READ_CHUNK = 4096
+# 后台清理空闲会话的检查间隔（秒）
+_REAPER_INTERVAL = 60
+
+OutputCallback = Callable[[str, str], Awaitable[None]]
+
+
+def _quote(command: str) -> str:
+    """转为单引号字符串，作为 eval 的参数"""
+    return "'" + command.replace("'", "'\\''") + "'"
+
+
+def _eval_builtin(shell: str) -> str:
+    """
+    POSIX 中 eval 是特殊内建命令，语法错误会使非交互 shell 直接退出（dash），
+    经 command 调用则只返回非零退出码；zsh 的 command 只查找外部命令，而其 eval 语法错误本就不会退出
+    """
+    return "eval" if os.path.basename(shell) == "zsh" else "command eval"
+
+
+class OutputRingBuffer:
+    """只保留最近 max_bytes 字节的输出，长时间运行的命令内存占用有上限"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.dropped = 0
+        self._chunks: deque[bytes] = deque()
+
+    def append(self, chunk: bytes):
+        self._chunks.append(chunk)
+        self.size += len(chunk)
+        while self.size > self.max_bytes and self._chunks:
+            _overflow = self.size - self.max_bytes
+            _head = self._chunks[0]
+            if len(_head) <= _overflow:
+                self._chunks.popleft()
+                self.size -= len(_head)
+                self.dropped += len(_head)
+            else:
+                self._chunks[0] = _head[_overflow:]
+                self.size -= _overflow
+                self.dropped += _overflow
+
+    def getvalue(self) -> str:
+        _text = b"".join(self._chunks).decode("utf-8", errors="replace")
+        if self.dropped:
+            _text = f"... [前 {self.dropped} 字节输出已省略]\n" + _text
+        return _text
+
+
+def kill_process_group(process: asyncio.subprocess.Process):
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        try:
+            process.kill()
+        except ProcessLookupError:
+            pass
+
+
+class ShellSessionClosed(Exception):
+    """shell 进程在命令执行过程中退出（如命令中执行了 exit）"""
+
+
+class ShellSession:
+    """单个常驻 shell 进程"""
+
+    def __init__(
+        self,
+        session_id: str,
+        shell: str,
+        launcher: SandboxLauncher | None = None,
+    ):
+        self.session_id = session_id
+        self.shell = shell
+        self.launcher = launcher
+        self.process: asyncio.subprocess.Process | None = None
+        self.lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+        # 已被 acquire 但尚未 release 的次数，租用中的会话不会被淘汰或清理
+        self.leases = 0
+
+    @property
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    async def start(self):
+        # 资源限制（rlimit / cgroup）由 launcher 施加
+        _spawn = (
+            self.launcher.spawn
+            if self.launcher is not None
+            else asyncio.create_subprocess_exec
+        )
+        self.process = await _spawn(
+            self.shell,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            start_new_session=True,  # 独立进程组，关闭时连同子进程一起终止
+        )
+        logger.info(f"[ShellSession] started {self.session_id}, pid={self.process.pid}")
+
+    async def close(self):
+        if self.process is None:
+            return
+        if self.process.returncode is None:
+            kill_process_group(self.process)
+            await self.process.wait()
+        logger.info(f"[ShellSession] closed {self.session_id}")
+        self.process = None
+
+    async def run(
+        self,
+        command: str,
+        stdout_buffer: OutputRingBuffer,
+        stderr_buffer: OutputRingBuffer,
+        on_output: OutputCallback | None = None,
+    ) -> int:
+        """在会话中执行命令，返回退出码；调用方需持有 self.lock"""
+        assert self.process is not None and self.process.stdin is not None
+        self.last_used = time.monotonic()
+
+        _sentinel = f"__NOVA_CMD_DONE_{uuid.uuid4().hex}__"
+        # eval 在当前 shell 中执行（保留 cd / export），且命令不会读到协议数据
+        _script = (
+            f"{_eval_builtin(self.shell)} {_quote(command)} < /dev/null\n"
+            f"__nova_rc=$?\n"
+            f"printf '\\n{_sentinel} %d\\n' \"$__nova_rc\"\n"
+            f"printf '\\n{_sentinel}\\n' >&2\n"
+        )
+        self.process.stdin.write(_script.encode("utf-8"))
+        await self.process.stdin.drain()
+
+        _marker = f"\n{_sentinel}".encode("utf-8")
+        _results = await asyncio.gather(
+            self._read_until(
+                self.process.stdout, _marker, "stdout", stdout_buffer, on_output
+            ),
+            self._read_until(
+                self.process.stderr, _marker, "stderr", stderr_buffer, on_output
+            ),
+        )
+        self.last_used = time.monotonic()
+        _status = _results[0].strip()
+        return int(_status) if _status.lstrip("-").isdigit() else -1
+
+    @staticmethod
+    async def _read_until(
+        stream: asyncio.StreamReader | None,
+        marker: bytes,
+        name: str,
+        buffer: OutputRingBuffer,
+        on_output: OutputCallback | None,
+    ) -> str:
+        """读取输出直到哨兵行，返回哨兵行中哨兵之后的内容（stdout 上为退出码）"""
+        if stream is None:
+            raise ShellSessionClosed("shell stream not available")
+
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        _pending = bytearray()
+
+        async def _flush(data: bytes):
+            if not data:
+                return
+            buffer.append(data)
+            if on_output is not None:
+                text = decoder.decode(data)
+                if text:
+                    try:
+                        await on_output(name, text)
+                    except Exception as e:
+                        logger.debug(f"execute output callback failed: {e}")
+
+        while True:
+            chunk = await stream.read(_READ_CHUNK)
+            if not chunk:
+                await _flush(bytes(_pending))
+                raise ShellSessionClosed("shell exited during command")
+            _pending += chunk
+
+            _idx = _pending.find(marker)
+            if _idx != -1:
+                _line_end = _pending.find(b"\n", _idx + len(marker))
+                if _line_end == -1:
+                    continue  # 哨兵行还没读完整
+                await _flush(bytes(_pending[:_idx]))
+                return _pending[_idx + len(marker) : _line_end].decode(
+                    "utf-8", errors="replace"
+                )
+
+            # 尾部可能是不完整的哨兵，暂不输出
+            _safe = len(_pending) - len(marker)
+            if _safe > 0:
+                await _flush(bytes(_pending[:_safe]))
+                del _pending[:_safe]
+
+
+class ShellSessionLimiter:
+    """
+    多个 ShellSessionManager（每个沙箱一个）共享的会话数上限，保证整个进程的常驻 shell 数有界
+
+    会话数达到上限时，淘汰所有管理器中最久未使用且未被租用的会话
+    """
+
+    def __init__(self, max_sessions: int):
+        self.max_sessions = max_sessions
+        self._managers: weakref.WeakSet[ShellSessionManager] = weakref.WeakSet()
+
+    def register(self, manager: ShellSessionManager):
+        self._managers.add(manager)
+
+    @property
+    def full(self) -> bool:
+        return sum(len(m) for m in self._managers) >= self.max_sessions
+
+    def pop_idle(self) -> ShellSession | None:
+        """取出最久未使用的空闲会话（由调用方关闭）"""
+        _candidates = [
+            (s.last_used, m, s) for m in self._managers for s in m.idle_sessions()
+        ]
+        if not _candidates:
+            return None
+        _, _manager, _session = min(_candidates, key=lambda c: c[0])
+        return _manager.detach(_session)
+
+
+class ShellSessionManager:
+    """
+    管理按线程划分的常驻 shell 会话
+
+    1. acquire(session_id) -> ShellSession | None
+        - 不存在时创建；会话数达到上限时淘汰最久未使用且未被租用的会话
+        - 传入 limiter 时上限由所有管理器共享，可淘汰其它管理器的空闲会话
+        - 所有会话都在使用时返回 None，由调用方退回一次性进程执行
+        - 返回的会话处于租用状态，用完后调用 release(session)
+
+    2. close(session_id) / close_all()
+
+    3. 空闲超过 idle_timeout 的会话由后台任务自动关闭
+
+    4. prewarm() 预先启动一个备用 shell，新会话直接接管，省去 shell 启动耗时
+    """
+
+    def __init__(
+        self,
+        shell: str,
+        max_sessions: int,
+        idle_timeout: float,
+        launcher: SandboxLauncher | None = None,
+        limiter: ShellSessionLimiter | None = None,
+    ):
+        self.shell = shell
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.launcher = launcher
+        self.limiter = limiter
+        self._sessions: OrderedDict[str, ShellSession] = OrderedDict()
+        self._spare: ShellSession | None = None
+        self._lock = asyncio.Lock()
+        self._reaper_task: asyncio.Task | None = None
+        if limiter is not None:
+            limiter.register(self)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    @property
+    def busy(self) -> bool:
+        return any(s.lock.locked() or s.leases for s in self._sessions.values())
+
+    def owns(self, session: ShellSession) -> bool:
+        """会话仍由管理器跟踪（未被丢弃 / 关闭）"""
+        return self._sessions.get(session.session_id) is session
+
+    def idle_sessions(self) -> list[ShellSession]:
+        """未在执行命令、未被租用的会话，按最近使用排序（最久未使用的在前）"""
+        return [
+            s for s in self._sessions.values() if not s.lock.locked() and not s.leases
+        ]
+
+    def detach(self, session: ShellSession) -> ShellSession:
+        """不再跟踪该会话（由调用方关闭）"""
+        if self._sessions.get(session.session_id) is session:
+            self._sessions.pop(session.session_id)
+        return session
+
+    def _full(self) -> bool:
+        if self.limiter is not None:
+            return self.limiter.full
+        return len(self._sessions) >= self.max_sessions
+
+    def _pop_idle(self) -> ShellSession | None:
+        if self.limiter is not None:
+            return self.limiter.pop_idle()
+        _idle = self.idle_sessions()
+        return self.detach(_idle[0]) if _idle else None
+
+    async def prewarm(self):
+        async with self._lock:
+            if self._spare is None or not self._spare.is_alive:
+                self._spare = ShellSession("spare", self.shell, self.launcher)
+                await self._spare.start()
+
+    async def acquire(self, session_id: str) -> ShellSession | None:
+        async with self._lock:
+            _session = self._sessions.get(session_id)
+            if _session is not None and (_session.is_alive or _session.lock.locked()):
+                self._sessions.move_to_end(session_id)
+                _session.leases += 1
+                return _session
+            if _session is not None:
+                # shell 已退出（如执行了 exit），重建
+                self._sessions.pop(session_id, None)
+
+            if self._full():
+                _victim = self._pop_idle()
+                if _victim is None:
+                    logger.warning(
+                        f"[ShellSession] all sessions busy, "
+                        f"fall back to one-off process for {session_id}"
+                    )
+                    return None
+                await _victim.close()
+
+            if self._spare is not None and self._spare.is_alive:
+                _session, self._spare = self._spare, None
+                _session.session_id = session_id
+            else:
+                _session = ShellSession(session_id, self.shell, self.launcher)
+                await _session.start()
+            self._sessions[session_id] = _session
+            _session.leases += 1
+            self._ensure_reaper()
+            return _session
+
+    def release(self, session: ShellSession):
+        """归还 acquire 得到的会话"""
+        session.leases = max(session.leases - 1, 0)
+        session.last_used = time.monotonic()
+
+    async def discard(self, session: ShellSession):
+        """命令超时 / 被取消 / shell 异常退出后，会话状态不可信，直接关闭"""
+        async with self._lock:
+            if self._sessions.get(session.session_id) is session:
+                self._sessions.pop(session.session_id)
+        await session.close()
+
+    async def close(self, session_id: str):
+        async with self._lock:
+            _session = self._sessions.pop(session_id, None)
+        if _session is not None:
+            await _session.close()
+
+    async def close_all(self):
+        async with self._lock:
+            _sessions = list(self._sessions.values())
+            self._sessions.clear()
+            if self._spare is not None:
+                _sessions.append(self._spare)
+                self._spare = None
+        for _session in _sessions:
+            await _session.close()
+        if self._reaper_task is not None and not self._reaper_task.done():
+            self._reaper_task.cancel()
+        self._reaper_task = None
+
+    def kill_all(self):
+        """同步终止所有会话进程（无事件循环时使用，如进程退出）"""
+        for _session in [*self._sessions.values(), self._spare]:
+            if _session is not None and _session.process is not None:
+                if _session.process.returncode is None:
+                    kill_process_group(_session.process)
+        self._sessions.clear()
+        self._spare = None
+
+    def _ensure_reaper(self):
+        if self._reaper_task is None or self._reaper_task.done():
+            self._reaper_task = asyncio.create_task(self._reap_idle())
+
+    async def _reap_idle(self):
+        while self._sessions:
+            await asyncio.sleep(min(_REAPER_INTERVAL, self.idle_timeout))
+            _now = time.monotonic()
+            async with self._lock:
+                _idle = [
+                    k
+                    for k, s in self._sessions.items()
+                    if not s.lock.locked()
+                    and not s.leases
+                    and _now - s.last_used > self.idle_timeout
+                ]
+                _closing = [self._sessions.pop(k) for k in _idle]
+            for _session in _closing:
+                logger.info(f"[ShellSession] {_session.session_id} idle, closing")
+                await _session.close()
@@ -15,6 +15,8 @@ from typing import Literal, Sequence
 
 import wcmatch.glob as wcglob
 
+from nova.utils.token_utils import count_tokens, truncate_text_by_tokens
+
 IGNORE_PATTERNS = [
     # Version Control
     ".git",
@@ -76,12 +78,15 @@ IGNORE_PATTERNS = [
 MAX_FILE_SIZE_MB = 10
 
 
-def _should_ignore(name: str) -> bool:
+# 所有忽略规则预编译为一个正则，避免每个目录项逐条 fnmatch
+_IGNORE_REGEX = re.compile(
+    "|".join(f"(?:{fnmatch.translate(p)})" for p in IGNORE_PATTERNS)
+)
+
+
+def should_ignore(name: str) -> bool:
     """Check if a file/directory name matches any ignore pattern."""
-    for pattern in IGNORE_PATTERNS:
-        if fnmatch.fnmatch(name, pattern):
-            return True
-    return False
+    return _IGNORE_REGEX.match(os.path.normcase(name)) is not None
 
 
 def list_dir(path: str, max_depth: int = 2) -> list[str]:
@@ -110,7 +115,7 @@ def list_dir(path: str, max_depth: int = 2) -> list[str]:
 
         try:
             for item in current_path.iterdir():
-                if _should_ignore(item.name):
+                if should_ignore(item.name):
                     continue
 
                 post_fix = "/" if item.is_dir() else ""
@@ -287,23 +292,28 @@ def perform_string_replacement(
     return new_content, occurrences
 
 
-def truncate_if_too_long(result: list[str] | str) -> list[str] | str:
-    TOOL_RESULT_TOKEN_LIMIT = 20000
+def truncate_if_too_long(
+    result: list[str] | str, token_limit: int = 20000, model: str | None = None
+) -> list[str] | str:
+    """Truncate list or string result if it exceeds token limit (counted by the model's tokenizer)."""
     TRUNCATION_GUIDANCE = (
         "... [results truncated, try being more specific with your parameters]"
     )
 
-    """Truncate list or string result if it exceeds token limit (rough estimate: 4 chars/token)."""
     if isinstance(result, list):
-        total_chars = sum(len(item) for item in result)
-        if total_chars > TOOL_RESULT_TOKEN_LIMIT * 4:
-            return result[
-                : len(result) * TOOL_RESULT_TOKEN_LIMIT * 4 // total_chars
-            ] + [TRUNCATION_GUIDANCE]
+        kept: list[str] = []
+        remaining = token_limit
+        for item in result:
+            item_tokens = count_tokens(item, model)
+            if item_tokens > remaining:
+                return kept + [TRUNCATION_GUIDANCE]
+            kept.append(item)
+            remaining -= item_tokens
         return result
     # string
-    if len(result) > TOOL_RESULT_TOKEN_LIMIT * 4:
-        return result[: TOOL_RESULT_TOKEN_LIMIT * 4] + "\n" + TRUNCATION_GUIDANCE
+    truncated, is_truncated = truncate_text_by_tokens(result, token_limit, model)
+    if is_truncated:
+        return truncated + "\n" + TRUNCATION_GUIDANCE
     return result
 
 
@@ -4,14 +4,22 @@
 # @Moto   : Knowledge comes from decomposition
 from __future__ import annotations
 
+import asyncio
 from abc import ABC, abstractmethod
-from typing import Literal
+from concurrent.futures import Executor
+from functools import partial
+from typing import Any, Awaitable, Callable, Literal
+
+# execute 增量输出回调: (stream 名称 stdout / stderr, 文本片段)
+ExecuteOutputCallback = Callable[[str, str], Awaitable[None]]
 
 
 class Sandbox(ABC):
     """Abstract base class for sandbox environments"""
 
     _id: str
+    # 执行阻塞操作的线程池，None 时使用事件循环默认线程池
+    _executor: Executor | None = None
 
     def __init__(self, id: str):
         self._id = id
@@ -111,6 +119,60 @@ class Sandbox(ABC):
     def todo_list(self, todos: list) -> str:
         return f"Updated todo list to {todos}"
 
+    # ─── 异步版本：默认把同步实现放到线程池中执行，避免阻塞事件循环 ───
+    async def _run_blocking(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, partial(func, *args, **kwargs)
+        )
+
+    async def aread_file(self, file_path: str, offset: int, limit: int) -> str:
+        return await self._run_blocking(self.read_file, file_path, offset, limit)
+
+    async def awrite_file(self, file_path: str, content: str, append: bool = False):
+        return await self._run_blocking(self.write_file, file_path, content, append)
+
+    async def aedit_file(
+        self,
+        file_path: str,
+        old_string: str,
+        new_string: str,
+        replace_all: bool = False,
+    ):
+        return await self._run_blocking(
+            self.edit_file, file_path, old_string, new_string, replace_all
+        )
+
+    async def als(self, path: str) -> str:
+        return await self._run_blocking(self.ls, path)
+
+    async def aglob(self, pattern: str, path: str = "/") -> str:
+        return await self._run_blocking(self.glob, pattern, path)
+
+    async def agrep(
+        self,
+        pattern: str,
+        path: str | None = None,
+        glob: str | None = None,
+        output_mode: Literal[
+            "files_with_matches", "content", "count"
+        ] = "files_with_matches",
+    ) -> str:
+        return await self._run_blocking(self.grep, pattern, path, glob, output_mode)
+
+    async def aexecute(
+        self,
+        command: str,
+        on_output: ExecuteOutputCallback | None = None,
+        session_id: str | None = None,
+    ) -> str:
+        """异步执行命令
+
+        支持流式输出的实现会在产生输出时调用 on_output；
+        支持常驻会话的实现会让同一 session_id 的命令共享 cwd / 环境变量
+        """
+        return await self._run_blocking(self.execute, command)
+
 
 class SandboxProvider(ABC):
     """Abstract base class for sandbox providers"""
@@ -141,3 +203,15 @@ class SandboxProvider(ABC):
             sandbox_id: The ID of the sandbox environment to destroy.
         """
         pass
+
+    async def arelease(self, sandbox_id: str) -> None:
+        """Release a sandbox environment, awaiting async teardown (e.g. shell sessions)."""
+        self.release(sandbox_id)
+
+    async def prewarm(self) -> None:
+        """Prepare idle sandboxes ahead of the first acquire (optional)."""
+        return None
+
+    async def ashutdown(self) -> None:
+        """Release every sandbox owned by the provider (called at application shutdown)."""
+        return None
@@ -29,3 +29,11 @@ def get_sandbox_provider() -> SandboxProvider:
             _default_sandbox_provider = LocalSandboxProvider()
 
     return _default_sandbox_provider
+
+
+async def shutdown_sandbox_provider() -> None:
+    """Shutdown the sandbox provider singleton and clear the cache."""
+    global _default_sandbox_provider
+    if _default_sandbox_provider is not None:
+        await _default_sandbox_provider.ashutdown()
+        _default_sandbox_provider = None
@@ -6,14 +6,22 @@ from __future__ import annotations
 
 import asyncio
 import logging
-from typing import AsyncGenerator
+from contextlib import aclosing
+from typing import Any, AsyncGenerator, Dict
 
 import aiohttp
-from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import (
+    APIRouter,
+    HTTPException,
+    Request,
+    WebSocket,
+    WebSocketDisconnect,
+)
 from fastapi.responses import StreamingResponse
 from langchain_core.runnables.config import RunnableConfig
 from langgraph.types import Command
 
+from nova import CONF
 from nova.agent import (
     chat_agent,
     memorizer_agent,
@@ -21,8 +29,23 @@ from nova.agent import (
     super_nova_agent,
     theme_slicer_agent,
 )
-from nova.model.service import SuperAgentRequest, SuperAgentResponse
+from nova.model.service import SuperAgentRequest
+from nova.service.event_coalescer import coalesce_events
 from nova.service.handle_event import handle_event
+from nova.service.run_guard import RUN_METRICS, RunUsage, cancel_on_disconnect
+from nova.service.serialization import (
+    agent_response,
+    dump_payload,
+    response_payload,
+)
+from nova.service.stream_engine import stream_events
+from nova.service.stream_framing import (
+    MEDIA_TYPES,
+    STREAM_HEADERS,
+    frame_stream,
+    resolve_stream_format,
+)
+from nova.service.ws_multiplexer import WebSocketSession
 
 logger = logging.getLogger(__name__)
 
@@ -61,11 +84,12 @@ def get_agent(agent_name: str):
 
 
 # Shared streaming handler
-async def stream_agent_events(
+async def agent_responses(
     instance, trace_id, state, context, config: dict
-) -> AsyncGenerator[str]:
-    """Generic streaming handler for all agents"""
+) -> AsyncGenerator[Dict[str, Any]]:
+    """Generic streaming handler for all agents, yields response payloads"""
     state["code"] = 0
+    usage = RunUsage()
     try:
         async with aiohttp.ClientSession() as session:  # Auto-closing context manager
             if context.get("is_human_in_loop"):
@@ -73,44 +97,62 @@ async def stream_agent_events(
             else:
                 req = state
 
-            async for event in instance.astream_events(
-                req, config=config, context=context, version="v2"
-            ):
-                response = handle_event(trace_id, event)  # type: ignore
-                if response:
-                    if response.get("event_name") == "error":
-                        res = SuperAgentResponse(
-                            code=1,
-                            data=response.get("event_info", {}),
-                        ).model_dump_json()
-
-                        yield res
-                        return
-
-                    try:
-                        res = SuperAgentResponse(
-                            code=0, err_message="ok", data=response
-                        ).model_dump_json()
-                    except Exception:
-                        res = SuperAgentResponse(
-                            code=1, err_message="data is not json serializable"
-                        ).model_dump_json()
-
-                    yield res
-
+            async def _responses():
+                async with aclosing(
+                    stream_events(CONF.Stream.engine, instance, req, config, context)
+                ) as events:
+                    async for event in events:
+                        usage.observe(event)
+                        response = handle_event(trace_id, event)  # type: ignore
+                        if response:
+                            yield response
+
+            # 连续的 token 增量在时间窗口内合并，减少序列化与网络写入次数
+            async with aclosing(
+                coalesce_events(
+                    _responses(),
+                    CONF.Stream.coalesce_window_ms,
+                    CONF.Stream.coalesce_max_bytes,
+                )
+            ) as responses:
+                async for response in responses:
+                    if response:
+                        if response.get("event_name") == "error":
+                            yield response_payload(1, response.get("event_info", {}))
+                            return
+
+                        yield response_payload(0, response, "ok")
+            RUN_METRICS.record_completed(usage.tokens)
+
+    except (asyncio.CancelledError, GeneratorExit):
+        # 客户端断开 / WebSocket 关闭，运行被取消
+        saved = RUN_METRICS.record_cancelled(usage.tokens)
+        logger.info(
+            f"run cancelled (trace_id={trace_id}): tokens_used={usage.tokens}, "
+            f"estimated_tokens_saved={saved}"
+        )
+        raise
     except Exception as e:
         logger.error(f"Streaming error (trace_id={trace_id}): {str(e)}", exc_info=True)
-        error_response = SuperAgentResponse(
-            code=500, err_message=f"Streaming failed: {str(e)}"
-        )
-        yield error_response.model_dump_json()
+        yield response_payload(500, err_message=f"Streaming failed: {str(e)}")
     finally:
         if session is not None:
             await session.close()  # 确保会话关闭
 
 
+async def stream_agent_events(
+    instance, trace_id, state, context, config: dict
+) -> AsyncGenerator[str]:
+    """Generic streaming handler for all agents, yields serialized responses"""
+    async with aclosing(
+        agent_responses(instance, trace_id, state, context, config)
+    ) as payloads:
+        async for payload in payloads:
+            yield dump_payload(payload)
+
+
 @agent_router.post("/service")
-async def agent_service(request: SuperAgentRequest):
+async def agent_service(request: SuperAgentRequest, http_request: Request):
     if not request:
         logger.error("error: Input instances cannot be empty", exc_info=True)
         raise HTTPException(status_code=400, detail="Input instances cannot be empty")
@@ -125,9 +167,7 @@ async def agent_service(request: SuperAgentRequest):
         thread_id = context.get("thread_id")
         if not thread_id:
             logger.error("herror: thread_id is required", exc_info=True)
-            return SuperAgentResponse(
-                code=1, data={"err_message": "thread_id is required"}
-            )
+            return agent_response(1, {"err_message": "thread_id is required"})
 
         # 获取 agent
         agent = get_agent(context.get("agent", ""))
@@ -135,8 +175,8 @@ async def agent_service(request: SuperAgentRequest):
             logger.error(
                 f"error: agent {context.get('agent')} not found", exc_info=True
             )
-            return SuperAgentResponse(
-                code=1, data={"err_message": f"agent {context.get('agent')} not found"}
+            return agent_response(
+                1, {"err_message": f"agent {context.get('agent')} not found"}
             )
 
         # 创建 config
@@ -152,11 +192,9 @@ async def agent_service(request: SuperAgentRequest):
                 "error: is_human_in_loop is True, user_guidance is required",
                 exc_info=True,
             )
-            return SuperAgentResponse(
-                code=1,
-                data={
-                    "err_message": "is_human_in_loop is True, user_guidance is required"
-                },
+            return agent_response(
+                1,
+                {"err_message": "is_human_in_loop is True, user_guidance is required"},
             )
 
         if not stream:
@@ -170,12 +208,30 @@ async def agent_service(request: SuperAgentRequest):
                 response = await agent.ainvoke(
                     state, context=context, config=RunnableConfig(**config)
                 )
-            return SuperAgentResponse(code=0, data=response)
+            # 最终状态中含 LangChain 消息对象，直接由 orjson 编码
+            return agent_response(0, response)
 
         else:
+            # 分帧协议：请求体 stream_format > Accept 头 > 配置默认值
+            stream_format = resolve_stream_format(
+                request.stream_format,
+                http_request.headers.get("accept"),
+                CONF.Stream.default_format,
+            )
+            # 客户端断开时取消运行，不再为无人接收的结果调用模型、工具
             return StreamingResponse(
-                stream_agent_events(agent, trace_id, state, context, config),
-                media_type="application/json",  # 流式数据的 MIME 类型
+                cancel_on_disconnect(
+                    frame_stream(
+                        stream_agent_events(agent, trace_id, state, context, config),
+                        stream_format,
+                        CONF.Stream.sse_retry_ms,
+                    ),
+                    http_request.is_disconnected,
+                    CONF.Stream.disconnect_poll_ms,
+                    trace_id,
+                ),
+                media_type=MEDIA_TYPES[stream_format],  # 流式数据的 MIME 类型
+                headers=STREAM_HEADERS,
             )
 
     except Exception as e:
@@ -183,17 +239,23 @@ async def agent_service(request: SuperAgentRequest):
             f"service error (trace_id={request.trace_id}): {str(e)}",
             exc_info=True,
         )
-        return SuperAgentResponse(
-            code=1,
-            data={"err_message": f"Service error: {str(e)}"},
-        )
+        return agent_response(1, {"err_message": f"Service error: {str(e)}"})
+
+
+@agent_router.get("/metrics")
+async def agent_metrics():
+    """运行统计：完成 / 取消的运行数、token 用量与取消节省的 token（估算）"""
+    return agent_response(0, RUN_METRICS.snapshot())
 
 
 # 存储活跃的 WebSocket 连接（可选，用于广播等场景）
 active_connections: list[WebSocket] = []
 
 
-async def agent_ws_message(request: SuperAgentRequest, websocket: WebSocket):
+async def agent_ws_message(
+    request: SuperAgentRequest,
+) -> AsyncGenerator[Dict[str, Any]]:
+    """处理 WebSocket 上的一次请求，产出响应字典，由 WebSocketSession 标记 run_id 后发送"""
     if not request:
         logger.error("error: Input instances cannot be empty", exc_info=True)
         raise HTTPException(status_code=400, detail="Input instances cannot be empty")
@@ -208,11 +270,7 @@ async def agent_ws_message(request: SuperAgentRequest, websocket: WebSocket):
         if not thread_id:
             logger.error("herror: thread_id is required", exc_info=True)
 
-            await websocket.send_text(
-                SuperAgentResponse(
-                    code=0, data={"err_message": "thread_id is required"}
-                ).model_dump_json()
-            )
+            yield response_payload(0, {"err_message": "thread_id is required"})
             return
 
         # 获取 agent
@@ -221,11 +279,8 @@ async def agent_ws_message(request: SuperAgentRequest, websocket: WebSocket):
             logger.error(
                 f"error: agent {context.get('agent')} not found", exc_info=True
             )
-            await websocket.send_text(
-                SuperAgentResponse(
-                    code=0,
-                    data={"err_message": f"agent {context.get('agent')} not found"},
-                ).model_dump_json()
+            yield response_payload(
+                0, {"err_message": f"agent {context.get('agent')} not found"}
             )
             return
 
@@ -241,13 +296,9 @@ async def agent_ws_message(request: SuperAgentRequest, websocket: WebSocket):
             logger.error(
                 "error: human_in_loop is True, user_guidance is required", exc_info=True
             )
-            await websocket.send_text(
-                SuperAgentResponse(
-                    code=0,
-                    data={
-                        "err_message": "human_in_loop is True, user_guidance is required"
-                    },
-                ).model_dump_json()
+            yield response_payload(
+                0,
+                {"err_message": "human_in_loop is True, user_guidance is required"},
             )
             return
 
@@ -263,27 +314,20 @@ async def agent_ws_message(request: SuperAgentRequest, websocket: WebSocket):
                     state, context=context, config=RunnableConfig(**config)
                 )
 
-            await websocket.send_text(
-                SuperAgentResponse(code=0, data=response).model_dump_json()
-            )
+            yield response_payload(0, response)
 
         else:
-            async for chunk in stream_agent_events(
+            async for payload in agent_responses(
                 agent, trace_id, state, context, config
             ):
-                await websocket.send_text(chunk)
+                yield payload
 
     except Exception as e:
         logger.error(
             f"service error (trace_id={request.trace_id}): {str(e)}",
             exc_info=True,
         )
-        await websocket.send_text(
-            SuperAgentResponse(
-                code=0,
-                data={"err_message": f"Service error: {str(e)}"},
-            ).model_dump_json()
-        )
+        yield response_payload(0, {"err_message": f"Service error: {str(e)}"})
         return
 
 
@@ -298,6 +342,14 @@ async def agent_websocket_stream(websocket: WebSocket):
     await websocket.accept()
     # 将连接加入活跃列表（可选）
     active_connections.append(websocket)
+    # 同一连接上的多个运行按 run_id 复用，限制并发数，经有界队列由单个任务发送
+    session = WebSocketSession(
+        websocket,
+        agent_ws_message,
+        max_runs=CONF.Stream.ws_max_runs,
+        queue_size=CONF.Stream.ws_queue_size,
+        token_policy=CONF.Stream.ws_token_policy,
+    )
     try:
         while True:
             data = await websocket.receive_text()
@@ -306,13 +358,13 @@ async def agent_websocket_stream(websocket: WebSocket):
                 f"收到请求 - trace_id: {agent_request.trace_id}, data: {agent_request}"
             )
             # 异步处理，不阻塞接收下一条消息
-            asyncio.create_task(agent_ws_message(agent_request, websocket))
+            await session.submit(agent_request)
 
     # 捕获客户端断开连接的异常
     except WebSocketDisconnect:
         # 从活跃列表移除断开的连接
         active_connections.remove(websocket)
         logger.info("客户端断开连接")
-    # finally:
-    #     # 确保连接关闭（可选，FastAPI 会自动处理，但显式关闭更健壮）
-    #     await websocket.close()
+    finally:
+        # 取消该连接上仍在执行的运行
+        await session.close()
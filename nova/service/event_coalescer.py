@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+# @Time   : 2026/03/20
+# @Author : zip
+# @Moto   : Knowledge comes from decomposition
+from __future__ import annotations
+
+import asyncio
+import time
+from contextlib import suppress
+from typing import Any, AsyncIterator, Dict, Optional
+
+"""
+流式 token 事件合并
+
+* 同一 node_name / message_id / 字段（content 或 reasoning_content）的连续 on_chat_model_stream
+  增量在 window_ms 内或累计 max_bytes 内合并为一个事件，再交给序列化与网络写入
+* 其它事件不合并，到达时先输出已合并的增量，保持事件顺序不变
+* 上游暂停（如模型思考、工具执行）时不会一直攒着：等待下一个事件最多到窗口结束，超时即输出
+"""
+
+STREAM_EVENT = "on_chat_model_stream"
+_STREAM_FIELDS = ("content", "reasoning_content")
+
+
+def stream_key(response: Dict[str, Any]) -> Optional[tuple]:
+    """可合并事件的键；不可合并时返回 None"""
+    if response.get("event_name") != STREAM_EVENT:
+        return None
+    output = response.get("output")
+    if not isinstance(output, dict):
+        return None
+    for field in _STREAM_FIELDS:
+        if isinstance(output.get(field), str):
+            # 只有单个字段的增量可以合并
+            if any(f != field and output.get(f) for f in _STREAM_FIELDS):
+                return None
+            return response.get("node_name"), output.get("message_id"), field
+    return None
+
+
+class TokenCoalescer:
+    """合并连续的 token 增量事件"""
+
+    def __init__(self, window_ms: float, max_bytes: int):
+        self.window = window_ms / 1000
+        self.max_bytes = max_bytes
+        self._key: Optional[tuple] = None
+        self._head: Optional[Dict[str, Any]] = None
+        self._parts: list[str] = []
+        self._size = 0
+        self.deadline = 0.0
+
+    @property
+    def pending(self) -> bool:
+        return self._head is not None
+
+    def add(self, response: Dict[str, Any]) -> list[Dict[str, Any]]:
+        """加入一个事件，返回可以立即输出的事件"""
+        key = stream_key(response)
+        if key is None:
+            return [*self.flush(), response]
+
+        ready = self.flush() if key != self._key else []
+        text = response["output"][key[2]]
+        if self._head is None:
+            self._key, self._head = key, response
+            self._parts, self._size = [], 0
+            self.deadline = time.monotonic() + self.window
+        self._parts.append(text)
+        self._size += len(text)
+        if self._size >= self.max_bytes or time.monotonic() >= self.deadline:
+            ready.extend(self.flush())
+        return ready
+
+    def flush(self) -> list[Dict[str, Any]]:
+        if self._head is None:
+            return []
+        head, key = self._head, self._key
+        if len(self._parts) > 1:
+            head = {**head, "output": {**head["output"], key[2]: "".join(self._parts)}}  # type: ignore[index]
+        self._key, self._head, self._parts, self._size = None, None, [], 0
+        return [head]
+
+
+class _Failure:
+    __slots__ = ("error",)
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+_END = object()
+# 合并窗口到期的信号，由定时器放入队列
+_TICK = object()
+# 上游与下游之间最多缓冲的事件数，下游写得慢时上游随之暂停
+_QUEUE_SIZE = 1024
+
+
+async def _pump(responses: AsyncIterator[Dict[str, Any]], queue: asyncio.Queue):
+    try:
+        async for response in responses:
+            await queue.put(response)
+        await queue.put(_END)
+    except Exception as e:
+        await queue.put(_Failure(e))
+    finally:
+        if hasattr(responses, "aclose"):
+            await responses.aclose()  # type: ignore[attr-defined]
+
+
+def _tick(queue: asyncio.Queue):
+    # 队列已满说明下游积压，随后 add 时会按截止时间自行输出
+    with suppress(asyncio.QueueFull):
+        queue.put_nowait(_TICK)
+
+
+async def coalesce_events(
+    responses: AsyncIterator[Dict[str, Any]], window_ms: float, max_bytes: int
+) -> AsyncIterator[Dict[str, Any]]:
+    """按时间窗口合并 token 增量；window_ms <= 0 时原样输出
+
+    上游在独立任务中读取并放入队列；每个合并批次只设一个定时器，
+    到期时向队列放入 _TICK，上游暂停时已合并的增量也能按时输出
+    """
+    if window_ms <= 0:
+        async for response in responses:
+            yield response
+        return
+
+    loop = asyncio.get_running_loop()
+    coalescer = TokenCoalescer(window_ms, max_bytes)
+    queue: asyncio.Queue = asyncio.Queue(_QUEUE_SIZE)
+    pump = asyncio.create_task(_pump(responses, queue))
+    timer: Optional[asyncio.TimerHandle] = None
+    armed = 0.0  # 已设定时器的批次截止时间
+    try:
+        while True:
+            item = await queue.get()
+            if item is _TICK:
+                if coalescer.pending and time.monotonic() >= coalescer.deadline:
+                    for ready in coalescer.flush():
+                        yield ready
+                continue
+            if item is _END:
+                break
+            if isinstance(item, _Failure):
+                for ready in coalescer.flush():
+                    yield ready
+                raise item.error
+
+            for ready in coalescer.add(item):
+                yield ready
+            if coalescer.pending and coalescer.deadline != armed:
+                armed = coalescer.deadline
+                timer = loop.call_later(
+                    max(armed - time.monotonic(), 0), _tick, queue
+                )
+        for ready in coalescer.flush():
+            yield ready
+    finally:
+        if timer is not None:
+            timer.cancel()
+        # 下游提前关闭时停止读取上游（关闭 astream_events，结束 agent 运行）
+        if not pump.done():
+            pump.cancel()
+            with suppress(asyncio.CancelledError):
+                await pump
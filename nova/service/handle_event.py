@@ -8,11 +8,13 @@ import ast
 import logging
 import re
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Any, Callable, Dict, Optional
 
+from langchain_core.messages import BaseMessage
 from langgraph.types import Command
 
-from nova.utils.common import truncate_if_too_long
+from nova.utils.common import TRUNCATION_GUIDANCE, truncate_if_too_long
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +33,7 @@ class EventConfig:
 
 
 # ========== 工具函数（复用逻辑） ==========
+@lru_cache(maxsize=1024)
 def should_filter_event(langgraph_node: str, name: str) -> bool:
     """
     判断是否需要过滤当前事件（工具内部执行过程不展示）
@@ -84,6 +87,107 @@ def safe_get(data: Dict[str, Any], path: str, default: Any = None) -> Any:
         return default
 
 
+_MISSING = object()
+
+
+def compile_path(path: str) -> Callable[..., Any]:
+    """
+    预编译取值路径，语义与 safe_get 一致（值为 None 时返回默认值）
+    路径只在编译时切分一次；dict 直接 get，其它对象 getattr
+    Args:
+        path: 取值路径，如 "data.output.content"
+    Returns:
+        取值函数 getter(data, default=None)
+    """
+    keys = tuple(path.split("."))
+
+    def getter(data: Any, default: Any = None) -> Any:
+        value = data
+        for key in keys:
+            if isinstance(value, dict):
+                value = value.get(key, _MISSING)
+            else:
+                value = getattr(value, key, _MISSING)
+            if value is _MISSING:
+                return default
+        return default if value is None else value
+
+    return getter
+
+
+# ========== 预编译的事件字段 ==========
+_get_data = compile_path("data")
+_get_data_input = compile_path("data.input")
+_get_data_output = compile_path("data.output")
+_get_data_chunk = compile_path("data.chunk")
+_get_id = compile_path("id")
+_get_content = compile_path("content")
+_get_tool_calls = compile_path("tool_calls")
+_get_reasoning_content = compile_path("additional_kwargs.reasoning_content")
+
+
+def _node_info(event: Dict[str, Any]) -> tuple[str, str]:
+    """(langgraph_node, name)，事件本身与 metadata 都是 dict，直接取值"""
+    metadata = event.get("metadata")
+    langgraph_node = (metadata.get("langgraph_node") if metadata else None) or ""
+    return langgraph_node, event.get("name") or ""
+
+
+# ========== 输出截断 ==========
+# 与 truncate_if_too_long 的默认 token 上限一致
+_OUTPUT_TOKEN_LIMIT = 400
+# 字符串化之前，超过该长度的文本先按字符截取（远超 token 上限，不影响截断后的结果）
+_OUTPUT_CHAR_LIMIT = _OUTPUT_TOKEN_LIMIT * 8
+# 递归截取容器的最大深度
+_CLIP_DEPTH = 4
+
+
+def _clip(value: Any, depth: int = 0) -> tuple[Any, bool]:
+    """截取大文本 / 消息内容 / 容器中的长字符串，返回 (截取后的值, 是否截取过)"""
+    if isinstance(value, str):
+        if len(value) > _OUTPUT_CHAR_LIMIT:
+            return value[:_OUTPUT_CHAR_LIMIT], True
+        return value, False
+    if depth >= _CLIP_DEPTH:
+        return value, False
+    if isinstance(value, BaseMessage):
+        content, clipped = _clip(value.content, depth + 1)
+        if clipped:
+            return value.model_copy(update={"content": content}), True
+        return value, False
+    if isinstance(value, (list, tuple)):
+        items = [_clip(item, depth + 1) for item in value]
+        if any(clipped for _, clipped in items):
+            _clipped = [item for item, _ in items]
+            return (_clipped if isinstance(value, list) else tuple(_clipped)), True
+        return value, False
+    if isinstance(value, dict):
+        items = {k: _clip(v, depth + 1) for k, v in value.items()}
+        if any(clipped for _, clipped in items.values()):
+            return {k: v for k, (v, _) in items.items()}, True
+        return value, False
+    return value, False
+
+
+def truncate_output(value: Any) -> str:
+    """
+    等价于 truncate_if_too_long(str(value))，但先截取大对象再字符串化、分词
+    Args:
+        value: 任意输出（字符串、消息、tool_calls 等）
+    Returns:
+        截断后的字符串
+    """
+    value, clipped = _clip(value)
+    text = value if isinstance(value, str) else str(value)
+    if len(text) <= _OUTPUT_TOKEN_LIMIT and not clipped:
+        return text
+    result = truncate_if_too_long(text, _OUTPUT_TOKEN_LIMIT)
+    if clipped and result is text:
+        # 截取后的内容未超过 token 上限，仍需标注原始输出被截断
+        result = text + "\n" + TRUNCATION_GUIDANCE
+    return result  # type: ignore[return-value]
+
+
 def extract_interrupt_data_from_exc(chunk) -> Dict[str, Any]:
     """
     针对格式 (Interrupt(value={'message_id': 'Nova', ...}, id='xxx'),) 提取数据
@@ -144,8 +248,7 @@ class ChainStartHandler(EventHandler):
 
     @staticmethod
     def handle(trace_id: str, event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        langgraph_node = safe_get(event, "metadata.langgraph_node", "")
-        name = safe_get(event, "name", "")
+        langgraph_node, name = _node_info(event)
 
         if should_filter_event(langgraph_node, name):
             return None
@@ -164,14 +267,13 @@ class ChainEndHandler(EventHandler):
 
     @staticmethod
     def handle(trace_id: str, event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        langgraph_node = safe_get(event, "metadata.langgraph_node", "")
-        name = safe_get(event, "name", "")
+        langgraph_node, name = _node_info(event)
 
         if should_filter_event(langgraph_node, name):
             return None
 
         node_name = get_node_name(langgraph_node, name)
-        output = safe_get(event, "data.output", {})
+        output = _get_data_output(event, {})
         if isinstance(output, Command):
             output = output.update
 
@@ -180,7 +282,7 @@ class ChainEndHandler(EventHandler):
             code = output.get("code", 0)
             output = output.get("data", {})
         elif isinstance(output, str):
-            output = truncate_if_too_long(output)
+            output = truncate_output(output)
 
         return {
             "code": code,
@@ -196,12 +298,10 @@ class ToolStartHandler(EventHandler):
 
     @staticmethod
     def handle(trace_id: str, event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        langgraph_node = safe_get(event, "metadata.langgraph_node", "")
-        name = safe_get(event, "name", "")
+        langgraph_node, name = _node_info(event)
         node_name = get_node_name(langgraph_node, name)
 
-        input = safe_get(event, "data.input", "")
-        input = truncate_if_too_long(str(input))
+        input = truncate_output(_get_data_input(event, ""))
 
         return {
             "code": 0,
@@ -217,10 +317,9 @@ class ToolEndHandler(EventHandler):
 
     @staticmethod
     def handle(trace_id: str, event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        langgraph_node = safe_get(event, "metadata.langgraph_node", "")
-        name = safe_get(event, "name", "")
+        langgraph_node, name = _node_info(event)
         node_name = get_node_name(langgraph_node, name)
-        output = safe_get(event, "data.output", "")
+        output = _get_data_output(event, "")
         if isinstance(output, Command):
             output = output.update
 
@@ -229,7 +328,7 @@ class ToolEndHandler(EventHandler):
             code = output.get("code", 0)
             output = output.get("data", {})
 
-        output = truncate_if_too_long(str(output))
+        output = truncate_output(output)
 
         return {
             "code": code,
@@ -245,8 +344,7 @@ class ChatModelStartHandler(EventHandler):
 
     @staticmethod
     def handle(trace_id: str, event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        langgraph_node = safe_get(event, "metadata.langgraph_node", "")
-        name = safe_get(event, "name", "")
+        langgraph_node, name = _node_info(event)
 
         if should_filter_event(langgraph_node, name):
             return None
@@ -264,24 +362,17 @@ class ChatModelEndHandler(EventHandler):
 
     @staticmethod
     def handle(trace_id: str, event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        langgraph_node = safe_get(event, "metadata.langgraph_node", "")
-        name = safe_get(event, "name", "")
+        langgraph_node, name = _node_info(event)
 
         if should_filter_event(langgraph_node, name):
             return None
 
         node_name = get_node_name(langgraph_node, name)
 
-        content = safe_get(event, "data.output.content", "")
-        content = truncate_if_too_long(str(content))
-
-        reasoning_content = safe_get(
-            event, "data.output.additional_kwargs.reasoning_content", ""
-        )
-        reasoning_content = truncate_if_too_long(str(reasoning_content))
-
-        tool_calls = safe_get(event, "data.output.tool_calls", [])
-        tool_calls = truncate_if_too_long(str(tool_calls))
+        message = _get_data_output(event)
+        content = truncate_output(_get_content(message, ""))
+        reasoning_content = truncate_output(_get_reasoning_content(message, ""))
+        tool_calls = truncate_output(_get_tool_calls(message, []))
 
         return {
             "event_name": "on_chat_model_end",
@@ -300,17 +391,22 @@ class ChatModelStreamHandler(EventHandler):
 
     @staticmethod
     def handle(trace_id: str, event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        langgraph_node = safe_get(event, "metadata.langgraph_node", "")
-        name = safe_get(event, "name", "")
+        langgraph_node, name = _node_info(event)
 
         if should_filter_event(langgraph_node, name):
             return None
 
         node_name = get_node_name(langgraph_node, name)
-        chunk = safe_get(event, "data.chunk", {})
-        message_id = safe_get(chunk, "id", "")
-        reasoning_content = safe_get(chunk, "additional_kwargs.reasoning_content", "")
-        content = safe_get(chunk, "content", "")
+        chunk = _get_data_chunk(event, {})
+        if isinstance(chunk, BaseMessage):
+            # 热路径：模型增量输出总是消息对象，直接取属性
+            message_id = chunk.id or ""
+            reasoning_content = chunk.additional_kwargs.get("reasoning_content") or ""
+            content = chunk.content or ""
+        else:
+            message_id = _get_id(chunk, "")
+            reasoning_content = _get_reasoning_content(chunk, "")
+            content = _get_content(chunk, "")
 
         if reasoning_content:
             return {
@@ -339,11 +435,10 @@ class ChainStreamHandler(EventHandler):
 
     @staticmethod
     def handle(trace_id: str, event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        langgraph_node = safe_get(event, "metadata.langgraph_node", "")
-        name = safe_get(event, "name", "")
+        langgraph_node, name = _node_info(event)
         node_name = get_node_name(langgraph_node, name)
 
-        chunk = safe_get(event, "data.chunk")
+        chunk = _get_data_chunk(event)
         # {'__interrupt__': (Interrupt(value={'message_id': 'Nova', 'content': '对于`extract_setting`的结果是否满意，不满意的话，可以输入修改建议，若是满意的话，可以输入`满意`'}, id='3ac7d93243535334efbd8665429a406a'),)}
 
         if chunk and isinstance(chunk, dict) and "__interrupt__" in chunk:
@@ -362,15 +457,31 @@ class ParserEndHandler(EventHandler):
 
     @staticmethod
     def handle(trace_id: str, event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        langgraph_node = safe_get(event, "metadata.langgraph_node", "")
-        name = safe_get(event, "name", "")
+        langgraph_node, name = _node_info(event)
         node_name = get_node_name(langgraph_node, name)
 
         return {
             "event_name": "on_parser_end",
             "trace_id": trace_id,
             "node_name": node_name,
-            "output": safe_get(event, "data.output", ""),
+            "output": _get_data_output(event, ""),
+        }
+
+
+class CustomEventHandler(EventHandler):
+    """处理 on_custom_event 事件（如 execute 的增量输出）"""
+
+    @staticmethod
+    def handle(trace_id: str, event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        langgraph_node, name = _node_info(event)
+        node_name = get_node_name(langgraph_node, name)
+
+        return {
+            "code": 0,
+            "event_name": name or "on_custom_event",
+            "trace_id": trace_id,
+            "node_name": node_name,
+            "output": _get_data(event, {}),
         }
 
 
@@ -385,6 +496,7 @@ EVENT_HANDLERS: Dict[str, Callable[[str, Dict[str, Any]], Optional[Dict[str, Any
     "on_chat_model_stream": ChatModelStreamHandler.handle,
     "on_chain_stream": ChainStreamHandler.handle,
     "on_parser_end": ParserEndHandler.handle,
+    "on_custom_event": CustomEventHandler.handle,
 }
 
 
@@ -402,7 +514,7 @@ def handle_event(trace_id: str, event: Dict[str, Any]) -> Optional[Dict[str, Any
     """
     try:
         # 获取事件类型
-        event_kind = safe_get(event, "event")
+        event_kind = event.get("event")
 
         # 查找对应的处理器
         handler = EVENT_HANDLERS.get(event_kind)
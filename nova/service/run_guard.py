@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+# @Time   : 2026/03/20
+# @Author : zip
+# @Moto   : Knowledge comes from decomposition
+from __future__ import annotations
+
+import asyncio
+import logging
+from contextlib import aclosing
+from dataclasses import asdict, dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, TypeVar
+
+"""
+客户端断开时取消 agent 运行
+
+* cancel_on_disconnect：流在独立任务中读取，另一个任务按间隔调用 request.is_disconnected()，
+  断开时取消读取任务。取消沿生成器链（分帧 -> 序列化 -> 事件合并 -> astream_events / astream）
+  传到图的运行，正在进行的模型调用、工具、沙箱命令（终止进程组）与浏览器上下文（归还浏览器池）随之结束。
+  模型长时间思考、工具长时间执行时没有数据写出，仅靠写入失败无法及时发现断开
+* RunUsage / RUN_METRICS：统计每次运行的 token 用量，运行被取消（客户端断开、WebSocket 关闭）时
+  记录取消次数，并以已完成运行的平均用量估算节省的 token
+"""
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class RunUsage:
+    """单次运行的 token 用量
+
+    模型调用结束时取 usage_metadata.total_tokens；运行中途被取消时，
+    尚未结束的调用按已输出的增量数估算（每个增量约一个 token）
+    """
+
+    def __init__(self):
+        self.finished_tokens = 0
+        self.streaming_chunks = 0
+
+    @property
+    def tokens(self) -> int:
+        return self.finished_tokens + self.streaming_chunks
+
+    def observe(self, event: Dict[str, Any]):
+        kind = event.get("event")
+        if kind == "on_chat_model_stream":
+            self.streaming_chunks += 1
+        elif kind == "on_chat_model_end":
+            usage = getattr(event.get("data", {}).get("output"), "usage_metadata", None)
+            if usage:
+                self.finished_tokens += usage.get("total_tokens", 0)
+            else:
+                self.finished_tokens += self.streaming_chunks
+            self.streaming_chunks = 0
+
+
+@dataclass
+class RunMetrics:
+    """进程内的运行统计"""
+
+    completed_runs: int = 0
+    cancelled_runs: int = 0
+    completed_tokens: int = 0
+    cancelled_tokens: int = 0  # 被取消的运行在取消前已消耗的 token
+    tokens_saved: int = 0  # 估算值：已完成运行的平均用量减去取消前的用量
+
+    def record_completed(self, tokens: int):
+        self.completed_runs += 1
+        self.completed_tokens += tokens
+
+    def record_cancelled(self, tokens: int) -> int:
+        """记录一次取消，返回估算节省的 token"""
+        self.cancelled_runs += 1
+        self.cancelled_tokens += tokens
+        saved = 0
+        if self.completed_runs:
+            saved = max(self.completed_tokens // self.completed_runs - tokens, 0)
+        self.tokens_saved += saved
+        return saved
+
+    def snapshot(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+RUN_METRICS = RunMetrics()
+
+
+class _Failure:
+    __slots__ = ("error",)
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+_END = object()
+# 读取任务最多领先下游的帧数
+_QUEUE_SIZE = 64
+
+
+async def _produce(stream: AsyncIterator[T], queue: asyncio.Queue):
+    try:
+        async with aclosing(stream):  # type: ignore[type-var]
+            async for item in stream:
+                await queue.put(item)
+    except Exception as e:
+        await queue.put(_Failure(e))
+        return
+    await queue.put(_END)
+
+
+async def _watch(
+    is_disconnected: Callable[[], Awaitable[bool]],
+    interval: float,
+    producer: asyncio.Task,
+    queue: asyncio.Queue,
+    disconnected: asyncio.Event,
+    trace_id: str,
+):
+    """连接断开时取消读取任务，并唤醒下游"""
+    try:
+        while not await is_disconnected():
+            await asyncio.sleep(interval)
+    except Exception as e:
+        logger.warning(f"disconnect check failed, stop polling: {str(e)}")
+        return
+    disconnected.set()
+    logger.info(f"client disconnected, cancel run (trace_id={trace_id})")
+    producer.cancel()
+    await asyncio.wait({producer})
+    await queue.put(_END)
+
+
+async def cancel_on_disconnect(
+    stream: AsyncIterator[T],
+    is_disconnected: Callable[[], Awaitable[bool]],
+    poll_interval_ms: float,
+    trace_id: str = "",
+) -> AsyncIterator[T]:
+    """转发 stream；客户端断开或下游提前关闭时取消 stream 的执行
+
+    poll_interval_ms <= 0 时不轮询，仅在下游关闭本生成器时关闭 stream
+    """
+    if poll_interval_ms <= 0:
+        async with aclosing(stream):  # type: ignore[type-var]
+            async for item in stream:
+                yield item
+        return
+
+    queue: asyncio.Queue = asyncio.Queue(_QUEUE_SIZE)
+    disconnected = asyncio.Event()
+    producer = asyncio.create_task(_produce(stream, queue))
+    watcher = asyncio.create_task(
+        _watch(
+            is_disconnected,
+            poll_interval_ms / 1000,
+            producer,
+            queue,
+            disconnected,
+            trace_id,
+        )
+    )
+    try:
+        while True:
+            item = await queue.get()
+            # 已断开时丢弃队列中剩余的帧
+            if item is _END or disconnected.is_set():
+                break
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        watcher.cancel()
+        if not producer.done():
+            producer.cancel()
+            await asyncio.wait({producer})
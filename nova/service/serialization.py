@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+# @Time   : 2026/03/20
+# @Author : zip
+# @Moto   : Knowledge comes from decomposition
+from __future__ import annotations
+
+import logging
+from typing import Any, Dict, Optional
+
+import orjson
+from fastapi.responses import JSONResponse
+from langgraph.types import Send
+from pydantic import BaseModel
+
+"""
+agent 响应序列化（orjson）
+
+* 流式事件、WebSocket 消息与非流式的最终响应共用，输出结构与 SuperAgentResponse.model_dump_json() 一致：
+  {"code": ..., "err_message": ..., "data": ...}
+* dict / list / str / 数值 / dataclass（Command、Interrupt）/ datetime / UUID / Enum 由 orjson 直接编码
+* BaseMessage 等 pydantic 模型由其自身的序列化器输出 JSON 片段（orjson.Fragment）嵌入
+* 兜底：无法识别的对象编码为 str(obj)，整条响应不会因为个别字段而失败
+"""
+
+logger = logging.getLogger(__name__)
+
+_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+# 已记录过兜底编码的类型，每种只记录一次
+_fallback_types: set[type] = set()
+
+
+def _fallback(obj: Any) -> str:
+    """兜底编码"""
+    if type(obj) not in _fallback_types:
+        _fallback_types.add(type(obj))
+        logger.debug(f"json fallback to str for type {type(obj).__qualname__}")
+    return str(obj)
+
+
+def _default(obj: Any) -> Any:
+    """orjson 无法直接编码的对象"""
+    if isinstance(obj, BaseModel):
+        # 由 pydantic 的序列化器直接输出 JSON 片段，避免先转换为 dict
+        return orjson.Fragment(
+            obj.__pydantic_serializer__.to_json(obj, fallback=_fallback)
+        )
+    if isinstance(obj, Send):
+        return {"node": obj.node, "arg": obj.arg}
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, (bytes, bytearray)):
+        return obj.decode("utf-8", errors="replace")
+    return _fallback(obj)
+
+
+def dumps(obj: Any) -> bytes:
+    """编码为 UTF-8 JSON"""
+    return orjson.dumps(obj, default=_default, option=_OPTIONS)
+
+
+def response_payload(
+    code: int, data: Optional[Dict[str, Any]] = None, err_message: str = ""
+) -> Dict[str, Any]:
+    """与 SuperAgentResponse 字段顺序一致的响应字典"""
+    return {"code": code, "err_message": err_message, "data": data or {}}
+
+
+def dump_response(
+    code: int, data: Optional[Dict[str, Any]] = None, err_message: str = ""
+) -> str:
+    """流式事件 / WebSocket 消息，等价于 SuperAgentResponse(...).model_dump_json()"""
+    return dumps(response_payload(code, data, err_message)).decode("utf-8")
+
+
+def dump_payload(payload: Dict[str, Any]) -> str:
+    """序列化 response_payload 产生的字典；失败时返回错误响应"""
+    try:
+        return dumps(payload).decode("utf-8")
+    except orjson.JSONEncodeError:
+        return dump_response(1, err_message="data is not json serializable")
+
+
+class AgentJSONResponse(JSONResponse):
+    """以 orjson 编码的 JSON 响应"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def agent_response(
+    code: int, data: Optional[Dict[str, Any]] = None, err_message: str = ""
+) -> AgentJSONResponse:
+    """非流式接口的响应，等价于直接返回 SuperAgentResponse"""
+    return AgentJSONResponse(response_payload(code, data, err_message))
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+# @Time   : 2026/03/20
+# @Author : zip
+# @Moto   : Knowledge comes from decomposition
+from __future__ import annotations
+
+from typing import Any, AsyncIterator, Dict, Literal
+
+from langchain_core.messages import AIMessage, AIMessageChunk, ToolMessage
+from langgraph.prebuilt.tool_node import ToolNode
+
+"""
+流式引擎
+
+* events：astream_events(version="v2")，每个 runnable 都产生回调事件，再由 handle_event 过滤
+* astream：astream(stream_mode=["messages", "updates", "custom", "tasks", "values"])，
+  只接收需要转发的事件，并转换为与 astream_events v2 相同结构的事件字典，handle_event 无需改动
+
+astream 引擎的事件对应关系：
+    messages（AIMessageChunk）   -> on_chat_model_start（每条消息的第一个增量前）/ on_chat_model_stream
+                                    （工具节点内部的模型调用不转发，同 should_filter_event）
+    tasks（节点开始）            -> on_chain_start
+    updates（节点结束）          -> on_chat_model_end（节点写入的 AIMessage）、
+                                    on_tool_end（节点写入的 ToolMessage）、on_chain_end
+    AIMessage.tool_calls         -> on_tool_start（执行工具的节点开始时补发，节点名为该节点；
+                                    根图按 ToolNode 判断，子图按节点名含 tool 判断；
+                                    路由到其他节点（如 human_feedback）的工具调用不补发）
+    updates（__interrupt__）     -> on_chain_stream（human_in_loop）
+    custom                       -> on_custom_event（emit_custom_event 写入）
+    values                       -> 结束时的 LangGraph on_chain_end
+    条件边（根图）               -> 路由函数的 on_chain_start / on_chain_end（输出为路由结果）
+
+astream 不产出条件边的事件，路由结果在下一个节点开始时才能确定：
+有条件边的节点结束时，其 on_chain_end 暂缓，下一个节点开始（或运行结束，路由到 __end__）时
+按 astream_events 的顺序补发 路由 on_chain_start -> 路由 on_chain_end -> 节点 on_chain_end。
+子图内部的条件边不补发
+"""
+
+StreamEngine = Literal["events", "astream"]
+
+STREAM_MODES = ["messages", "updates", "custom", "tasks", "values"]
+
+_INTERRUPT = "__interrupt__"
+_END = "__end__"
+
+
+def _event(kind: str, name: str, node: str | None, data: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "event": kind,
+        "name": name,
+        "metadata": {"langgraph_node": node} if node else {},
+        "data": data,
+    }
+
+
+def _update_messages(update: Any) -> list:
+    if not isinstance(update, dict):
+        return []
+    messages = update.get("messages")
+    if messages is None:
+        return []
+    return messages if isinstance(messages, list) else [messages]
+
+
+def _update_events(
+    node: str, update: Any, pending_tool_calls: list
+) -> list[Dict[str, Any]]:
+    """节点结束：先是节点写入的模型输出 / 工具结果，再是节点本身的 on_chain_end
+
+    最新 AIMessage 的工具调用覆盖 pending_tool_calls，在执行它们的节点开始时补发 on_tool_start；
+    未被执行的旧调用（如路由到 human_feedback）随之丢弃
+    """
+    events = []
+    for message in _update_messages(update):
+        if isinstance(message, AIMessage):
+            events.append(_event("on_chat_model_end", node, node, {"output": message}))
+            pending_tool_calls[:] = message.tool_calls
+        elif isinstance(message, ToolMessage):
+            # updates 中的消息已由 add_messages 分配 id，工具返回时（astream_events）尚无 id
+            output = message.model_copy(update={"id": None})
+            events.append(
+                _event("on_tool_end", message.name or "", node, {"output": output})
+            )
+    events.append(_event("on_chain_end", node, node, {"output": update}))
+    return events
+
+
+def _graph_branches(instance) -> Dict[str, Dict[str, Any]]:
+    """根图的条件边：源节点 -> {路由名: BranchSpec}"""
+    branches = getattr(getattr(instance, "builder", None), "branches", None)
+    return dict(branches) if branches else {}
+
+
+def _tool_nodes(instance) -> set[str]:
+    """根图中执行工具调用的节点（ToolNode）"""
+    nodes = getattr(getattr(instance, "builder", None), "nodes", None) or {}
+    return {
+        name
+        for name, spec in nodes.items()
+        if isinstance(getattr(spec, "runnable", None), ToolNode)
+    }
+
+
+def _executes_tools(node: str, namespace: tuple, tool_nodes: set[str]) -> bool:
+    """节点是否执行 pending 的工具调用；子图拿不到节点定义，按节点名判断（同 messages 的过滤）"""
+    if not namespace:
+        return node in tool_nodes
+    return "tool" in node
+
+
+def _route_events(
+    node: str, branches: Dict[str, Any], next_node: str
+) -> list[Dict[str, Any]]:
+    """补发节点条件边的路由事件；输出按 path_map 还原为路由函数的返回值"""
+    events = []
+    for name, branch in branches.items():
+        ends = getattr(branch, "ends", None) or {}
+        output = next((k for k, v in ends.items() if v == next_node), next_node)
+        events.append(_event("on_chain_start", name, node, {}))
+        events.append(_event("on_chain_end", name, node, {"output": output}))
+    return events
+
+
+async def astream_as_events(
+    instance, req: Any, config: Dict[str, Any], context: Any
+) -> AsyncIterator[Dict[str, Any]]:
+    """以 astream 多模式流驱动 agent，产出 astream_events v2 结构的事件"""
+    graph_name = getattr(instance, "name", None) or "LangGraph"
+    yield _event("on_chain_start", graph_name, None, {"input": req})
+
+    final_values: Any = None
+    # 正在流式输出的消息 id，新消息的第一个增量之前补发 on_chat_model_start
+    streaming_id: str | None = None
+    pending_tool_calls: list = []
+    branches = _graph_branches(instance)
+    tool_nodes = _tool_nodes(instance)
+    # 等待路由结果的节点：(节点名, 节点的 on_chain_end)
+    pending_routes: list[tuple[str, Dict[str, Any]]] = []
+
+    def _flush_routes(next_node: str) -> list[Dict[str, Any]]:
+        events = []
+        for routed, chain_end in pending_routes:
+            events += _route_events(routed, branches[routed], next_node)
+            events.append(chain_end)
+        pending_routes.clear()
+        return events
+
+    async for namespace, mode, chunk in instance.astream(
+        req,
+        config=config,
+        context=context,
+        stream_mode=STREAM_MODES,
+        subgraphs=True,
+    ):
+        if mode == "messages":
+            message, metadata = chunk
+            node = metadata.get("langgraph_node") or ""
+            # 只转发模型的增量输出；完整消息由 updates 转换；工具内部的模型调用不展示
+            if isinstance(message, AIMessageChunk) and "tool" not in node:
+                if message.id != streaming_id:
+                    streaming_id = message.id
+                    yield _event("on_chat_model_start", node, node, {})
+                yield _event(
+                    "on_chat_model_stream", node, node, {"chunk": message}
+                )
+
+        elif mode == "tasks":
+            # 任务开始时带 input，结束时带 result，这里只取开始
+            if "input" in chunk:
+                node = chunk["name"]
+                if not namespace:
+                    for event in _flush_routes(node):
+                        yield event
+                yield _event("on_chain_start", node, node, {})
+                if _executes_tools(node, namespace, tool_nodes):
+                    for tool_call in pending_tool_calls:
+                        yield _event(
+                            "on_tool_start", tool_call["name"], node, {"input": tool_call["args"]}
+                        )
+                    pending_tool_calls.clear()
+
+        elif mode == "updates":
+            for node, update in chunk.items():
+                if node == _INTERRUPT:
+                    yield _event(
+                        "on_chain_stream",
+                        graph_name,
+                        None,
+                        {"chunk": {_INTERRUPT: update}},
+                    )
+                    continue
+                events = _update_events(node, update, pending_tool_calls)
+                if not namespace and node in branches:
+                    # 节点的 on_chain_end 在路由事件之后
+                    pending_routes.append((node, events.pop()))
+                for event in events:
+                    yield event
+
+        elif mode == "custom":
+            if isinstance(chunk, dict) and "name" in chunk:
+                yield _event(
+                    "on_custom_event", chunk["name"], chunk.get("node"), chunk.get("data", {})
+                )
+
+        elif mode == "values" and not namespace:
+            final_values = chunk
+
+    for event in _flush_routes(_END):
+        yield event
+    yield _event("on_chain_end", graph_name, None, {"output": final_values})
+
+
+def stream_events(
+    engine: StreamEngine, instance, req: Any, config: Dict[str, Any], context: Any
+) -> AsyncIterator[Dict[str, Any]]:
+    """按配置选择流式引擎，两者产出的事件结构一致"""
+    if engine == "astream":
+        return astream_as_events(instance, req, config, context)
+    return instance.astream_events(req, config=config, context=context, version="v2")
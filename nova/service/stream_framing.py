@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+# @Time   : 2026/03/20
+# @Author : zip
+# @Moto   : Knowledge comes from decomposition
+from __future__ import annotations
+
+from typing import AsyncIterable, AsyncIterator, Literal
+
+"""
+/agent/service 流式响应的分帧协议
+
+* ndjson: 每个事件一行 JSON（application/x-ndjson），客户端按行解析
+* sse: text/event-stream，每个事件带自增 id，首帧下发 retry 重连间隔，
+  结束时发送 event: end，避免 EventSource 在正常结束后自动重连、重复执行任务
+* 事件之间有明确边界，TCP 合并或拆分写入都不影响解析，服务端可以把多个事件合并为一次写入
+"""
+
+StreamFormat = Literal["ndjson", "sse"]
+
+MEDIA_TYPES: dict[str, str] = {
+    "ndjson": "application/x-ndjson",
+    "sse": "text/event-stream",
+}
+
+# 禁止中间层（nginx 等）缓存流式响应
+STREAM_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+}
+
+# SSE 正常结束时的事件名
+SSE_END_EVENT = "end"
+
+
+def resolve_stream_format(
+    requested: str | None, accept: str | None, default: StreamFormat
+) -> StreamFormat:
+    """请求体中显式指定的格式优先，其次根据 Accept 头判断"""
+    if requested in MEDIA_TYPES:
+        return requested  # type: ignore[return-value]
+    if accept and "text/event-stream" in accept:
+        return "sse"
+    if accept and "application/x-ndjson" in accept:
+        return "ndjson"
+    return default
+
+
+def _sse_data(payload: str) -> str:
+    # data 字段不能包含换行，多行内容拆成多个 data 行（JSON 序列化结果本身不含换行）
+    if "\n" not in payload:
+        return f"data: {payload}\n"
+    return "".join(f"data: {line}\n" for line in payload.split("\n"))
+
+
+class SSEEncoder:
+    """SSE 帧编码：自增事件 id，首帧附带 retry"""
+
+    def __init__(self, retry_ms: int):
+        self.retry_ms = retry_ms
+        self.last_id = 0
+
+    def encode(self, payload: str, event: str | None = None) -> str:
+        self.last_id += 1
+        head = f"retry: {self.retry_ms}\n" if self.last_id == 1 else ""
+        if event:
+            head += f"event: {event}\n"
+        return f"{head}id: {self.last_id}\n{_sse_data(payload)}\n"
+
+    def end(self) -> str:
+        return self.encode("{}", event=SSE_END_EVENT)
+
+
+async def frame_stream(
+    payloads: AsyncIterable[str], fmt: StreamFormat, sse_retry_ms: int = 3000
+) -> AsyncIterator[str]:
+    """将序列化好的 JSON 事件按指定格式分帧"""
+    if fmt == "sse":
+        encoder = SSEEncoder(sse_retry_ms)
+        async for payload in payloads:
+            yield encoder.encode(payload)
+        yield encoder.end()
+        return
+
+    async for payload in payloads:
+        yield payload + "\n"
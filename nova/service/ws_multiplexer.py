@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+# @Time   : 2026/03/20
+# @Author : zip
+# @Moto   : Knowledge comes from decomposition
+from __future__ import annotations
+
+import asyncio
+import logging
+import uuid
+from collections import deque
+from contextlib import suppress
+from typing import Any, AsyncIterator, Callable, Dict, Literal, Optional
+
+from fastapi import WebSocket
+
+from nova.model.service import SuperAgentRequest
+from nova.service.event_coalescer import stream_key
+from nova.service.serialization import dump_payload, response_payload
+
+"""
+WebSocket 多路复用
+
+* 一个连接上可以同时执行多个运行，每个发出的帧带 run_id（请求中的 run_id，未指定时自动生成），
+  运行结束时发送 data.event_name == "run_end" 的帧
+* 每个连接最多 max_runs 个并发运行，超出的请求直接返回错误帧
+* 所有帧经有界队列由单个任务发送：队列满时非 token 事件等待（对应的运行随之暂停），形成背压；
+  token 增量按 token_policy 处理：
+    coalesce  并入该运行排队中的上一个同类增量，无法合并时同样等待
+    drop      直接丢弃（完整内容仍由 on_chat_model_end 下发）
+* 连接断开时取消该连接上的所有运行
+"""
+
+logger = logging.getLogger(__name__)
+
+TokenPolicy = Literal["coalesce", "drop"]
+
+RUN_END_EVENT = "run_end"
+
+
+def _frame(run_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    return {"run_id": run_id, **payload}
+
+
+class OutboundQueue:
+    """有界的 WebSocket 发送队列"""
+
+    def __init__(self, maxsize: int, token_policy: TokenPolicy):
+        self.maxsize = maxsize
+        self.token_policy = token_policy
+        self.dropped = 0
+        self.coalesced = 0
+        self._frames: deque[Dict[str, Any]] = deque()
+        self._cond = asyncio.Condition()
+        self._closed = False
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def _absorb(self, frame: Dict[str, Any]) -> bool:
+        """队列满时按策略处理 token 增量，处理后不占用队列位置"""
+        key = stream_key(frame["data"])
+        if key is None:
+            return False
+        if self.token_policy == "drop":
+            self.dropped += 1
+            return True
+
+        # 只能并入该运行排在最后的帧，保持同一运行内的事件顺序
+        for queued in reversed(self._frames):
+            if queued["run_id"] != frame["run_id"]:
+                continue
+            if stream_key(queued["data"]) != key:
+                return False
+            field = key[2]
+            data = queued["data"]
+            text = data["output"][field] + frame["data"]["output"][field]
+            queued["data"] = {**data, "output": {**data["output"], field: text}}
+            self.coalesced += 1
+            return True
+        return False
+
+    async def put(self, frame: Dict[str, Any]) -> None:
+        async with self._cond:
+            if self._closed:
+                return
+            if len(self._frames) >= self.maxsize and self._absorb(frame):
+                return
+            await self._cond.wait_for(
+                lambda: self._closed or len(self._frames) < self.maxsize
+            )
+            if self._closed:
+                return
+            self._frames.append(frame)
+            self._cond.notify_all()
+
+    async def get(self) -> Optional[Dict[str, Any]]:
+        """取出下一个帧；队列关闭后返回 None"""
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._closed or bool(self._frames))
+            if self._closed:
+                return None
+            frame = self._frames.popleft()
+            self._cond.notify_all()
+            return frame
+
+    async def close(self) -> None:
+        """关闭队列，丢弃未发送的帧，唤醒所有等待者"""
+        async with self._cond:
+            self._closed = True
+            self._frames.clear()
+            self._cond.notify_all()
+
+
+class WebSocketSession:
+    """一个 WebSocket 连接上的多个 agent 运行"""
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        handler: Callable[[SuperAgentRequest], AsyncIterator[Dict[str, Any]]],
+        max_runs: int,
+        queue_size: int,
+        token_policy: TokenPolicy = "coalesce",
+    ):
+        self.websocket = websocket
+        self.handler = handler
+        self.max_runs = max_runs
+        self.queue = OutboundQueue(queue_size, token_policy)
+        self.runs: dict[str, asyncio.Task] = {}
+        self._sender = asyncio.create_task(self._send_loop())
+
+    async def _send_loop(self):
+        try:
+            while (frame := await self.queue.get()) is not None:
+                await self.websocket.send_text(dump_payload(frame))
+        except Exception as e:
+            # 连接已断开，结果无人接收，取消仍在执行的运行
+            logger.info(f"websocket sender stopped: {str(e)}")
+            await self.queue.close()
+            for task in list(self.runs.values()):
+                task.cancel()
+
+    async def submit(self, request: SuperAgentRequest) -> None:
+        """启动一个运行；同名运行仍在执行或并发数已满时返回错误帧"""
+        run_id = request.run_id or uuid.uuid4().hex
+        if run_id in self.runs:
+            await self.queue.put(
+                _frame(
+                    run_id, response_payload(1, err_message="run_id is already running")
+                )
+            )
+            return
+        if len(self.runs) >= self.max_runs:
+            await self.queue.put(
+                _frame(
+                    run_id,
+                    response_payload(
+                        1, err_message=f"too many concurrent runs (max {self.max_runs})"
+                    ),
+                )
+            )
+            return
+
+        task = asyncio.create_task(self._run(run_id, request))
+        self.runs[run_id] = task
+        task.add_done_callback(lambda _: self.runs.pop(run_id, None))
+
+    async def _run(self, run_id: str, request: SuperAgentRequest):
+        responses = self.handler(request)
+        try:
+            async for payload in responses:
+                await self.queue.put(_frame(run_id, payload))
+        except Exception as e:
+            logger.error(
+                f"websocket run error (run_id={run_id}): {str(e)}", exc_info=True
+            )
+            await self.queue.put(
+                _frame(
+                    run_id, response_payload(1, err_message=f"Service error: {str(e)}")
+                )
+            )
+        finally:
+            if hasattr(responses, "aclose"):
+                await responses.aclose()  # type: ignore[attr-defined]
+        await self.queue.put(
+            _frame(run_id, response_payload(0, {"event_name": RUN_END_EVENT}, "ok"))
+        )
+
+    async def close(self) -> None:
+        """取消仍在执行的运行，停止发送"""
+        runs = list(self.runs.values())
+        if runs:
+            logger.info(f"websocket closed, cancel {len(runs)} runs")
+        for task in runs:
+            task.cancel()
+        await asyncio.gather(*runs, return_exceptions=True)
+        await self.queue.close()
+        if not self._sender.done():
+            self._sender.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._sender
+        if self.queue.dropped or self.queue.coalesced:
+            logger.info(
+                f"websocket outbound queue: dropped={self.queue.dropped}, "
+                f"coalesced={self.queue.coalesced}"
+            )
@@ -16,6 +16,7 @@ from nova.controller.sandbox_exceptions import (
 from nova.model.super_agent import SuperContext, SuperState
 from nova.sandbox.sandbox import Sandbox
 from nova.sandbox.sandbox_provider import get_sandbox_provider
+from nova.utils.common import emit_custom_event
 
 
 # ======================================================================================
@@ -47,13 +48,13 @@ def ensure_sandbox_initialized(
         raise SandboxRuntimeError("Tool runtime state not available")
 
     # Check if sandbox already exists in state
-    sandbox_id = runtime.state.get("sandbox_id", "local")
+    sandbox_id = runtime.state.get("sandbox_id")
 
-    sandbox = get_sandbox_provider().get(cast(str, sandbox_id))
-
-    if sandbox is not None:
-        return sandbox
-        # Sandbox was released, fall through to acquire new one
+    if sandbox_id is not None:
+        sandbox = get_sandbox_provider().get(cast(str, sandbox_id))
+        if sandbox is not None:
+            return sandbox
+        # Sandbox was released (e.g. evicted as idle), fall through to acquire new one
 
     # Lazy acquisition: get thread_id and acquire sandbox
     thread_id = runtime.context.get("thread_id")
@@ -128,7 +129,7 @@ async def sandbox_read_file_tool(
 ):
     try:
         sandbox = ensure_sandbox_initialized(runtime)
-        result = sandbox.read_file(file_path, offset, limit)
+        result = await sandbox.aread_file(file_path, offset, limit)
         return result
 
     except SandboxError as e:
@@ -160,7 +161,7 @@ async def sandbox_write_file_tool(
 ):
     try:
         sandbox = ensure_sandbox_initialized(runtime)
-        result = sandbox.write_file(file_path, content, append)
+        result = await sandbox.awrite_file(file_path, content, append)
         return result
 
     except SandboxError as e:
@@ -195,7 +196,7 @@ async def sandbox_edit_file_tool(
 ):
     try:
         sandbox = ensure_sandbox_initialized(runtime)
-        result = sandbox.edit_file(file_path, old_string, new_string, replace_all)
+        result = await sandbox.aedit_file(file_path, old_string, new_string, replace_all)
         return result
 
     except SandboxError as e:
@@ -225,7 +226,7 @@ async def sandbox_ls_tool(
 ):
     try:
         sandbox = ensure_sandbox_initialized(runtime)
-        result = sandbox.ls(path)
+        result = await sandbox.als(path)
         if not result:
             return "(empty)"
         return result
@@ -262,7 +263,7 @@ async def sandbox_glob_tool(
 ):
     try:
         sandbox = ensure_sandbox_initialized(runtime)
-        result = sandbox.glob(pattern, path)
+        result = await sandbox.aglob(pattern, path)
         return result
 
     except SandboxError as e:
@@ -306,7 +307,7 @@ async def sandbox_grep_tool(
 ):
     try:
         sandbox = ensure_sandbox_initialized(runtime)
-        result = sandbox.grep(pattern, path, glob, output_mode)
+        result = await sandbox.agrep(pattern, path, glob, output_mode)
         return result
 
     except SandboxError as e:
@@ -365,6 +366,10 @@ Note: This tool is only available if the backend supports execution (SandboxBack
 If execution is not supported, the tool will return an error message."""
 
 
+# execute 增量输出的自定义事件名
+EXECUTE_OUTPUT_EVENT = "sandbox_execute_output"
+
+
 @tool("execute", description=EXECUTE_DESCRIPTION)
 async def sandbox_execute_tool(
     runtime: ToolRuntime[SuperContext, SuperState],
@@ -372,7 +377,25 @@ async def sandbox_execute_tool(
 ):
     try:
         sandbox = ensure_sandbox_initialized(runtime)
-        result = sandbox.execute(command)
+
+        async def _on_output(stream: str, text: str):
+            # 增量输出以自定义事件推送给前端
+            await emit_custom_event(
+                EXECUTE_OUTPUT_EVENT,
+                {
+                    "tool_call_id": runtime.tool_call_id,
+                    "stream": stream,
+                    "text": text,
+                },
+                runtime.stream_writer,
+            )
+
+        # 同一线程的命令在同一个常驻 shell 中执行，cwd / 环境变量在多次调用之间保留
+        result = await sandbox.aexecute(
+            command,
+            on_output=_on_output,
+            session_id=runtime.context.get("thread_id"),
+        )
         return result
 
     except SandboxError as e:
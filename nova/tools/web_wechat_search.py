@@ -5,15 +5,16 @@
 from __future__ import annotations
 
 import asyncio
+import html
 import json
 import logging
 import random
 import re
-import time
-from typing import Optional
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
 from urllib.parse import urljoin, urlparse
 
-from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig
+from crawl4ai import CrawlerRunConfig
 from crawl4ai.async_configs import CacheMode
 from crawl4ai.content_filter_strategy import PruningContentFilter
 from crawl4ai.content_scraping_strategy import LXMLWebScrapingStrategy
@@ -23,15 +24,21 @@ from langchain.tools import ToolRuntime, tool
 from langchain_core.messages import HumanMessage
 from langgraph.types import Command
 from markdownify import markdownify as md
-from playwright.async_api import Browser, BrowserContext, async_playwright
 
+from nova.memory import CRAWLCACHE
 from nova.model.super_agent import SuperContext, SuperState
+from nova.provider import (
+    get_browser_pool_provider,
+    get_crawl_scheduler_provider,
+    get_page_fetcher_provider,
+    get_sogou_url_fetcher,
+)
 
 # from nova.node import webpage_summarize_agent
 from nova.utils.common import (
     truncate_if_too_long,
 )
-from nova.utils.url_fetcher import SogouUrlFetcher
+from nova.utils.text_dedup import dedup_near_duplicates
 
 logger = logging.getLogger(__name__)
 
@@ -94,6 +101,189 @@ Examples:
 """
 
 
+@dataclass
+class CrawlPage:
+    """单个页面的爬取结果（失败时 content 为错误信息）"""
+
+    success: bool
+    content: str
+    title: str = ""
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    # 永久性失败（4xx），重试也不会成功；只有这类失败写入负缓存
+    permanent: bool = False
+
+
+def _is_permanent_status(status_code: Optional[int]) -> bool:
+    """4xx 视为永久失败；408 / 429 是超时与限流，稍后重试可能成功"""
+    return (
+        status_code is not None
+        and 400 <= status_code < 500
+        and status_code not in (408, 429)
+    )
+
+
+async def crawl_with_cache(
+    url: str, crawl_fn: Callable[[str], Awaitable[CrawlPage]]
+) -> str:
+    """先查爬取缓存，未命中（或过期且重验证失败）时才真正爬取，并回写缓存"""
+    _cache = CRAWLCACHE
+    if _cache is not None:
+        try:
+            entry = await _cache.get(url)
+        except Exception as e:
+            logger.warning(f"[CrawlCache] get {url} failed: {e}")
+            entry = None
+
+        if entry is not None:
+            if entry.is_failed and entry.is_fresh:
+                logger.info(f"[CrawlCache] negative hit: {url}")
+                return entry.error
+            if not entry.is_failed and (
+                entry.is_fresh or await _cache.revalidate(entry)
+            ):
+                logger.info(f"[CrawlCache] hit: {url}")
+                return entry.content
+
+    page = await crawl_fn(url)
+
+    if _cache is not None:
+        try:
+            if page.success:
+                await _cache.put(
+                    url, page.title, page.content, page.etag, page.last_modified
+                )
+            elif page.permanent:
+                # 超时、截止时间到、网络错误等暂时性失败不缓存，下次重新爬取
+                await _cache.put_failure(url, page.content)
+        except Exception as e:
+            logger.warning(f"[CrawlCache] put {url} failed: {e}")
+
+    return page.content
+
+
+def _get_header(headers: Optional[dict], name: str) -> Optional[str]:
+    if not headers:
+        return None
+    for key, value in headers.items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+_TITLE_PATTERN = re.compile(r"<title[^>]*>(.*?)</title>", re.I | re.S)
+
+
+async def _fetch_static_page(url: str) -> Optional[CrawlPage]:
+    """
+    HTTP 直接抓取；页面依赖 JS 渲染或抓取失败时返回 None，由调用方升级到浏览器
+    只有抓取成功时才记录域名是否需要渲染，404、网络错误等不计入
+    """
+    fetcher = get_page_fetcher_provider()
+    static_page = await fetcher.fetch(url)
+    if static_page is None:
+        return None
+
+    try:
+        _title_match = _TITLE_PATTERN.search(static_page.html)
+        title = (
+            html.unescape(_title_match.group(1)).strip() if _title_match else ""
+        ) or "No Title"
+        content = Article(static_page.url, title, static_page.html).to_markdown()
+    except Exception as e:
+        logger.warning(f"Static content processing failed for {url}: {e}")
+        return None
+
+    _rendered = fetcher.looks_js_rendered(
+        static_page.html, clean_markdown_links(content)
+    )
+    fetcher.record(url, rendered=_rendered)
+    if _rendered:
+        return None
+
+    return CrawlPage(
+        True,
+        content,
+        title=title,
+        etag=_get_header(static_page.headers, "etag"),
+        last_modified=_get_header(static_page.headers, "last-modified"),
+    )
+
+
+async def _crawl_web_page(url: str) -> CrawlPage:
+    # 第一级：HTTP 直接抓取（已知需要渲染的域名跳过）
+    fetcher = get_page_fetcher_provider()
+    if not fetcher.should_render(url):
+        static_page = await _fetch_static_page(url)
+        if static_page is not None:
+            logger.info(f"Static fetch completed: {url}")
+            return static_page
+        logger.info(f"Static fetch insufficient, escalate to browser: {url}")
+
+    # 第二级：浏览器渲染
+    return await _render_web_page(url)
+
+
+async def _render_web_page(url: str) -> CrawlPage:
+    # 配置爬虫运行参数
+    run_conf = CrawlerRunConfig(
+        scraping_strategy=LXMLWebScrapingStrategy(),
+        stream=True,
+        verbose=True,
+        markdown_generator=DefaultMarkdownGenerator(
+            content_filter=PruningContentFilter(threshold=0.4, threshold_type="fixed")
+        ),
+        wait_for_images=False,
+        scan_full_page=True,
+        scroll_delay=0.5,
+        cache_mode=CacheMode.BYPASS,  # 缓存由 CRAWLCACHE 统一管理
+    )
+    # Execute the crawl（复用进程级浏览器池中的 crawler，不再每次启动 Chromium）
+    async with get_browser_pool_provider().acquire_crawler() as crawler:
+        logger.info(f"Starting crawl of {url}")
+
+        # 关键修复：arun()返回CrawlResultContainer，无需async for
+        crawl_result: CrawlResult = await crawler.arun(
+            url=url,
+            config=run_conf,
+            render=True,  # 启用JS渲染（处理动态页面）
+            render_timeout=20_000,  # 页面渲染超时
+        )  # type: ignore
+
+    # 4. 处理单条爬取结果
+    if not crawl_result.success:
+        error_msg = crawl_result.error_message or "Unknown error during crawl"
+        logger.warning(f"Failed to crawl {url}: {error_msg}")
+        return CrawlPage(
+            False,
+            f"Failed to crawl {url}: {error_msg}",
+            permanent=_is_permanent_status(crawl_result.status_code),
+        )
+
+    # 安全解析HTML内容
+    try:
+        title = crawl_result.metadata.get("title") or "No Title"  # type: ignore
+        content = crawl_result.html or crawl_result.markdown or ""
+        content = Article(crawl_result.url, title, content).to_markdown()
+
+        logger.info(f"Crawl completed. Total successful pages: {crawl_result.url}")
+        headers = crawl_result.response_headers
+        return CrawlPage(
+            True,
+            content,
+            title=title,
+            etag=_get_header(headers, "etag"),
+            last_modified=_get_header(headers, "last-modified"),
+        )
+
+    except Exception as e:
+        logger.error(
+            f"Content processing failed for {url}: {str(e)}",
+            exc_info=True,  # 打印完整堆栈，便于调试
+        )
+        return CrawlPage(False, f"Content processing failed for {url}: {str(e)}")
+
+
 @tool("web_crawl", description=WEB_CRAWL_TOOL_DESCRIPTION)
 async def web_crawl(url: str) -> str:
     def validate_url(v: str) -> str:
@@ -104,94 +294,14 @@ async def web_crawl(url: str) -> str:
 
     try:
         url = validate_url(url)
-        # 配置爬虫运行参数
-        run_conf = CrawlerRunConfig(
-            scraping_strategy=LXMLWebScrapingStrategy(),
-            stream=True,
-            verbose=True,
-            markdown_generator=DefaultMarkdownGenerator(
-                content_filter=PruningContentFilter(
-                    threshold=0.4, threshold_type="fixed"
-                )
-            ),
-            wait_for_images=False,
-            scan_full_page=True,
-            scroll_delay=0.5,
-            cache_mode=CacheMode.BYPASS,
-        )
-        # 配置浏览器（优化渲染性能）
-        browser_conf = BrowserConfig(
-            browser_type="chromium",
-            headless=True,  # 无头模式（生产环境推荐）
-            extra_args=[
-                "--blink-settings=imagesEnabled=false",  # 禁用图片加载（提速）
-                "--disable-blink-features=AutomationControlled",  # 隐藏自动化标记
-                "--no-sandbox",  # 容器环境必备（避免权限问题）
-                "--disable-gpu",  # 禁用GPU加速（减少资源占用）
-            ],
-        )
-
-        # Execute the crawl
-        async with AsyncWebCrawler(config=browser_conf) as crawler:
-            logger.info(f"Starting crawl of {url}")
-
-            # 关键修复：arun()返回CrawlResultContainer，无需async for
-            crawl_result: CrawlResult = await crawler.arun(
-                url=url,
-                config=run_conf,
-                render=True,  # 启用JS渲染（处理动态页面）
-                render_timeout=20_000,  # 页面渲染超时
-            )  # type: ignore
-
-            # 4. 处理单条爬取结果
-            if not crawl_result.success:
-                error_msg = crawl_result.error_message or "Unknown error during crawl"
-                logger.warning(f"Failed to crawl {url}: {error_msg}")
-                return f"Failed to crawl {url}: {error_msg}"
-
-            # 安全解析HTML内容
-            try:
-                # 替换可能有问题的simple_json_from_html_string，使用更健壮的处理
-                # 假设这里使用更可靠的解析方式
-                title = crawl_result.metadata.get("title") or "No Title"  # type: ignore
-                # 或使用result.markdown如果生成了markdown
-                # 清理超链接（如果启用）
-                content = crawl_result.html or crawl_result.markdown or ""
-
-                content = Article(crawl_result.url, title, content).to_markdown()
-
-                # result = {
-                #     "url": crawl_result.url,
-                #     "title": title,
-                #     "content": content,
-                #     "metadata": {
-                #         "publish_time": crawl_result.metadata.get(  # type: ignore
-                #             "publish_time", "Unknown"
-                #         ),
-                #         "author": crawl_result.metadata.get("author", "Unknown"),  # type: ignore
-                #         "is_success": crawl_result.success,
-                #     },
-                # }
-
-                logger.info(
-                    f"Crawl completed. Total successful pages: {crawl_result.url}"
-                )
-                return content
-
-            except Exception as e:
-                logger.error(
-                    f"Content processing failed for {url}: {str(e)}",
-                    exc_info=True,  # 打印完整堆栈，便于调试
-                )
-                return f"Content processing failed for {url}: {str(e)}"
+        return await crawl_with_cache(url, _crawl_web_page)
 
     except ValueError as e:
         logger.error(f"Invalid URL: {e}")
         return f"error: {e}"
 
 
-@tool("wechat_crawl", description=WEB_CRAWL_TOOL_DESCRIPTION)
-async def wechat_crawl(url: str) -> str:
+async def _crawl_wechat_page(url: str) -> CrawlPage:
     # 随机用户代理池 - 增加多样性
     USER_AGENTS = [
         "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36",
@@ -200,69 +310,36 @@ async def wechat_crawl(url: str) -> str:
         "Mozilla/5.0 (Linux; Android 14; Pixel 8 Pro) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/136.0.6723.71 Mobile Safari/537.36",
     ]
 
-    # 上次请求时间，用于控制请求频率
-    last_request_time = 0
-    # 最小请求间隔（秒）
-    MIN_REQUEST_INTERVAL = 8
-    sougou_url_fetcher = SogouUrlFetcher()
-
-    # 控制请求频率，避免过快请求
-    sougou_url_fetcher.control_request_rate(last_request_time, MIN_REQUEST_INTERVAL)
+    # 进程内共享的解析器：Cookie 池、连接池与请求限速在所有请求间共享
+    sougou_url_fetcher = get_sogou_url_fetcher()
 
     # 随机选择用户代理
     user_agent = random.choice(USER_AGENTS)
-    url = sougou_url_fetcher.get_real_url(url)
+    url = await sougou_url_fetcher.get_real_url(url)
     logger.info(f"请求链接: {url}")
 
     if not url:
         logger.warning(f"无法获取真实链接: {url}")
-        return f"无法获取真实链接: {url}"
-
-    async with async_playwright() as p:
-        browser: Optional[Browser] = None
-        context: Optional[BrowserContext] = None
-        try:
-            # 启动浏览器，增强隐藏自动化特征
-            launch_args = [
-                "--disable-blink-features=AutomationControlled",  # 核心：禁用AutomationControlled标识
-                "--disable-webdriver-detect",  # 禁用webdriver检测
-                "--disable-features=IsolateOrigins,site-per-process",  # 关闭站点隔离（减少指纹差异）
-                "--start-maximized",
-                f"--user-agent={user_agent}",
-                "--no-sandbox",
-                "--disable-gpu",
-                "--disable-extensions",
-                "--disable-dev-shm-usage",
-                "--disable-infobars",
-                "--disable-notifications",
-                "--remote-debugging-port=0",
-                "--ignore-certificate-errors",  # 避免证书错误中断请求
-                "--disable-sync",  # 禁用Chrome同步（减少新设备标识）
-            ]
-
-            # 启动浏览器
-            browser = await p.chromium.launch(
-                headless=True,
-                args=launch_args,
-                slow_mo=random.randint(50, 200),  # 随机操作延迟
-                # channel="chrome",  # 使用系统安装的Chrome（而非Playwright自带的精简版）
-            )
-
-            # 3. 创建上下文：补充指纹相关配置
-            context = await browser.new_context(
-                viewport={
-                    "width": random.choice(
-                        [1366, 1440, 1920]
-                    ),  # 只选常见屏幕分辨率（避免异常值）
-                    "height": random.choice([768, 900, 1080]),
-                },
-                locale="zh-CN",
-                timezone_id="Asia/Shanghai",
-                permissions=["geolocation"],
-                color_scheme=random.choice(["light", "dark"]),
-                device_scale_factor=random.choice([1.0, 1.25, 1.5]),  # 常见缩放比例
-                accept_downloads=False,
-            )
+        return CrawlPage(False, f"无法获取真实链接: {url}")
+
+    # 从进程级浏览器池借用一个独立 context（UA、视口等指纹配置按请求随机）
+    _context_kwargs = dict(
+        user_agent=user_agent,
+        viewport={
+            "width": random.choice([1366, 1440, 1920]),  # 只选常见屏幕分辨率（避免异常值）
+            "height": random.choice([768, 900, 1080]),
+        },
+        locale="zh-CN",
+        timezone_id="Asia/Shanghai",
+        permissions=["geolocation"],
+        color_scheme=random.choice(["light", "dark"]),
+        device_scale_factor=random.choice([1.0, 1.25, 1.5]),  # 常见缩放比例
+        accept_downloads=False,
+    )
+    try:
+        async with get_browser_pool_provider().acquire_context(
+            **_context_kwargs
+        ) as context:
             # 4. 注入反指纹脚本：修改Canvas、WebGL、navigator等关键标识
             await sougou_url_fetcher.inject_stealth_scripts(context)
 
@@ -271,9 +348,6 @@ async def wechat_crawl(url: str) -> str:
 
             page = await context.new_page()
 
-            # 先访问微信首页，建立正常访问流程
-            # await self._pre_visit(page)
-
             # 导航到文章页面，使用随机等待策略
             logger.info(f"Navigating to article: {url}")
             await page.goto(url)
@@ -294,42 +368,31 @@ async def wechat_crawl(url: str) -> str:
             # 检查是否触发反爬
             if "wechat.sogou.com/antispider" in page.url or "verify" in page.url:
                 logger.warning("⚠️ Anti-spider page detected when accessing article")
-                return f"# 提取文章内容失败，进入验证码网页了\n\n原文链接: {url}"
+                # 验证码页是限流信号而非永久失败，不写入负缓存
+                return CrawlPage(
+                    False,
+                    f"# 提取文章内容失败，进入验证码网页了\n\n原文链接: {url}",
+                )
 
             # 提取文章内容
-            # title = await sougou_url_fetcher.extract_title(page)
-            # metadata = await sougou_url_fetcher.extract_metadata(page)
+            title = await page.title()
             content_html = await sougou_url_fetcher.extract_content(page)
             content_md = md(content_html)
             content_md = sougou_url_fetcher.remove_svg_data(content_md + "\n")
 
-            # 组合完整的Markdown内容
-            # full_md = f"# {title}\n\n"
-            # full_md += f"**来源**: {metadata.get('source', '未知')}\n"
-            # full_md += f"**发布时间**: {metadata.get('publish_time', '未知')}\n"
-            # full_md += f"**原文链接**: {url}\n\n"
-            # full_md += "---\n\n"
-            # full_md += content_md
-            # full_md = {
-            #     "title": title,
-            #     "content": content_md,
-            #     "url": url,
-            #     "source": metadata.get("source", "未知"),
-            #     "publish_time": metadata.get("publish_time", "未知"),
-            # }
-
-            # 更新最后请求时间
-            last_request_time = time.time()
-            return content_md
+            return CrawlPage(True, content_md, title=title)
 
-        except Exception as e:
-            logger.error(f"Error extracting article content: {str(e)}", exc_info=True)
-            return f"# 提取文章内容失败\n\n错误信息: {str(e)}\n\n原文链接: {url}"
-        finally:
-            if context:
-                await context.close()
-            if browser and browser.is_connected():
-                await browser.close()
+    except Exception as e:
+        logger.error(f"Error extracting article content: {str(e)}", exc_info=True)
+        return CrawlPage(
+            False, f"# 提取文章内容失败\n\n错误信息: {str(e)}\n\n原文链接: {url}"
+        )
+
+
+@tool("wechat_crawl", description=WEB_CRAWL_TOOL_DESCRIPTION)
+async def wechat_crawl(url: str) -> str:
+    # 以搜狗跳转链接为缓存键：命中时连真实链接解析都可以省掉
+    return await crawl_with_cache(url, _crawl_wechat_page)
 
 
 WEB_SERP_TOOL_DESCRIPTION = """
@@ -345,9 +408,8 @@ Examples:
 @tool("web_serp", description=WEB_SERP_TOOL_DESCRIPTION)
 async def web_serp(query: str) -> str:
     max_results = 3
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)  # 调试时可设为 False
-        page = await browser.new_page()
+    async with get_browser_pool_provider().acquire_context() as context:
+        page = await context.new_page()
         await page.goto(f"https://www.baidu.com/s?wd={query}")
 
         results = []
@@ -391,7 +453,6 @@ async def web_serp(query: str) -> str:
                 logger.error(f"async_playwright, Error occurred: {e}")
                 attempts += 1
 
-        await browser.close()
         return json.dumps(results[:max_results], ensure_ascii=False)
 
 
@@ -402,31 +463,17 @@ async def wechat_serp(query: str) -> str:
     results = []  # 存储最终结果
     current_page = 1  # 当前页码
     max_pages = 10  # 最大翻页次数（防止无限循环）
-    serp_success = False  # 爬取状态标记
     max_results = 3
 
-    async with async_playwright() as p:
-        try:
-            # 启动浏览器（无头模式，生产环境可用）
-            browser = await p.chromium.launch(
-                headless=True,
-                args=[
-                    "--disable-blink-features=AutomationControlled",  # 隐藏自动化标记
-                    "--start-maximized",
-                    f"--user-agent={user_agent}",
-                    "--no-sandbox",  # 容器环境必备，避免权限问题
-                    "--disable-gpu",  # 禁用GPU加速，减少资源占用
-                ],
-                slow_mo=100,  # 操作延迟100ms，模拟真实用户
-            )
-
-            # 创建上下文（模拟真实浏览器环境）
-            context = await browser.new_context(
-                viewport={"width": 1920, "height": 1080},
-                locale="zh-CN",
-                timezone_id="Asia/Shanghai",
-                permissions=["geolocation"],  # 授予地理位置权限（可选，增强真实性）
-            )
+    try:
+        # 从进程级浏览器池借用 context（模拟真实浏览器环境）
+        async with get_browser_pool_provider().acquire_context(
+            user_agent=user_agent,
+            viewport={"width": 1920, "height": 1080},
+            locale="zh-CN",
+            timezone_id="Asia/Shanghai",
+            permissions=["geolocation"],  # 授予地理位置权限（可选，增强真实性）
+        ) as context:
             page = await context.new_page()
 
             # 2. 首次访问搜索页（避免直接拼接URL被反爬）
@@ -563,17 +610,13 @@ async def wechat_serp(query: str) -> str:
                     break
             # 截取目标数量的结果（避免超出max_results）
             results = results[:max_results]
-            serp_success = True
 
-        except Exception as e:
-            logger.error(f"Fatal error during crawling: {str(e)}", exc_info=True)
-            results = []  # 爬取失败时返回空列表
-        finally:
-            # 确保浏览器关闭（避免资源泄漏）
-            if "browser" in locals() and browser.is_connected():
-                await context.close()
-                await browser.close()
-            logger.info(f"Crawling finished. Final results count: {len(results)}")
+    except Exception as e:
+        logger.error(f"Fatal error during crawling: {str(e)}", exc_info=True)
+        results = []  # 爬取失败时返回空列表
+    finally:
+        # context 由浏览器池负责关闭
+        logger.info(f"Crawling finished. Final results count: {len(results)}")
 
     # 8. 返回结果（统一格式）
     return json.dumps(results[:max_results], ensure_ascii=False)
@@ -589,25 +632,28 @@ Examples:
 """
 
 
-async def summary(results, context, model_name):
+# 截止时间模式下，留给网页压缩（summarize）的时间比例
+_SUMMARY_BUDGET_RATIO = 0.3
+
+
+def _remaining(deadline: Optional[float]) -> Optional[float]:
+    if deadline is None:
+        return None
+    return max(deadline - asyncio.get_running_loop().time(), 0)
+
+
+async def summary(results, context, model_name, deadline: Optional[float] = None):
     from nova.node import webpage_summarize_agent
 
     logger.info("===>开始压缩网页内容<===")
-    _summarize_tasks = []
-    for res in results:
-        _summarize_input = SuperState(messages=[HumanMessage(res["text"])])
+
+    async def _summarize_one(i: int):
+        _summarize_input = SuperState(messages=[HumanMessage(results[i]["text"])])
         tmp = {**context, "model": model_name}
         _summarize_context = SuperContext(**tmp)
-        _summarize_tasks.append(
-            webpage_summarize_agent.ainvoke(
-                _summarize_input, context=_summarize_context
-            )
+        _out = await webpage_summarize_agent.ainvoke(
+            _summarize_input, context=_summarize_context
         )
-
-    _summarize_tasks_output = await asyncio.gather(*_summarize_tasks)
-    logger.info("===>完成压缩网页内容<===")
-
-    for i, _out in enumerate(_summarize_tasks_output):
         if isinstance(_out, Command):
             _out = _out.update
         _data = _out.get("data") if _out else {}
@@ -616,10 +662,109 @@ async def summary(results, context, model_name):
             _summarize_output = _data.get("result")
         if _summarize_output:
             results[i]["text"] = _summarize_output
-        else:
+            _done.add(i)
+
+    # 每条结果压缩完成后立即写回，截止时间到时已完成的部分不会丢失
+    _done: set[int] = set()
+    try:
+        await asyncio.wait_for(
+            asyncio.gather(*[_summarize_one(i) for i in range(len(results))]),
+            timeout=_remaining(deadline),
+        )
+    except asyncio.TimeoutError:
+        logger.warning(
+            f"===>压缩网页内容超时，已完成 {len(_done)}/{len(results)}<==="
+        )
+    logger.info("===>完成压缩网页内容<===")
+
+    for i in range(len(results)):
+        if i not in _done:
             results[i]["text"] = truncate_if_too_long(results[i]["text"])
 
 
+async def _search_and_crawl(
+    queries: list[str],
+    serp_fn: Callable[[str], Awaitable[str]],
+    crawl_fn: Callable[[str], Awaitable[str]],
+    serp_domain: str,
+    deadline: Optional[float] = None,
+    background_fill: bool = False,
+) -> dict[str, dict]:
+    """检索 + 爬取，返回 url -> 检索结果（含 content）
+
+    deadline 为事件循环时间，到期后直接返回已爬取的结果：
+    未完成的 SERP 任务取消；未完成的爬取任务取消，或在 background_fill 时转入后台继续填充缓存
+    """
+    scheduler = get_crawl_scheduler_provider()
+
+    # 获取搜索结果（按完成顺序处理，单个检索词失败/超时不影响其它检索词）
+    serp_results: dict[str, list] = {}
+    try:
+        async with asyncio.timeout_at(deadline):
+            async for query, response in scheduler.as_completed(
+                queries, serp_fn, domain=serp_domain
+            ):
+                if isinstance(response, BaseException):
+                    continue
+                serp_results[query] = json.loads(response)
+    except TimeoutError:
+        logger.warning(
+            f"检索截止时间已到，已完成检索词 {len(serp_results)}/{len(queries)}"
+        )
+
+    # 按检索词原始顺序去重，保证结果排序稳定
+    unique_results = {}
+    for query in queries:
+        for result in serp_results.get(query, []):
+            url = result["link"]
+            if url and url not in unique_results:
+                unique_results[url] = {**result, "query": query}
+
+    logger.info(f"Search results size: {len(unique_results)}")
+
+    # 获取网站内容（全局 + 按域名限流，慢页面不阻塞其它页面的处理）
+    try:
+        async with asyncio.timeout_at(deadline):
+            async for url, result in scheduler.as_completed(
+                list(unique_results), crawl_fn, detach_pending=background_fill
+            ):
+                if isinstance(result, BaseException):
+                    result = f"Failed to crawl {url}: {type(result).__name__}: {result}"
+                unique_results[url]["content"] = clean_markdown_links(result)
+    except TimeoutError:
+        logger.warning(
+            f"爬取截止时间已到，已完成网页 "
+            f"{sum('content' in r for r in unique_results.values())}/{len(unique_results)}"
+        )
+
+    # 截止时间到时只返回已爬取的网页
+    _crawled = [{**r, "url": url} for url, r in unique_results.items() if "content" in r]
+
+    # 转载 / 镜像网页 URL 不同但内容近似，折叠后只保留最完整的一份，节省压缩调用和上下文
+    _deduped = dedup_near_duplicates(_crawled, text_key="content")
+    if len(_deduped) < len(_crawled):
+        logger.info(f"Near-duplicate pages removed: {len(_crawled) - len(_deduped)}")
+    return {r["url"]: r for r in _deduped}
+
+
+def _search_deadlines(
+    runtime: ToolRuntime[SuperContext, SuperState], summarize: bool
+) -> tuple[Optional[float], Optional[float], bool]:
+    """从 runtime.context 读取时间预算，返回 (爬取截止时间, 总截止时间, 是否后台填充缓存)"""
+    _budget = runtime.context.get("search_deadline")
+    _background_fill = bool(runtime.context.get("search_background_fill", False))
+    if not _budget:
+        return None, None, _background_fill
+
+    _now = asyncio.get_running_loop().time()
+    _deadline = _now + _budget
+    # 需要压缩网页时，为 summarize 预留一部分时间
+    _crawl_deadline = (
+        _now + _budget * (1 - _SUMMARY_BUDGET_RATIO) if summarize else _deadline
+    )
+    return _crawl_deadline, _deadline, _background_fill
+
+
 @tool("web_search", description=WEB_SEARCH_TOOL_DESCRIPTION)
 async def web_search(
     queries: list[str], runtime: ToolRuntime[SuperContext, SuperState]
@@ -627,52 +772,37 @@ async def web_search(
     try:
         logger.info(f"开始网络检索：检索词: {queries}")
 
-        # 获取搜索结果
-        search_tasks = []
-        for query in queries:
-            search_tasks.append(web_serp.arun({"query": query, "max_results": 2}))
-        search_results = await asyncio.gather(*search_tasks)
-
-        unique_results = {}
-        for i, response in enumerate(search_results):
-            serp_list = json.loads(response)
-            for result in serp_list:
-                url = result["link"]
-                if url not in unique_results:
-                    unique_results[url] = {**result, "query": queries[i]}
-
-        logger.info(f"Search results size: {len(unique_results)}")
-
-        # 获取网站内容
-        crawl_tasks = []
-        urls = []
-        for url, result in unique_results.items():
-            crawl_tasks.append(web_crawl.arun({"url": url}))
-            urls.append(url)
+        # 这里加入summarize 因为从网络上爬取的内容太乱了
+        models = runtime.context.get("models")
+        summarize_model = None
+        if models and models.get("summarize"):
+            summarize_model = models.get("summarize")
 
-        crawl_results = await asyncio.gather(*crawl_tasks)
+        crawl_deadline, deadline, background_fill = _search_deadlines(
+            runtime, bool(summarize_model)
+        )
+        unique_results = await _search_and_crawl(
+            queries,
+            lambda q: web_serp.arun({"query": q, "max_results": 2}),
+            lambda u: web_crawl.arun({"url": u}),
+            serp_domain="www.baidu.com",
+            deadline=crawl_deadline,
+            background_fill=background_fill,
+        )
 
         results = []
-        for url, result in zip(urls, crawl_results):
-            text = clean_markdown_links(result)
-            unique_results[url]["content"] = text
+        for url, item in unique_results.items():
             results.append(
                 {
                     "url": url,
-                    "text": text,
-                    "title": unique_results[url]["title"],
-                    "source": unique_results[url]["source"],
+                    "text": item["content"],
+                    "title": item["title"],
+                    "source": item["source"],
                 }
             )
 
-        # 这里加入summarize 因为从网络上爬取的内容太乱了
-        models = runtime.context.get("models")
-        summarize_model = None
-        if models and models.get("summarize"):
-            summarize_model = models.get("summarize")
-
         if summarize_model:
-            await summary(results, runtime.context, summarize_model)
+            await summary(results, runtime.context, summarize_model, deadline)
 
         logger.info(f"网络检索完成，检索结果数量: {len(results)}")
 
@@ -689,51 +819,37 @@ async def wechat_search(
     try:
         logger.info(f"开始网络检索：检索词: {queries}")
 
-        # 获取搜索结果
-        search_tasks = []
-        for query in queries:
-            search_tasks.append(wechat_serp.arun({"query": query, "max_results": 3}))
-        search_results = await asyncio.gather(*search_tasks)
-
-        unique_results = {}
-        for response in search_results:
-            for result in response["result"]:
-                url = result["link"]
-                if url not in unique_results:
-                    unique_results[url] = {**result, "query": response["query"]}
-
-        logger.info(f"Search results size: {len(unique_results)}")
-
-        # 获取网站内容
-        crawl_tasks = []
-        urls = []
-        for url, result in unique_results.items():
-            crawl_tasks.append(wechat_crawl.arun({"url": url}))
-            urls.append(url)
+        # 这里加入summarize 因为从网络上爬取的内容太乱了
+        models = runtime.context.get("models")
+        summarize_model = None
+        if models and models.get("summarize"):
+            summarize_model = models.get("summarize")
 
-        crawl_results = await asyncio.gather(*crawl_tasks)
+        crawl_deadline, deadline, background_fill = _search_deadlines(
+            runtime, bool(summarize_model)
+        )
+        unique_results = await _search_and_crawl(
+            queries,
+            lambda q: wechat_serp.arun({"query": q, "max_results": 3}),
+            lambda u: wechat_crawl.arun({"url": u}),
+            serp_domain="weixin.sogou.com",
+            deadline=crawl_deadline,
+            background_fill=background_fill,
+        )
 
         results = []
-        for url, result in zip(urls, crawl_results):
-            text = clean_markdown_links(result)
-            unique_results[url]["content"] = text
+        for url, item in unique_results.items():
             results.append(
                 {
                     "url": url,
-                    "text": text,
-                    "title": unique_results[url]["title"],
-                    "source": unique_results[url]["source"],
+                    "text": item["content"],
+                    "title": item["title"],
+                    "source": item["source"],
                 }
             )
 
-        # 这里加入summarize 因为从网络上爬取的内容太乱了
-        models = runtime.context.get("models")
-        summarize_model = None
-        if models and models.get("summarize"):
-            summarize_model = models.get("summarize")
-
         if summarize_model:
-            await summary(results, runtime.context, summarize_model)
+            await summary(results, runtime.context, summarize_model, deadline)
 
         logger.info(f"网络检索完成，检索结果数量: {len(unique_results)}")
         return json.dumps(unique_results, ensure_ascii=False)
@@ -10,8 +10,9 @@ import operator
 import time
 from datetime import datetime
 from functools import wraps
-from typing import Any, Dict, List, Optional, Tuple, Union, cast
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union, cast
 
+from langchain_core.callbacks.manager import adispatch_custom_event
 from langchain_core.messages import (
     AIMessage,
     AnyMessage,
@@ -24,6 +25,7 @@ from langchain_core.messages import (
     ToolMessage,
     filter_messages,
 )
+from langchain_core.runnables.config import ensure_config
 from langgraph.graph.message import (
     BaseMessageChunk,
     # add_messages,
@@ -31,6 +33,8 @@ from langgraph.graph.message import (
     message_chunk_to_message,
 )  # 关键导入！这是 LangGraph 的内置转换器
 
+from nova.utils.token_utils import count_tokens, truncate_text_by_tokens
+
 logger = logging.getLogger(__name__)
 
 
@@ -418,19 +422,45 @@ def perform_string_replacement(
     return new_content, occurrences
 
 
-def truncate_if_too_long(result: list[str] | str) -> list[str] | str:
-    TOOL_RESULT_TOKEN_LIMIT = 400
-    TRUNCATION_GUIDANCE = "... [结果太长被截断]"
+# 截断提示
+TRUNCATION_GUIDANCE = "... [结果太长被截断]"
+
 
-    """Truncate list or string result if it exceeds token limit (rough estimate: 4 chars/token)."""
+def truncate_if_too_long(
+    result: list[str] | str, token_limit: int = 400, model: str | None = None
+) -> list[str] | str:
+    """Truncate list or string result if it exceeds token limit (counted by the model's tokenizer)."""
     if isinstance(result, list):
-        total_chars = sum(len(item) for item in result)
-        if total_chars > TOOL_RESULT_TOKEN_LIMIT * 4:
-            return result[
-                : len(result) * TOOL_RESULT_TOKEN_LIMIT * 4 // total_chars
-            ] + [TRUNCATION_GUIDANCE]
+        kept: list[str] = []
+        remaining = token_limit
+        for item in result:
+            item_tokens = count_tokens(item, model)
+            if item_tokens > remaining:
+                return kept + [TRUNCATION_GUIDANCE]
+            kept.append(item)
+            remaining -= item_tokens
         return result
     # string
-    if len(result) > TOOL_RESULT_TOKEN_LIMIT * 4:
-        return result[: TOOL_RESULT_TOKEN_LIMIT * 4] + "\n" + TRUNCATION_GUIDANCE
+    truncated, is_truncated = truncate_text_by_tokens(result, token_limit, model)
+    if is_truncated:
+        return truncated + "\n" + TRUNCATION_GUIDANCE
     return result
+
+
+async def emit_custom_event(
+    name: str,
+    data: Dict[str, Any],
+    stream_writer: Optional[Callable[[Any], None]] = None,
+):
+    """
+    向前端推送自定义事件，两种流式引擎都能收到：
+    - astream_events：通过回调派发 on_custom_event
+    - astream(stream_mode=[..., "custom"])：通过 stream_writer 写入 custom 流
+    每种引擎只会收到其中一路（另一路为空操作），不会重复
+    """
+    if stream_writer is not None:
+        _metadata = ensure_config().get("metadata") or {}
+        stream_writer(
+            {"name": name, "data": data, "node": _metadata.get("langgraph_node")}
+        )
+    await adispatch_custom_event(name, data)
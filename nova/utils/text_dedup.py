@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+# @Time   : 2026/03/20
+# @Author : zip
+# @Moto   : Knowledge comes from decomposition
+from __future__ import annotations
+
+import hashlib
+import logging
+import re
+from collections import Counter
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+"""
+网页内容近似去重（SimHash）
+
+* 转载 / 镜像文章 URL 不同但内容几乎一致，按 URL 去重无法识别
+* 对规范化后的正文按字符 n-gram 切片（中英文通用），计算 64 位 SimHash
+* 海明距离不超过阈值的视为近似重复，只保留质量最好的一条
+"""
+
+_SIMHASH_BITS = 64
+_SHINGLE_SIZE = 4
+# 海明距离 <= 3 视为近似重复（64 位 SimHash 的常用阈值）
+_DEFAULT_MAX_DISTANCE = 3
+# 正文过短（如爬取失败的错误信息）不参与去重
+_MIN_DEDUP_CHARS = 200
+# 只取正文前若干字符计算指纹，转载内容的差异主要在首尾的版权/推广信息
+_MAX_FINGERPRINT_CHARS = 20000
+
+_NOISE_PATTERN = re.compile(r"[\s\W_]+", re.UNICODE)
+
+
+def normalize_text(text: str) -> str:
+    """去掉空白与标点并转小写，避免排版差异影响指纹"""
+    return _NOISE_PATTERN.sub("", text).lower()
+
+
+def _hash_bytes(shingle: str) -> bytes:
+    return hashlib.blake2b(
+        shingle.encode("utf-8"), digest_size=_SIMHASH_BITS // 8
+    ).digest()
+
+
+def simhash(text: str, shingle_size: int = _SHINGLE_SIZE) -> int:
+    """计算文本的 64 位 SimHash 指纹"""
+    _text = normalize_text(text)[:_MAX_FINGERPRINT_CHARS]
+    if len(_text) < shingle_size:
+        return int.from_bytes(_hash_bytes(_text), "big")
+
+    _shingles = Counter(
+        _text[i : i + shingle_size] for i in range(len(_text) - shingle_size + 1)
+    )
+    # 按字节统计加权计数，避免对每个切片逐位循环 64 次
+    _byte_counts = [[0] * 256 for _ in range(_SIMHASH_BITS // 8)]
+    for _shingle, _count in _shingles.items():
+        for pos, value in enumerate(_hash_bytes(_shingle)):
+            _byte_counts[pos][value] += _count
+    _total = sum(_shingles.values())
+
+    _fingerprint = 0
+    for pos, _counts in enumerate(_byte_counts):
+        for bit in range(8):
+            _set = sum(c for value, c in enumerate(_counts) if c and value >> bit & 1)
+            # 该位为 1 的权重超过一半时指纹该位置 1
+            if 2 * _set > _total:
+                _fingerprint |= 1 << ((len(_byte_counts) - 1 - pos) * 8 + bit)
+    return _fingerprint
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def dedup_near_duplicates(
+    items: list[dict[str, Any]],
+    text_key: str = "content",
+    max_distance: int = _DEFAULT_MAX_DISTANCE,
+    score: Optional[Callable[[dict[str, Any]], float]] = None,
+) -> list[dict[str, Any]]:
+    """折叠近似重复的条目
+
+    Args:
+        items: 待去重条目（顺序即排名）
+        text_key: 正文字段名
+        max_distance: 判定为近似重复的最大海明距离
+        score: 条目质量评分，同组内保留得分最高的一条；默认按正文长度
+
+    Returns:
+        去重后的条目，保持每组中排名最靠前条目的位置
+    """
+    score = score or (lambda item: len(item.get(text_key) or ""))
+
+    # 每组: [代表指纹, 排名最靠前的位置, 组内最佳条目]
+    _groups: list[list[Any]] = []
+    _passthrough: list[tuple[int, dict[str, Any]]] = []
+    for idx, item in enumerate(items):
+        _text = item.get(text_key) or ""
+        if len(_text) < _MIN_DEDUP_CHARS:
+            _passthrough.append((idx, item))
+            continue
+
+        _fingerprint = simhash(_text)
+        for _group in _groups:
+            if hamming_distance(_fingerprint, _group[0]) <= max_distance:
+                if score(item) > score(_group[2]):
+                    logger.info(
+                        f"[Dedup] {_group[2].get('url')} -> {item.get('url')} (near-duplicate)"
+                    )
+                    _group[2] = item
+                else:
+                    logger.info(
+                        f"[Dedup] drop {item.get('url')}, near-duplicate of {_group[2].get('url')}"
+                    )
+                break
+        else:
+            _groups.append([_fingerprint, idx, item])
+
+    _kept = sorted(
+        [(g[1], g[2]) for g in _groups] + _passthrough, key=lambda x: x[0]
+    )
+    return [item for _, item in _kept]
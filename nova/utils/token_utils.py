@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+# @Time   : 2026/03/20
+# @Author : zip
+# @Moto   : Knowledge comes from decomposition
+from __future__ import annotations
+
+import logging
+from functools import lru_cache
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# 没有分词器时的估算比例：英文约 4 字符/token，中文约 1.5 字符/token，取保守值
+_FALLBACK_CHARS_PER_TOKEN = 2
+_DEFAULT_ENCODING = "cl100k_base"
+# 截断时先按字符截取前缀 / 后缀再分词，前缀长度为 max_tokens 的倍数（单个 token 很少超过 8 个字符）
+_PREFIX_CHARS_PER_TOKEN = 8
+
+
+class _FallbackEncoder:
+    """无 tiktoken 时的兜底分词器（按字符数估算）"""
+
+    name = "fallback"
+
+    def encode(self, text: str) -> list[int]:
+        n = (len(text) + _FALLBACK_CHARS_PER_TOKEN - 1) // _FALLBACK_CHARS_PER_TOKEN
+        return [0] * n
+
+    def decode_prefix(self, text: str, max_tokens: int) -> str:
+        return text[: max_tokens * _FALLBACK_CHARS_PER_TOKEN]
+
+
+@lru_cache(maxsize=64)
+def get_tokenizer(model: Optional[str] = None) -> Any:
+    """按模型名获取分词器（进程内缓存，每个模型只加载一次）
+
+    Args:
+        model: 模型名称（如 openai/Qwen3-235B-A22B），为空时使用默认编码
+
+    Returns:
+        具有 encode 方法的分词器
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        return _FallbackEncoder()
+
+    if model:
+        # litellm 的模型名带 provider 前缀，tiktoken 只认裸模型名
+        _name = model.split("/", 1)[-1]
+        try:
+            return tiktoken.encoding_for_model(_name)
+        except KeyError:
+            pass
+    try:
+        return tiktoken.get_encoding(_DEFAULT_ENCODING)
+    except Exception as e:
+        logger.warning(f"load tokenizer failed, fallback to char estimate: {e}")
+        return _FallbackEncoder()
+
+
+def count_tokens(text: Any, model: Optional[str] = None) -> int:
+    """计算文本的 token 数"""
+    if text is None:
+        return 0
+    if not isinstance(text, str):
+        text = str(text)
+    if not text:
+        return 0
+    return len(get_tokenizer(model).encode(text))
+
+
+def _within_byte_bound(text: str, max_tokens: int) -> bool:
+    """UTF-8 字节数不超过上限时 token 数必然不超过（BPE 每个 token 至少对应 1 个字节）
+
+    中文等多字节字符一个字符可能对应多个 token，字符数不能作为上界；
+    字节数不少于字符数，字符数超过上限时无需再编码
+    """
+    return len(text) <= max_tokens and len(text.encode("utf-8")) <= max_tokens
+
+
+def truncate_text_by_tokens(
+    text: str, max_tokens: int, model: Optional[str] = None
+) -> tuple[str, bool]:
+    """按 token 截断文本
+
+    Returns:
+        (截断后的文本, 是否发生截断)
+    """
+    if _within_byte_bound(text, max_tokens):
+        return text, False
+
+    encoder = get_tokenizer(model)
+    if isinstance(encoder, _FallbackEncoder):
+        if len(encoder.encode(text)) <= max_tokens:
+            return text, False
+        return encoder.decode_prefix(text, max_tokens), True
+
+    # 只需要前 max_tokens 个 token：先对足够长的前缀分词，大文本无需整体分词
+    _prefix_len = max_tokens * _PREFIX_CHARS_PER_TOKEN
+    if len(text) > _prefix_len:
+        tokens = encoder.encode(text[:_prefix_len])
+        if len(tokens) > max_tokens:
+            return encoder.decode(tokens[:max_tokens]), True
+
+    tokens = encoder.encode(text)
+    if len(tokens) <= max_tokens:
+        return text, False
+    return encoder.decode(tokens[:max_tokens]), True
+
+
+def truncate_text_tail_by_tokens(
+    text: str, max_tokens: int, model: Optional[str] = None
+) -> tuple[str, bool]:
+    """按 token 截断文本，保留末尾部分（命令输出等末尾信息更重要的场景）
+
+    Returns:
+        (截断后的文本, 是否发生截断)
+    """
+    if _within_byte_bound(text, max_tokens):
+        return text, False
+
+    encoder = get_tokenizer(model)
+    if isinstance(encoder, _FallbackEncoder):
+        if len(encoder.encode(text)) <= max_tokens:
+            return text, False
+        return text[-max_tokens * _FALLBACK_CHARS_PER_TOKEN :], True
+
+    _suffix_len = max_tokens * _PREFIX_CHARS_PER_TOKEN
+    if len(text) > _suffix_len:
+        tokens = encoder.encode(text[-_suffix_len:])
+        if len(tokens) > max_tokens:
+            return encoder.decode(tokens[-max_tokens:]), True
+
+    tokens = encoder.encode(text)
+    if len(tokens) <= max_tokens:
+        return text, False
+    return encoder.decode(tokens[-max_tokens:]), True
+
+
+def count_message_tokens(message: Any, model: Optional[str] = None) -> int:
+    """计算单条消息的 token 数（content + tool_calls + 每条消息固定开销）"""
+    _PER_MESSAGE_OVERHEAD = 4
+
+    content = getattr(message, "content", message)
+    if isinstance(content, list):
+        # 多模态消息只统计文本部分
+        content = "".join(
+            part.get("text", "") if isinstance(part, dict) else str(part)
+            for part in content
+        )
+    total = count_tokens(content, model) + _PER_MESSAGE_OVERHEAD
+
+    tool_calls = getattr(message, "tool_calls", None)
+    if tool_calls:
+        total += count_tokens(str(tool_calls), model)
+    return total
@@ -13,35 +13,35 @@ import time
 from datetime import datetime, timedelta
 from typing import Optional
 
-import requests
+import httpx
 from playwright.async_api import BrowserContext, Page
 
 # 配置日志
 logger = logging.getLogger(__name__)
 
+_USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 14_6) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.6 Safari/605.1.15",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Edg/137.0.0.0",
+    "Mozilla/5.0 (Linux; Android 14; Pixel 8 Pro) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/136.0.6723.71 Mobile Safari/537.36",
+]
+
 
 class SogouCookieManager:
-    """Cookie池管理类，负责Cookie的生成、验证和更新"""
+    """Cookie池管理类，负责Cookie的生成、验证和更新（全异步，不阻塞事件循环）
+
+    * 首次取 Cookie 时按需创建，不再在 __init__ 中同步 sleep 建池
+    * 池中数量不足时由后台任务补充，调用方无需等待
+    """
 
-    def __init__(self, cookie_expiry_hours: int = 24):
+    def __init__(self, cookie_expiry_hours: int = 24, min_size: int = 2):
         self.cookie_pool = []  # 存储格式: (cookies_dict, create_time)
         self.expiry_hours = cookie_expiry_hours
-        self.user_agents = [
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36",
-            "Mozilla/5.0 (Macintosh; Intel Mac OS X 14_6) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.6 Safari/605.1.15",
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Edg/137.0.0.0",
-            "Mozilla/5.0 (Linux; Android 14; Pixel 8 Pro) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/136.0.6723.71 Mobile Safari/537.36",
-        ]
+        self.min_size = min_size
+        self.user_agents = _USER_AGENTS
 
-        # 初始化Cookie池
-        self._init_cookie_pool(min_size=2)
-
-    def _init_cookie_pool(self, min_size: int):
-        """初始化Cookie池，确保有足够的有效Cookie"""
-        logger.info(f"初始化Cookie池，目标数量: {min_size}")
-        while len(self.cookie_pool) < min_size:
-            self._add_new_cookie()
-            time.sleep(random.uniform(2, 4))  # 避免集中创建
+        self._lock = asyncio.Lock()
+        self._refill_task: Optional[asyncio.Task] = None
 
     def _generate_base_cookies(self) -> dict:
         """生成基础Cookie信息"""
@@ -56,38 +56,49 @@ class SogouCookieManager:
             "SNUID": hashlib.md5(str(random.random()).encode()).hexdigest().upper(),
         }
 
-    def _add_new_cookie(self) -> bool:
+    async def _add_new_cookie(self) -> bool:
         """创建并验证新Cookie，成功则加入池"""
         try:
-            session = requests.Session()
             headers = self._get_random_headers()
-
-            # 访问主页获取完整Cookie
-            session.get(
-                "https://weixin.sogou.com/",
-                headers=headers,
-                timeout=10,
-                allow_redirects=True,
-            )
-
-            # 验证Cookie有效性
-            test_url = "https://weixin.sogou.com/weixin?type=2&query=科技"
-            response = session.get(test_url, headers=headers, timeout=10)
-
-            if "antispider" not in response.text and response.status_code == 200:
-                # 转换为Cookie字典
-                cookie_dict = {cookie.name: cookie.value for cookie in session.cookies}
-                self.cookie_pool.append((cookie_dict, datetime.now()))
-                logger.info(f"新Cookie添加成功，当前池大小: {len(self.cookie_pool)}")
-                return True
-            else:
-                logger.warning("新Cookie验证失败")
-                return False
+            # 每个 Cookie 使用独立的 cookie jar，避免互相污染
+            async with httpx.AsyncClient(
+                headers=headers, timeout=10, follow_redirects=True
+            ) as client:
+                # 访问主页获取完整Cookie
+                await client.get("https://weixin.sogou.com/")
+
+                # 验证Cookie有效性
+                test_url = "https://weixin.sogou.com/weixin?type=2&query=科技"
+                response = await client.get(test_url)
+
+                if "antispider" not in response.text and response.status_code == 200:
+                    # 转换为Cookie字典
+                    cookie_dict = {
+                        cookie.name: cookie.value for cookie in client.cookies.jar
+                    }
+                    self.cookie_pool.append((cookie_dict, datetime.now()))
+                    logger.info(f"新Cookie添加成功，当前池大小: {len(self.cookie_pool)}")
+                    return True
+                else:
+                    logger.warning("新Cookie验证失败")
+                    return False
 
         except Exception as e:
             logger.error(f"创建Cookie失败: {str(e)}")
             return False
 
+    async def _refill(self):
+        """后台补充Cookie池，创建间隔随机错开，避免集中请求"""
+        _attempts = 0
+        while len(self.cookie_pool) < self.min_size and _attempts < self.min_size * 2:
+            _attempts += 1
+            await self._add_new_cookie()
+            await asyncio.sleep(random.uniform(2, 4))
+
+    def _schedule_refill(self):
+        if self._refill_task is None or self._refill_task.done():
+            self._refill_task = asyncio.create_task(self._refill())
+
     def _get_random_headers(self) -> dict:
         """获取随机请求头"""
         return {
@@ -103,7 +114,12 @@ class SogouCookieManager:
             "Sec-Fetch-Site": "same-origin",
         }
 
-    def get_valid_cookie(self) -> Optional[dict]:
+    def remove_cookie(self, cookie_dict: dict):
+        """移除已被反爬标记的Cookie，并在后台补充"""
+        self.cookie_pool = [(c, t) for c, t in self.cookie_pool if c != cookie_dict]
+        self._schedule_refill()
+
+    async def get_valid_cookie(self) -> Optional[dict]:
         """获取一个有效的Cookie，移除过期的"""
         # 清理过期Cookie
         now = datetime.now()
@@ -113,46 +129,78 @@ class SogouCookieManager:
             if now - create_time < timedelta(hours=self.expiry_hours)
         ]
 
-        # 如果Cookie不足，补充新的
-        if len(self.cookie_pool) < 2:
-            logger.info("Cookie池数量不足，补充新Cookie")
-            self._add_new_cookie()
+        if not self.cookie_pool:
+            # 池为空时只能同步等待创建一个，并发调用共享同一次创建
+            async with self._lock:
+                if not self.cookie_pool:
+                    logger.info("Cookie池为空，创建新Cookie")
+                    await self._add_new_cookie()
+
+        # 如果Cookie不足，后台补充
+        if len(self.cookie_pool) < self.min_size:
+            self._schedule_refill()
 
         return random.choice(self.cookie_pool)[0] if self.cookie_pool else None
 
+    async def close(self):
+        if self._refill_task is not None and not self._refill_task.done():
+            self._refill_task.cancel()
+            try:
+                await self._refill_task
+            except asyncio.CancelledError:
+                pass
+
 
 class SogouUrlFetcher:
-    """搜狗微信链接解析器"""
+    """搜狗微信链接解析器（进程内共享，Cookie池与限速在所有请求间共享）"""
 
     def __init__(self):
         self.cookie_manager = SogouCookieManager()
         self.request_interval = (2, 5)  # 请求间隔范围(秒)
-        self.last_request_time = 0
         self.max_retries = 3
 
-    def _wait_for_rate_limit(self):
-        """控制请求频率，避免过快"""
-        elapsed = time.time() - self.last_request_time
-        required_wait = random.uniform(*self.request_interval) - elapsed
+        self._client: Optional[httpx.AsyncClient] = None
+        self._rate_lock = asyncio.Lock()
+        self._next_request_time = 0.0
 
-        if required_wait > 0:
-            time.sleep(required_wait)
-        self.last_request_time = time.time()
+    def _get_client(self) -> httpx.AsyncClient:
+        # 连接池复用；Cookie 通过请求头显式传入，不使用 client 自带的 cookie jar
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=15, follow_redirects=True)
+        return self._client
 
-    def get_real_url(self, sogou_url: str) -> str:
+    async def close(self):
+        await self.cookie_manager.close()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _wait_for_rate_limit(self):
+        """控制请求频率，避免过快
+
+        只错开各请求的开始时间（预约下一个时间槽），不串行化整个请求，多个链接可以并发解析
+        """
+        async with self._rate_lock:
+            now = time.monotonic()
+            start_at = max(now, self._next_request_time)
+            self._next_request_time = start_at + random.uniform(*self.request_interval)
+        if start_at > now:
+            await asyncio.sleep(start_at - now)
+
+    async def get_real_url(self, sogou_url: str) -> str:
         """获取真实微信文章链接"""
         if not sogou_url:
             return ""
 
         for retry in range(self.max_retries):
             try:
-                self._wait_for_rate_limit()
+                await self._wait_for_rate_limit()
 
                 # 获取随机Cookie和 headers
-                cookie_dict = self.cookie_manager.get_valid_cookie()
+                cookie_dict = await self.cookie_manager.get_valid_cookie()
                 if not cookie_dict:
                     logger.error("没有可用的Cookie")
-                    time.sleep(5)
+                    await asyncio.sleep(5)
                     continue
 
                 headers = self.cookie_manager._get_random_headers()
@@ -161,27 +209,19 @@ class SogouUrlFetcher:
                 )
 
                 # 发送请求
-                session = requests.Session()
-                response = session.get(
-                    sogou_url, headers=headers, timeout=15, allow_redirects=True
-                )
+                response = await self._get_client().get(sogou_url, headers=headers)
 
                 # 检查是否触发反爬
                 if "antispider" in response.text or "验证码" in response.text:
                     logger.warning(f"第{retry + 1}次尝试触发反爬，更换Cookie")
                     # 移除当前可能已被标记的Cookie
-                    if cookie_dict in [c for c, _ in self.cookie_manager.cookie_pool]:
-                        self.cookie_manager.cookie_pool = [
-                            (c, t)
-                            for c, t in self.cookie_manager.cookie_pool
-                            if c != cookie_dict
-                        ]
-                    time.sleep(random.uniform(5, 8))
+                    self.cookie_manager.remove_cookie(cookie_dict)
+                    await asyncio.sleep(random.uniform(5, 8))
                     continue
 
                 # 检查是否直接跳转
-                if "mp.weixin.qq.com" in response.url:
-                    return response.url
+                if "mp.weixin.qq.com" in str(response.url):
+                    return str(response.url)
 
                 # 解析页面中的链接
                 script_content = response.text
@@ -211,11 +251,15 @@ class SogouUrlFetcher:
 
             except Exception as e:
                 logger.error(f"第{retry + 1}次尝试失败: {str(e)}")
-                time.sleep(random.uniform(3, 6))
+                await asyncio.sleep(random.uniform(3, 6))
 
         logger.error(f"多次尝试后仍无法获取链接: {sogou_url}")
         return ""
 
+    async def get_real_urls(self, sogou_urls: list[str]) -> list[str]:
+        """并发解析多个链接（请求开始时间仍按限速错开）"""
+        return list(await asyncio.gather(*[self.get_real_url(u) for u in sogou_urls]))
+
     async def inject_stealth_scripts(self, context: BrowserContext):
         """注入反指纹脚本，修改浏览器关键标识"""
         # 脚本1：隐藏navigator.webdriver（核心）
@@ -253,7 +297,7 @@ class SogouUrlFetcher:
             delete window.navigator.plugins['Chrome PDF Viewer']; // 避免插件列表异常
         """)
 
-    def control_request_rate(self, last_request_time, MIN_REQUEST_INTERVAL):
+    async def control_request_rate(self, last_request_time, MIN_REQUEST_INTERVAL):
         """控制请求频率，确保请求间隔足够长"""
         current_time = time.time()
         elapsed = current_time - last_request_time
@@ -261,7 +305,7 @@ class SogouUrlFetcher:
         if elapsed < MIN_REQUEST_INTERVAL:
             sleep_time = MIN_REQUEST_INTERVAL - elapsed + random.uniform(0, 2)
             logger.info(f"Rate limiting: sleeping for {sleep_time:.2f} seconds")
-            time.sleep(sleep_time)
+            await asyncio.sleep(sleep_time)
 
     async def _random_delay(self, min_ms: int, max_ms: int):
         """随机延迟，单位毫秒"""
@@ -0,0 +1,158 @@
+import sys
+
+sys.path.append("..")
+import os
+
+os.environ["CONFIG_PATH"] = "../config.yaml"
+
+import asyncio
+import pickle
+import subprocess
+import time
+import types
+from collections import Counter, defaultdict
+from typing import Annotated, TypedDict
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.tools import tool
+from langgraph.graph import START, StateGraph
+from langgraph.graph.message import add_messages
+from langgraph.prebuilt.tool_node import ToolNode, tools_condition
+
+from nova.service import handle_event as current
+
+"""
+handle_event 单事件开销基准：回放录制的 astream_events 事件序列，对比改造前后的 handle_event
+
+* 默认录制一段模拟的 super_nova 运行（流式回答、write_file 大参数、read_file 大结果）
+* python benchmark_handle_event.py --save trace.pkl 保存录制结果；--load trace.pkl 回放已有录制
+* 改造前的实现从 git 历史中加载（LEGACY_REVISION），不在 git 仓库中时只测当前实现
+
+运行：cd test && python benchmark_handle_event.py
+"""
+
+LEGACY_REVISION = "42d4a5b"
+LARGE_FILE = "第一行内容 The quick brown fox jumps over the lazy dog.\n" * 20000
+
+
+class TraceState(TypedDict):
+    messages: Annotated[list, add_messages]
+
+
+@tool("read_file")
+def read_file(file_path: str) -> str:
+    """读取文件"""
+    return LARGE_FILE
+
+
+@tool("write_file")
+def write_file(file_path: str, content: str) -> str:
+    """写入文件"""
+    return f"Updated file {file_path}"
+
+
+def build_graph():
+    scripted = [
+        AIMessage(
+            content="先读取再写入",
+            tool_calls=[
+                {"name": "read_file", "args": {"file_path": "/a.md"}, "id": "c1"},
+                {
+                    "name": "write_file",
+                    "args": {"file_path": "/b.md", "content": LARGE_FILE},
+                    "id": "c2",
+                },
+            ],
+        ),
+        AIMessage(content="这是一段用于压测的流式回答 " * 200),
+    ]
+    model = GenericFakeChatModel(messages=iter(scripted))
+    turns = iter(scripted)
+
+    async def super_nova(state: TraceState):
+        merged = None
+        async for chunk in model.astream(state["messages"]):
+            merged = chunk if merged is None else merged + chunk
+        return {
+            "messages": [
+                AIMessage(
+                    content=merged.content,  # type: ignore[union-attr]
+                    tool_calls=next(turns).tool_calls,
+                    id=merged.id,  # type: ignore[union-attr]
+                )
+            ]
+        }
+
+    graph = StateGraph(TraceState)
+    graph.add_node("super_nova", super_nova)
+    graph.add_node("tools", ToolNode([read_file, write_file]))
+    graph.add_edge(START, "super_nova")
+    graph.add_conditional_edges("super_nova", tools_condition)
+    graph.add_edge("tools", "super_nova")
+    return graph.compile()
+
+
+async def record_trace() -> list[dict]:
+    return [
+        event
+        async for event in build_graph().astream_events(
+            {"messages": [HumanMessage(content="压测")]}, version="v2"
+        )
+    ]
+
+
+def load_legacy():
+    try:
+        source = subprocess.run(
+            ["git", "show", f"{LEGACY_REVISION}:nova/service/handle_event.py"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    module = types.ModuleType("legacy_handle_event")
+    sys.modules[module.__name__] = module
+    exec(compile(source, "legacy_handle_event.py", "exec"), module.__dict__)
+    return module
+
+
+def bench(handle, trace: list[dict], repeat: int = 20) -> dict[str, float]:
+    """返回各事件类型的平均耗时（微秒）"""
+    cost: dict[str, float] = defaultdict(float)
+    for _ in range(repeat):
+        for event in trace:
+            started = time.perf_counter()
+            handle("bench", event)
+            cost[event["event"]] += time.perf_counter() - started
+    counts = Counter(event["event"] for event in trace)
+    return {kind: cost[kind] / (counts[kind] * repeat) * 1e6 for kind in counts}
+
+
+if __name__ == "__main__":
+    if "--load" in sys.argv:
+        with open(sys.argv[sys.argv.index("--load") + 1], "rb") as f:
+            trace = pickle.load(f)
+    else:
+        trace = asyncio.run(record_trace())
+    if "--save" in sys.argv:
+        with open(sys.argv[sys.argv.index("--save") + 1], "wb") as f:
+            pickle.dump(trace, f)
+
+    counts = Counter(event["event"] for event in trace)
+    legacy = load_legacy()
+    results = {"current": bench(current.handle_event, trace)}
+    if legacy is not None:
+        results["legacy"] = bench(legacy.handle_event, trace)
+
+    print(f"{len(trace)} events")
+    print(f"{'event':<24}{'count':>7}" + "".join(f"{name:>12}" for name in results))
+    for kind in sorted(counts, key=counts.get, reverse=True):  # type: ignore[arg-type]
+        print(
+            f"{kind:<24}{counts[kind]:>7}"
+            + "".join(f"{r[kind]:>10.1f}us" for r in results.values())
+        )
+    for name, r in results.items():
+        total = sum(r[kind] * counts[kind] for kind in counts)
+        print(f"{name}: {total / len(trace):.1f}us/event")
@@ -0,0 +1,97 @@
+import sys
+
+sys.path.append("..")
+import os
+
+os.environ["CONFIG_PATH"] = "../config.yaml"
+
+import re
+import time
+from pathlib import Path
+
+from nova.sandbox.local.path_rewriter import PathRewriter
+
+"""
+路径映射改写基准：旧实现（每次调用重新编译正则、逐个匹配 Path.resolve）vs 预编译的 PathRewriter
+
+运行：cd test && python benchmark_path_rewriter.py
+"""
+
+MAPPINGS = {
+    "/mnt/skills": "/opt/nova/skills",
+    "/mnt/user-data": "/data/nova/users",
+    "/mnt/outputs": "/data/nova/outputs",
+}
+
+
+def legacy_reverse(output: str, path_mappings: dict[str, str]) -> str:
+    """改写前 LocalSandbox._reverse_resolve_paths_in_output 的实现"""
+
+    def _reverse_resolve_path(path: str) -> str:
+        path_str = str(Path(path).resolve())
+        for container_path, local_path in sorted(
+            path_mappings.items(), key=lambda x: len(x[1]), reverse=True
+        ):
+            local_path_resolved = str(Path(local_path).resolve())
+            if path_str.startswith(local_path_resolved):
+                relative = path_str[len(local_path_resolved) :].lstrip("/")
+                return f"{container_path}/{relative}" if relative else container_path
+        return path_str
+
+    result = output
+    for container_path, local_path in sorted(
+        path_mappings.items(), key=lambda x: len(x[1]), reverse=True
+    ):
+        pattern = re.compile(
+            re.escape(str(Path(local_path).resolve())) + r"(?:/[^\s\"';&|<>()]*)?"
+        )
+        result = pattern.sub(lambda m: _reverse_resolve_path(m.group(0)), result)
+    return result
+
+
+def make_output(size_mb: int, hit_ratio: float) -> str:
+    """生成约 size_mb 的命令输出，其中 hit_ratio 比例的行包含映射路径"""
+    hit_every = round(1 / hit_ratio) if hit_ratio else 0
+    lines = []
+    size = i = 0
+    while size < size_mb * 1024 * 1024:
+        if hit_every and i % hit_every == 0:
+            line = f"processed /data/nova/users/u{i}/file_{i}.csv ok\n"
+        else:
+            line = f"[{i:08d}] INFO worker step completed in 12ms\n"
+        lines.append(line)
+        size += len(line)
+        i += 1
+    return "".join(lines)
+
+
+def bench(name: str, fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    print(f"  {name:<28}{best * 1000:10.1f} ms")
+    return best
+
+
+if __name__ == "__main__":
+    to_container = PathRewriter(
+        {str(Path(v).resolve()): k for k, v in MAPPINGS.items()}
+    )
+    for size_mb, hit_ratio in [(4, 0), (4, 0.01), (4, 0.2)]:
+        output = make_output(size_mb, hit_ratio)
+        print(f"{len(output) / 1e6:.1f}MB output, hit ratio {hit_ratio}")
+        assert legacy_reverse(output, MAPPINGS) == to_container.rewrite(output)
+        t_old = bench("legacy (per-call compile)", lambda: legacy_reverse(output, MAPPINGS))
+        t_new = bench("PathRewriter.rewrite", lambda: to_container.rewrite(output))
+
+        def _streamed():
+            stream = to_container.stream()
+            parts = [stream.feed(output[i : i + 4096]) for i in range(0, len(output), 4096)]
+            parts.append(stream.flush())
+            return "".join(parts)
+
+        assert _streamed() == to_container.rewrite(output)
+        bench("PathRewriter.stream (4KB)", _streamed)
+        print(f"  speedup {t_old / max(t_new, 1e-9):.1f}x")
@@ -0,0 +1,95 @@
+import sys
+
+sys.path.append("..")
+import os
+
+os.environ["CONFIG_PATH"] = "../config.yaml"
+
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.types import Interrupt
+
+from nova.model.service import SuperAgentResponse
+from nova.service.serialization import agent_response, dump_response
+
+"""
+响应序列化基准：SuperAgentResponse（pydantic / FastAPI jsonable_encoder）vs orjson
+
+* 流式事件：model_dump_json() vs dump_response()
+* 非流式最终响应：FastAPI 直接返回 SuperAgentResponse（jsonable_encoder + json.dumps）vs agent_response()
+* 同时校验两者输出的 JSON 一致
+
+运行：cd test && python benchmark_serialization.py
+"""
+
+TURNS = 50
+
+EVENT = {
+    "event_name": "on_chat_model_stream",
+    "node_name": "super_nova",
+    "output": {"message_id": "run-1", "content": "增量"},
+}
+
+
+def build_state() -> dict:
+    messages = []
+    for i in range(TURNS):
+        messages += [
+            HumanMessage(content="请读取文件并总结 " * 50, id=f"human-{i}"),
+            AIMessage(
+                content="这是一段回答 " * 200,
+                id=f"ai-{i}",
+                tool_calls=[
+                    {"name": "read_file", "args": {"file_path": "/a.md"}, "id": f"c{i}"}
+                ],
+                usage_metadata={"input_tokens": 1, "output_tokens": 2, "total_tokens": 3},
+            ),
+            ToolMessage(content="文件内容 " * 300, tool_call_id=f"c{i}", name="read_file"),
+        ]
+    return {
+        "messages": messages,
+        "__interrupt__": [Interrupt(value={"question": "是否继续？"}, id="interrupt-1")],
+    }
+
+
+def best_of(func, number: int, repeat: int = 5) -> float:
+    """返回单次调用的最短平均耗时（微秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - started) / number)
+    return best * 1e6
+
+
+if __name__ == "__main__":
+    state = build_state()
+
+    assert (
+        SuperAgentResponse(code=0, err_message="ok", data=EVENT).model_dump_json()
+        == dump_response(0, EVENT, "ok")
+    )
+    assert SuperAgentResponse(code=0, data=state).model_dump_json() == dump_response(
+        0, state
+    )
+
+    pydantic_event = best_of(
+        lambda: SuperAgentResponse(code=0, err_message="ok", data=EVENT).model_dump_json(),
+        20000,
+    )
+    orjson_event = best_of(lambda: dump_response(0, EVENT, "ok"), 20000)
+    print(f"stream event:  pydantic={pydantic_event:8.2f}us  orjson={orjson_event:8.2f}us")
+
+    fastapi_state = best_of(
+        lambda: JSONResponse(jsonable_encoder(SuperAgentResponse(code=0, data=state))),
+        20,
+    )
+    orjson_state = best_of(lambda: agent_response(0, state), 200)
+    print(
+        f"final state ({len(state['messages'])} messages):  "
+        f"fastapi={fastapi_state:8.0f}us  orjson={orjson_state:8.0f}us"
+    )
@@ -0,0 +1,111 @@
+import sys
+
+sys.path.append("..")
+import os
+
+os.environ["CONFIG_PATH"] = "../config.yaml"
+
+import asyncio
+import socket
+import time
+
+from nova.service.event_coalescer import coalesce_events
+from nova.service.serialization import dump_response
+from nova.service.stream_framing import frame_stream
+
+"""
+token 事件合并压测：多个并发流，每个流按固定速率产生 on_chat_model_stream 增量，
+统计下游事件数 / 每秒事件数 / 每个流的 CPU 耗时（handle_event 之后的合并、序列化、分帧）
+
+运行：cd test && python benchmark_stream_coalesce.py
+"""
+
+STREAMS = 200
+TOKENS_PER_STREAM = 1000
+TOKENS_PER_SECOND = 200
+TOKEN = "增量"
+
+
+async def fake_responses(stream_id: int):
+    """模拟 handle_event 之后的 token 增量，偶尔夹杂一个工具事件"""
+    interval = 1 / TOKENS_PER_SECOND
+    started = time.perf_counter()
+    for i in range(TOKENS_PER_STREAM):
+        # 按绝对时间对齐，避免 sleep 误差累积
+        delay = started + i * interval - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if i and i % 250 == 0:
+            yield {
+                "event_name": "on_tool_start",
+                "node_name": "tools",
+                "input": {"file_path": f"/mnt/user-data/{stream_id}.md"},
+            }
+        yield {
+            "event_name": "on_chat_model_stream",
+            "node_name": "super_nova",
+            "output": {"message_id": f"run-{stream_id}", "content": TOKEN},
+        }
+
+
+async def serialize(responses):
+    async for response in responses:
+        yield dump_response(0, response, "ok")
+
+
+async def consume(stream_id: int, window_ms: float | None) -> int:
+    if window_ms is None:
+        # 只消费模拟的上游，作为 CPU 基线
+        return sum([1 async for _ in fake_responses(stream_id)])
+
+    # 每个流一条本地 socket 连接，每个事件一次 write + drain，近似 StreamingResponse 的每次 send
+    server, client = socket.socketpair()
+    reader, reader_side = await asyncio.open_connection(sock=server)
+    _, writer = await asyncio.open_connection(sock=client)
+
+    async def _drain_reader():
+        while await reader.read(65536):
+            pass
+
+    draining = asyncio.create_task(_drain_reader())
+    writes = 0
+    async for frame in frame_stream(
+        serialize(coalesce_events(fake_responses(stream_id), window_ms, 4096)),
+        "ndjson",
+    ):
+        writer.write(frame.encode("utf-8"))
+        await writer.drain()
+        writes += 1
+    writer.close()
+    await writer.wait_closed()
+    await draining
+    reader_side.close()
+    return writes
+
+
+async def run(window_ms: float | None) -> tuple[int, float, float]:
+    cpu_started = time.process_time()
+    started = time.perf_counter()
+    writes = await asyncio.gather(*(consume(i, window_ms) for i in range(STREAMS)))
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+    return sum(writes), elapsed, cpu / STREAMS * 1000
+
+
+def best_of(window_ms: float | None, repeat: int = 3) -> tuple[int, float, float]:
+    return min((asyncio.run(run(window_ms)) for _ in range(repeat)), key=lambda r: r[2])
+
+
+if __name__ == "__main__":
+    print(
+        f"{STREAMS} streams x {TOKENS_PER_STREAM} tokens @ {TOKENS_PER_SECOND} tokens/s"
+    )
+    _, _, baseline = best_of(None)
+    print(f"upstream only: cpu/stream={baseline:.2f}ms")
+    for window_ms in (0, 20, 50):
+        total, elapsed, cpu = best_of(window_ms)
+        print(
+            f"window={window_ms:>3.0f}ms  events={total:>7d}  "
+            f"events/s={total / elapsed:>8.0f}  "
+            f"pipeline cpu/stream={cpu - baseline:>6.2f}ms"
+        )
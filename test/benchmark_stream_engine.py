@@ -0,0 +1,181 @@
+import sys
+
+sys.path.append("..")
+import os
+
+os.environ["CONFIG_PATH"] = "../config.yaml"
+
+import asyncio
+import time
+from typing import Annotated, TypedDict
+
+from langchain.tools import ToolRuntime
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.tools import tool
+from langgraph.graph import START, StateGraph
+from langgraph.graph.message import add_messages
+from langgraph.prebuilt.tool_node import ToolNode, tools_condition
+
+from nova.service.handle_event import handle_event
+from nova.service.stream_engine import stream_events
+from nova.utils.common import emit_custom_event
+
+"""
+流式引擎基准：astream_events v2 vs astream(stream_mode=[...])
+
+模拟 super_nova 的一次运行：模型流式输出并发起多个工具调用，工具推送增量输出，再流式输出最终回答；
+第一轮的工具调用交给 human_feedback 节点（不执行工具），其工具调用不应产生 on_tool_start。
+两种引擎都经过 handle_event，统计原始事件数、转发事件数与 CPU 耗时，
+并校验两者转发给客户端的事件序列一致（事件名、节点名、文本输出）
+
+运行：cd test && python benchmark_stream_engine.py
+"""
+
+TURNS = 5
+TOOL_CALLS_PER_TURN = 4
+ANSWER = "这是一段用于压测的流式回答 " * 40
+
+
+class BenchState(TypedDict):
+    messages: Annotated[list, add_messages]
+
+
+@tool("read_file")
+async def read_file(file_path: str, runtime: ToolRuntime) -> str:
+    """读取文件"""
+    for i in range(5):
+        await emit_custom_event(
+            "sandbox_execute_output",
+            {"tool_call_id": runtime.tool_call_id, "stream": "stdout", "text": f"{i}\n"},
+            runtime.stream_writer,
+        )
+    return f"content of {file_path}"
+
+
+def build_graph():
+    scripted = (
+        [
+            AIMessage(
+                content="先确认需求",
+                tool_calls=[
+                    {
+                        "name": "ask_clarification",
+                        "args": {"question": "读取哪些文件？"},
+                        "id": "call_clarify",
+                    }
+                ],
+            )
+        ]
+        + [
+            AIMessage(
+                content=f"第 {turn} 轮，读取文件",
+                tool_calls=[
+                    {
+                        "name": "read_file",
+                        "args": {"file_path": f"/mnt/user-data/{turn}_{i}.md"},
+                        "id": f"call_{turn}_{i}",
+                    }
+                    for i in range(TOOL_CALLS_PER_TURN)
+                ],
+            )
+            for turn in range(TURNS)
+        ]
+        + [AIMessage(content=ANSWER)]
+    )
+    model = GenericFakeChatModel(messages=iter(scripted))
+    turns = iter(scripted)
+
+    async def super_nova(state: BenchState):
+        merged = None
+        async for chunk in model.astream(state["messages"]):
+            merged = chunk if merged is None else merged + chunk
+        # GenericFakeChatModel 不流式输出 tool_calls，这里补上
+        return {
+            "messages": [
+                AIMessage(
+                    content=merged.content,  # type: ignore[union-attr]
+                    tool_calls=next(turns).tool_calls,
+                    id=merged.id,  # type: ignore[union-attr]
+                )
+            ]
+        }
+
+    async def human_feedback(state: BenchState):
+        return {"messages": [HumanMessage(content="读取全部文件")]}
+
+    def route(state: BenchState) -> str:
+        tool_calls = state["messages"][-1].tool_calls
+        if tool_calls and tool_calls[0]["name"] == "ask_clarification":
+            return "human_feedback"
+        return tools_condition(state)
+
+    graph = StateGraph(BenchState)
+    graph.add_node("super_nova", super_nova)
+    graph.add_node("human_feedback", human_feedback)
+    graph.add_node("tools", ToolNode([read_file]))
+    graph.add_edge(START, "super_nova")
+    graph.add_conditional_edges(
+        "super_nova",
+        route,
+        {"human_feedback": "human_feedback", "tools": "tools", "__end__": "__end__"},
+    )
+    graph.add_edge("human_feedback", "super_nova")
+    graph.add_edge("tools", "super_nova")
+    return graph.compile()
+
+
+def forwarded_key(result: dict) -> tuple:
+    """客户端可见的部分：事件名、节点名、文本输出（路由结果、工具输出等）"""
+    output = result.get("output")
+    return (
+        result.get("event_name"),
+        result.get("node_name"),
+        output if isinstance(output, str) else None,
+    )
+
+
+async def run_once(engine: str) -> tuple[int, list[tuple]]:
+    raw = 0
+    forwarded = []
+    async for event in stream_events(
+        engine,  # type: ignore[arg-type]
+        build_graph(),
+        {"messages": [HumanMessage(content="压测")]},
+        {"recursion_limit": 100},
+        None,
+    ):
+        raw += 1
+        result = handle_event("bench", event)
+        if result:
+            forwarded.append(forwarded_key(result))
+    return raw, forwarded
+
+
+async def bench(engine: str, runs: int = 20) -> list[tuple]:
+    await run_once(engine)  # 预热
+    cpu_started = time.process_time()
+    for _ in range(runs):
+        raw, forwarded = await run_once(engine)
+    cpu = (time.process_time() - cpu_started) / runs * 1000
+    print(
+        f"{engine:>8}: raw events={raw:>5d}  forwarded={len(forwarded):>5d}  "
+        f"cpu/run={cpu:>7.2f}ms"
+    )
+    return forwarded
+
+
+def compare(expected: list[tuple], actual: list[tuple]):
+    for i, (a, b) in enumerate(zip(expected, actual)):
+        assert a == b, f"forwarded event #{i} differs: events={a} astream={b}"
+    assert len(expected) == len(actual), (
+        f"forwarded event count differs: events={len(expected)} astream={len(actual)}"
+    )
+    print("forwarded event sequences match")
+
+
+if __name__ == "__main__":
+    sequences = {
+        engine: asyncio.run(bench(engine)) for engine in ("events", "astream")
+    }
+    compare(sequences["events"], sequences["astream"])
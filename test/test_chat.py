@@ -39,9 +39,9 @@ async def agent_client():
                 print(f"Error: {response.status_code}")
                 return
 
-            async for chunk in response.aiter_bytes():
-                if chunk:
-                    tmp = json.loads(chunk.decode("utf-8"))
+            async for line in response.aiter_lines():
+                if line:
+                    tmp = json.loads(line)
                     try:
                         if tmp["data"]["event_name"] == "on_chat_model_stream":
                             continue
@@ -65,15 +65,12 @@ async def test_agent_websocket():
                 response_json = await websocket.recv()
                 # 解析为字典，便于查看
                 response = json.loads(response_json)
-                print(f"code: {response['code']} | data: {response['data']}")
+                print(
+                    f"run_id: {response['run_id']} | code: {response['code']} | data: {response['data']}"
+                )
 
-                # 流式场景：判断是否完成
-                if (
-                    response["code"] == 0
-                    and response["data"].get("event_info")
-                    and response["data"].get("event_name") == "on_chain_end"
-                    and response["data"]["event_info"].get("node_name") == "LangGraph"
-                ):
+                # 运行结束时服务端发送 run_end（同一连接上的多个运行按 run_id 区分）
+                if response["data"].get("event_name") == "run_end":
                     print("=== 流式响应接收完成 ===")
                     break
 
@@ -0,0 +1,45 @@
+import sys
+
+sys.path.append("..")
+import os
+
+os.environ["CONFIG_PATH"] = "../config.yaml"
+
+import asyncio
+import tempfile
+
+from nova.sandbox.local.local_sandbox_provider import LocalSandboxProvider
+
+"""
+沙箱冒烟测试：按配置构建 LocalSandboxProvider（含常驻 shell、文件索引），
+分配线程沙箱并执行命令、读写文件、glob / grep
+
+运行：cd test && python test_sandbox_provider.py
+"""
+
+
+async def main():
+    provider = LocalSandboxProvider()
+    sandbox_id = provider.acquire("smoke-thread")
+    sandbox = provider.get(sandbox_id)
+    assert sandbox is not None, "sandbox not created"
+
+    with tempfile.TemporaryDirectory() as workdir:
+        target = os.path.join(workdir, "hello.md")
+        print(sandbox.write_file(target, "第一行 hello\n第二行 world\n"))
+        print(sandbox.read_file(target, 0, 10))
+        print(sandbox.glob("*.md", workdir))
+        print(sandbox.grep("world", workdir))  # type: ignore[call-arg]
+
+        output = await sandbox.aexecute(  # type: ignore[attr-defined]
+            f"cd {workdir} && ls", session_id="smoke-thread"
+        )
+        print(output)
+        assert "hello.md" in output
+
+    await provider.ashutdown()
+    print("sandbox provider ok")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -28,6 +28,7 @@ async def agent_client(chat_router):
             ],
         },
         "stream": True,
+        "stream_format": "ndjson",
     }
 
     # 使用 httpx 异步客户端发送请求
@@ -46,9 +47,9 @@ async def agent_client(chat_router):
                 )
                 return
 
-            async for chunk in response.aiter_bytes():
-                if chunk:
-                    tmp = json.loads(chunk.decode("utf-8"))
+            async for line in response.aiter_lines():
+                if line:
+                    tmp = json.loads(line)
                     try:
                         if tmp["data"]["event_name"] == "on_chat_model_stream":
                             continue
@@ -74,6 +75,7 @@ async def human_in_loop_client(chat_router):
             },
         },
         "stream": True,
+        "stream_format": "ndjson",
     }
 
     # 使用 httpx 异步客户端发送请求
@@ -89,13 +91,58 @@ async def human_in_loop_client(chat_router):
                 print(f"Error: {response}")
                 return
 
-            async for chunk in response.aiter_bytes():
-                if chunk:
-                    tmp = json.loads(chunk.decode("utf-8"))
+            async for line in response.aiter_lines():
+                if line:
+                    tmp = json.loads(line)
                     print(tmp)
 
 
+async def sse_client(chat_router):
+    request_data = {
+        "trace_id": "123",
+        "context": {
+            "thread_id": "Nova3",
+            "model": "deepseek",
+            "agent": chat_router,
+            "models": {"summarize": "basic"},
+        },
+        "state": {
+            "messages": [
+                {"type": "human", "content": "帮忙编写一个客服系统开发的skill"},
+            ],
+        },
+        "stream": True,
+        "stream_format": "sse",
+    }
+
+    async with httpx.AsyncClient(timeout=600.0) as client:
+        async with client.stream(
+            "POST",
+            "http://0.0.0.0:2021/agent/service",
+            json=request_data,
+        ) as response:
+            if response.status_code != 200:
+                print(f"Error: {response}")
+                return
+
+            # SSE：空行结束一个事件，data 行可能有多行
+            event_id, event, data = None, "message", []
+            async for line in response.aiter_lines():
+                if line.startswith("id:"):
+                    event_id = line[3:].strip()
+                elif line.startswith("event:"):
+                    event = line[6:].strip()
+                elif line.startswith("data:"):
+                    data.append(line[5:].lstrip())
+                elif not line and data:
+                    if event == "end":
+                        return
+                    print(event_id, json.loads("\n".join(data)))
+                    event, data = "message", []
+
+
 if __name__ == "__main__":
     chat_router = "super_nova"
     asyncio.run(agent_client(chat_router))
     # asyncio.run(human_in_loop_client(chat_router))
+    # asyncio.run(sse_client(chat_router))
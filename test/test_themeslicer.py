@@ -37,9 +37,9 @@ async def agent_client():
                 print(f"Error: {response.status_code}")
                 return
 
-            async for chunk in response.aiter_bytes():
-                if chunk:
-                    tmp = json.loads(chunk.decode("utf-8"))
+            async for line in response.aiter_lines():
+                if line:
+                    tmp = json.loads(line)
                     try:
                         if tmp["data"]["event_name"] == "on_chat_model_stream":
                             continue
@@ -81,9 +81,9 @@ async def human_in_loop_client():
                 print(f"Error: {response.status_code}")
                 return
 
-            async for chunk in response.aiter_bytes():
-                if chunk:
-                    tmp = json.loads(chunk.decode("utf-8"))
+            async for line in response.aiter_lines():
+                if line:
+                    tmp = json.loads(line)
                     print(tmp)
 
 